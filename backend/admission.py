@@ -0,0 +1,251 @@
+"""
+Admission control in front of KFP: submissions wait in a priority queue and
+are released to KFP while the cluster-wide, per-team and per-pipeline limits
+on concurrently active runs allow.
+
+Among queued submissions that fit the limits, the highest priority goes
+first; at equal priority the team with the fewest active runs goes first
+(fair share), then the oldest submission. A run stops counting as active
+once its status is seen in a terminal state, either through /status or the
+controller's own polling every ADMISSION_POLL_S seconds.
+
+A submission that can go at once is submitted in its own request thread;
+everything released later (when a slot frees up) is submitted from the
+controller's background thread, so no request waits on other users' KFP
+submissions.
+
+A limit of 0 means unlimited; with every limit at 0 (the default) runs are
+submitted immediately, as before. The queue is kept in memory and does not
+survive a restart.
+"""
+import itertools
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from run_states import TERMINAL_STATES
+
+ADMISSION_MAX_ACTIVE = int(os.getenv("ADMISSION_MAX_ACTIVE", "0"))
+ADMISSION_MAX_PER_TEAM = int(os.getenv("ADMISSION_MAX_PER_TEAM", "0"))
+ADMISSION_MAX_PER_PIPELINE = int(os.getenv("ADMISSION_MAX_PER_PIPELINE", "0"))
+ADMISSION_POLL_S = float(os.getenv("ADMISSION_POLL_S", "10"))
+# Finished submissions kept for GET /queue/{id}
+ADMISSION_HISTORY = 1000
+DEFAULT_TEAM = "default"
+
+class Submission:
+    """A run request waiting for, or released by, admission control."""
+
+    def __init__(self, pipeline_id: str, team: str, priority: int, seq: int, launch: Callable[[], Optional[str]]):
+        self.id = str(uuid.uuid4())
+        self.pipeline_id = pipeline_id
+        self.team = team
+        self.priority = priority
+        self.seq = seq
+        self.launch = launch
+        self.state = "queued"  # queued -> submitting -> submitted | failed | canceled
+        self.enqueued_at = time.time()
+        self.submitted_at = None
+        self.run_id = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "pipeline_id": self.pipeline_id, "team": self.team, "priority": self.priority,
+                "state": self.state, "enqueued_at": self.enqueued_at, "submitted_at": self.submitted_at,
+                "run_id": self.run_id, "error": self.error}
+
+class AdmissionController:
+    def __init__(self, max_active: int = 0, max_per_team: int = 0, max_per_pipeline: int = 0,
+                 poll_s: float = 10.0, get_status: Optional[Callable[[str], str]] = None):
+        self.max_active = max_active
+        self.max_per_team = max_per_team
+        self.max_per_pipeline = max_per_pipeline
+        self.poll_s = poll_s
+        self.get_status = get_status
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._woken = False
+        self._seq = itertools.count()
+        self._queued: List[Submission] = []
+        # Submissions counted against the limits: being submitted or running in KFP
+        self._active: Dict[str, Submission] = {}
+        self._by_id: Dict[str, Submission] = {}
+        self._worker = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_active or self.max_per_team or self.max_per_pipeline)
+
+    def _count(self, attr: str, value: str) -> int:
+        return sum(1 for s in self._active.values() if getattr(s, attr) == value)
+
+    def _fits(self, sub: Submission) -> bool:
+        if self.max_active and len(self._active) >= self.max_active:
+            return False
+        if self.max_per_team and self._count("team", sub.team) >= self.max_per_team:
+            return False
+        if self.max_per_pipeline and self._count("pipeline_id", sub.pipeline_id) >= self.max_per_pipeline:
+            return False
+        return True
+
+    def _order(self) -> List[Submission]:
+        active_by_team = {}
+        for s in self._active.values():
+            active_by_team[s.team] = active_by_team.get(s.team, 0) + 1
+        return sorted(self._queued, key=lambda s: (-s.priority, active_by_team.get(s.team, 0), s.seq))
+
+    def submit(self, pipeline_id: str, launch: Callable[[], Optional[str]], team: Optional[str] = None,
+               priority: int = 0) -> Submission:
+        """
+        Queues a submission; launch() submits it to KFP and returns the run id.
+        Released at once (in the calling thread) if it is next in line and the
+        limits allow; otherwise the background thread releases it later.
+        """
+        sub = Submission(pipeline_id, team or DEFAULT_TEAM, priority, next(self._seq), launch)
+        with self._lock:
+            self._queued.append(sub)
+            self._by_id[sub.id] = sub
+            done = [k for k, s in self._by_id.items() if s.state in ("submitted", "failed", "canceled")
+                    and k not in self._active]
+            for k in done[:max(0, len(done) - ADMISSION_HISTORY)]:
+                del self._by_id[k]
+            mine = self._next() is sub
+            if mine:
+                self._reserve(sub)
+        if mine:
+            self._launch(sub)
+        self._wake()
+        return sub
+
+    def _next(self) -> Optional[Submission]:
+        return next((s for s in self._order() if self._fits(s)), None)
+
+    def _reserve(self, sub: Submission) -> None:
+        # Takes the slot before the (slow) KFP call so concurrent releases respect the limits
+        self._queued.remove(sub)
+        sub.state = "submitting"
+        self._active[sub.id] = sub
+
+    def _launch(self, sub: Submission) -> None:
+        try:
+            run_id = sub.launch()
+        except Exception as e:
+            print(f"Failed to submit queued run {sub.id}: {e}")
+            with self._lock:
+                sub.state, sub.error = "failed", str(e)
+                self._active.pop(sub.id, None)
+            return
+        with self._lock:
+            sub.state, sub.run_id, sub.submitted_at = "submitted", run_id, time.time()
+            if not run_id:
+                # Nothing to poll; don't hold the slot forever
+                self._active.pop(sub.id, None)
+
+    def dispatch(self) -> None:
+        """Releases queued submissions while they fit the limits, in the calling thread."""
+        while True:
+            with self._lock:
+                sub = self._next()
+                if sub is None:
+                    return
+                self._reserve(sub)
+            self._launch(sub)
+
+    def observe(self, run_id: str, status: str) -> None:
+        """
+        Frees the run's slot once its status is terminal. What now fits is
+        released by the background thread; this returns right away.
+        """
+        if str(status).upper() not in TERMINAL_STATES:
+            return
+        with self._lock:
+            finished = [k for k, s in self._active.items() if s.run_id == run_id]
+            for k in finished:
+                del self._active[k]
+        if finished:
+            self._wake()
+
+    def cancel(self, submission_id: str) -> Optional[Submission]:
+        """Removes a still queued submission; returns it, or None if unknown."""
+        with self._lock:
+            sub = self._by_id.get(submission_id)
+            if sub and sub.state == "queued":
+                self._queued.remove(sub)
+                sub.state = "canceled"
+            return sub
+
+    def get(self, submission_id: str) -> Optional[dict]:
+        with self._lock:
+            sub = self._by_id.get(submission_id)
+            if not sub:
+                return None
+            order = self._order()
+            out = sub.to_dict()
+            if sub.state == "queued":
+                out["position"] = order.index(sub) + 1
+            return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            queued = []
+            for i, s in enumerate(self._order()):
+                entry = s.to_dict()
+                entry["position"] = i + 1
+                queued.append(entry)
+            active = [s.to_dict() for s in self._active.values()]
+        depth_by_team = {}
+        for s in queued:
+            depth_by_team[s["team"]] = depth_by_team.get(s["team"], 0) + 1
+        return {
+            "enabled": self.enabled,
+            "limits": {"max_active": self.max_active, "max_per_team": self.max_per_team,
+                       "max_per_pipeline": self.max_per_pipeline},
+            "depth": len(queued),
+            "depth_by_team": depth_by_team,
+            "active": active,
+            "queued": queued,
+        }
+
+    def _wake(self) -> None:
+        """Has the background thread release what fits, starting it if needed."""
+        with self._lock:
+            self._woken = True
+            self._wakeup.notify()
+            if self._worker is not None or not (self._active or self._queued):
+                return
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+    def _work(self) -> None:
+        # Runs while anything is active or queued: releases submissions when woken,
+        # and polls active runs so finished ones free their slots even if nobody
+        # asks for their status
+        next_poll = time.monotonic() + self.poll_s
+        while True:
+            with self._lock:
+                while not self._woken and time.monotonic() < next_poll:
+                    self._wakeup.wait(next_poll - time.monotonic())
+                self._woken = False
+                if not self._active and not self._queued:
+                    self._worker = None
+                    return
+                run_ids = []
+                if time.monotonic() >= next_poll:
+                    next_poll = time.monotonic() + self.poll_s
+                    if self.get_status is not None:
+                        run_ids = [s.run_id for s in self._active.values() if s.run_id]
+            for run_id in run_ids:
+                try:
+                    self.observe(run_id, self.get_status(run_id))
+                except Exception as e:
+                    print(f"Failed to poll run {run_id} for admission: {e}")
+            self.dispatch()
+
+def _kfp_status(run_id: str) -> str:
+    import kfp_client
+    return kfp_client.get_run_status(run_id)
+
+controller = AdmissionController(ADMISSION_MAX_ACTIVE, ADMISSION_MAX_PER_TEAM, ADMISSION_MAX_PER_PIPELINE,
+                                 ADMISSION_POLL_S, _kfp_status)
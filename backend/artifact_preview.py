@@ -0,0 +1,223 @@
+"""
+Artifact previews built from ranged reads: the schema and a sample of rows for
+CSV/Parquet/Arrow files, the content of small JSON files, and the head of
+text files. No preview fetches more than PREVIEW_MAX_BYTES of an object, so
+multi-GB artifacts are never downloaded into the API process. Previews are
+kept in an LRU cache keyed by artifact URI and request; artifacts of a run
+don't change once written.
+"""
+import csv
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import object_store
+from metrics import CACHE_REQUESTS
+
+PREVIEW_HEAD_BYTES = int(os.getenv("PREVIEW_HEAD_BYTES", str(256 * 1024)))
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", str(8 * 1024 * 1024)))
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", "128"))
+PREVIEW_MAX_ROWS = 200
+MAX_LISTED_FILES = 1000
+# Bytes read at each offset when sampling rows across a CSV
+SPREAD_READ_BYTES = 16 * 1024
+
+KINDS = {".csv": "csv", ".tsv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow",
+         ".ipc": "arrow", ".json": "json"}
+# Picked for a directory artifact when no file is requested
+_PREFERRED = ("parquet", "arrow", "csv", "json")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _kind(key: str) -> str:
+    return KINDS.get(os.path.splitext(key)[1].lower(), "text")
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    return str(value)
+
+def _complete_lines(data: bytes, at_end: bool, skip_first: bool) -> list:
+    # A range read usually starts and ends mid-line; keep whole lines only
+    lines = data.split(b"\n")
+    if skip_first:
+        lines = lines[1:]
+    if not at_end:
+        lines = lines[:-1]
+    return [ln.rstrip(b"\r").decode("utf-8", "replace") for ln in lines if ln.strip()]
+
+def _preview_csv(store, key: str, size: int, rows: int, sample: str) -> dict:
+    head = store.read_range(key, 0, min(size, PREVIEW_HEAD_BYTES))
+    bytes_read = len(head)
+    lines = _complete_lines(head, len(head) >= size, False)
+    delimiter = "\t" if key.lower().endswith(".tsv") else ","
+    parsed = list(csv.reader(lines, delimiter=delimiter))
+    columns = parsed[0] if parsed else []
+    body = parsed[1:]
+    data_bytes = len(b"\n".join(ln.encode() for ln in lines[1:])) if len(lines) > 1 else 0
+    result = {"columns": columns}
+    if sample == "spread" and len(head) < size and rows > 1:
+        # One row from each of `rows` evenly spaced offsets past the head
+        picked = body[:1]
+        span = size - len(head)
+        for i in range(1, rows):
+            if bytes_read + SPREAD_READ_BYTES > PREVIEW_MAX_BYTES:
+                result["truncated"] = True
+                break
+            start = len(head) + span * i // rows
+            chunk = store.read_range(key, start, min(SPREAD_READ_BYTES, size - start))
+            bytes_read += len(chunk)
+            found = list(csv.reader(_complete_lines(chunk, start + len(chunk) >= size, True)[:1], delimiter=delimiter))
+            picked.extend(found)
+        result["rows"] = picked
+    else:
+        result["rows"] = body[:rows]
+    if len(head) >= size:
+        result["total_rows"] = len(body)
+    elif body and data_bytes:
+        result["estimated_rows"] = int(size / (data_bytes / len(body)))
+    result["bytes_read"] = bytes_read
+    return result
+
+def _table_rows(table, rows: int) -> list:
+    return [[_jsonable(v) for v in row.values()] for row in table.slice(0, rows).to_pylist()]
+
+def _spread(count: int, picks: int) -> list:
+    if picks >= count:
+        return list(range(count))
+    return sorted({i * count // picks for i in range(picks)})
+
+def _preview_parquet(store, key: str, size: int, rows: int, sample: str) -> dict:
+    import pyarrow.parquet as pq  # deferred: optional dependency
+    f = object_store.RangeFile(store, key, size, max_bytes=PREVIEW_MAX_BYTES)
+    pf = pq.ParquetFile(f)
+    meta = pf.metadata
+    result = {
+        "columns": pf.schema_arrow.names,
+        "types": [str(t) for t in pf.schema_arrow.types],
+        "total_rows": meta.num_rows,
+        "row_groups": meta.num_row_groups,
+        "rows": [],
+    }
+    groups = _spread(meta.num_row_groups, rows) if sample == "spread" else range(meta.num_row_groups)
+    per_group = max(1, rows // max(1, len(groups))) if sample == "spread" else rows
+    for i in groups:
+        if len(result["rows"]) >= rows:
+            break
+        try:
+            table = pf.read_row_group(i)
+        except object_store.ReadBudgetExceeded:
+            result["truncated"] = True
+            break
+        result["rows"].extend(_table_rows(table, min(per_group, rows - len(result["rows"]))))
+    result["bytes_read"] = f.bytes_read
+    return result
+
+def _preview_arrow(store, key: str, size: int, rows: int, sample: str) -> dict:
+    import pyarrow as pa  # deferred: optional dependency
+    f = object_store.RangeFile(store, key, size, max_bytes=PREVIEW_MAX_BYTES)
+    reader = pa.ipc.open_file(f)
+    result = {
+        "columns": reader.schema.names,
+        "types": [str(t) for t in reader.schema.types],
+        "record_batches": reader.num_record_batches,
+        "rows": [],
+    }
+    batches = _spread(reader.num_record_batches, rows) if sample == "spread" else range(reader.num_record_batches)
+    per_batch = max(1, rows // max(1, len(batches))) if sample == "spread" else rows
+    for i in batches:
+        if len(result["rows"]) >= rows:
+            break
+        try:
+            batch = reader.get_batch(i)
+        except object_store.ReadBudgetExceeded:
+            result["truncated"] = True
+            break
+        result["rows"].extend(_table_rows(pa.Table.from_batches([batch]), min(per_batch, rows - len(result["rows"]))))
+    result["bytes_read"] = f.bytes_read
+    return result
+
+def _preview_text(store, key: str, size: int, kind: str) -> dict:
+    head = store.read_range(key, 0, min(size, PREVIEW_HEAD_BYTES))
+    result = {"bytes_read": len(head), "truncated": len(head) < size}
+    if b"\x00" in head[:8192]:
+        result["kind"] = "binary"
+        return result
+    text = head.decode("utf-8", "replace")
+    if kind == "json" and len(head) >= size:
+        try:
+            result["content"] = json.loads(text)
+            return result
+        except ValueError:
+            pass
+    result["text"] = text
+    return result
+
+def _preview_object(store, key: str, size: int, rows: int, sample: str) -> dict:
+    kind = _kind(key)
+    if kind == "csv":
+        result = _preview_csv(store, key, size, rows, sample)
+    elif kind == "parquet":
+        result = _preview_parquet(store, key, size, rows, sample)
+    elif kind == "arrow":
+        result = _preview_arrow(store, key, size, rows, sample)
+    else:
+        result = _preview_text(store, key, size, kind)
+    return {"kind": kind, **result}
+
+def _build(uri: str, file: Optional[str], rows: int, sample: str) -> dict:
+    store, key = object_store.open_uri(uri)
+    size = store.size(key) if key and not file else None
+    if size is not None:
+        return {"uri": uri, "file": os.path.basename(key), "size": size, **_preview_object(store, key, size, rows, sample)}
+    # Directory artifact: pick one of the files under it
+    prefix = key.rstrip("/")
+    files = store.list(prefix, limit=MAX_LISTED_FILES)
+    if not files:
+        raise FileNotFoundError(f"Artifact {uri} not found")
+    listed = [{"name": name[len(prefix):].lstrip("/") if prefix else name, "size": sz} for name, sz in files]
+    if file:
+        match = [f for f in listed if f["name"] == file]
+        if not match:
+            raise FileNotFoundError(f"File {file} not found in artifact {uri}")
+        chosen = match[0]
+    else:
+        chosen = next((f for kind in _PREFERRED for f in listed if _kind(f["name"]) == kind), listed[0])
+    object_key = f"{prefix}/{chosen['name']}" if prefix else chosen["name"]
+    return {"uri": uri, "file": chosen["name"], "size": chosen["size"], "files": listed,
+            **_preview_object(store, object_key, chosen["size"], rows, sample)}
+
+def preview(uri: str, file: Optional[str] = None, rows: int = 20, sample: str = "head") -> dict:
+    """
+    Returns a preview of the artifact at uri. A directory artifact lists its
+    files and previews `file`, or the first Parquet/Arrow/CSV/JSON file in it.
+    sample="spread" takes rows from across the file instead of its head.
+    """
+    if sample not in ("head", "spread"):
+        raise ValueError("sample must be 'head' or 'spread'")
+    rows = max(1, min(rows, PREVIEW_MAX_ROWS))
+    cache_key = (uri, file, rows, sample)
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+        if cached is not None:
+            _cache.move_to_end(cache_key)
+    if cached is not None:
+        CACHE_REQUESTS.inc(cache="artifact_preview", result="hit")
+        return cached
+    CACHE_REQUESTS.inc(cache="artifact_preview", result="miss")
+    result = _build(uri, file, rows, sample)
+    with _cache_lock:
+        _cache[cache_key] = result
+        while len(_cache) > PREVIEW_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
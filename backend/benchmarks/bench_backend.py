@@ -0,0 +1,208 @@
+"""
+End-to-end backend benchmark against the fake KFP API server.
+
+For synthetic pipelines of increasing size it measures:
+  - compile time of compiler.compile_pipeline
+  - submit throughput of POST /pipelines/{id}/run (compile + submit + save)
+  - p50/p99 latency of GET /pipelines/{id}/status and /nodes/status
+
+Storage lives in a temporary directory, so the real data/ is never touched.
+Each invocation appends one JSON line to --output so results can be
+compared across commits; the default benchmarks/results/ is local history
+and ignored by git:
+
+    cd backend && python benchmarks/bench_backend.py --sizes 5,20,50,100
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_kfp_server import FakeKFPState, start_server
+
+DEFAULT_OUTPUT = os.path.join(BACKEND_DIR, "benchmarks", "results", "backend.jsonl")
+
+def percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank percentile; good enough for a few hundred samples
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+def summarize(samples_s: List[float]) -> dict:
+    ms = [s * 1000.0 for s in samples_s]
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+def synthetic_component(models):
+    return models.Component(
+        name="bench-step",
+        image="python:3.11-slim",
+        command=["python", "-c", "import sys; open(sys.argv[2], 'w').write(sys.argv[1])"],
+        args=["{{inputs.parameters.data}}", "/tmp/outputs/out"],
+        inputs=[models.ComponentInput(name="data", type="String")],
+        outputs=[models.ComponentOutput(name="out", type="Dataset")],
+    )
+
+def synthetic_pipeline(models, component_id: str, size: int, name: str):
+    """
+    A binary-tree shaped DAG: node i consumes the output of node (i-1)//2,
+    so the graph has both depth and width as it grows.
+    """
+    nodes, edges = [], []
+    for i in range(size):
+        nodes.append(models.PipelineNode(
+            id=f"node_{i}",
+            component_id=component_id,
+            label=f"step {i}",
+            position={"x": float(i % 10) * 200, "y": float(i // 10) * 120},
+            args={} if i else {"data": "seed"},
+        ))
+        if i:
+            parent = (i - 1) // 2
+            edges.append(models.PipelineEdge(
+                id=f"e_{parent}_{i}", source=f"node_{parent}", target=f"node_{i}",
+                sourceHandle="out", targetHandle="data",
+            ))
+    return models.Pipeline(name=name, nodes=nodes, edges=edges)
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def run(args) -> dict:
+    server, endpoint = start_server(FakeKFPState(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                                 pending_s=args.pending_s, running_s=args.running_s, seed=0))
+    # Must be set before the backend modules read their configuration
+    os.environ["KFP_ENDPOINT"] = endpoint
+    workdir = tempfile.mkdtemp(prefix="kfp-bench-")
+    os.chdir(workdir)
+    warnings.simplefilter("ignore")
+
+    import models
+    import storage
+    import compiler
+    from fastapi.testclient import TestClient
+    from main import app
+
+    api = TestClient(app)
+    comp = storage.save_component(synthetic_component(models))
+    result = {"sizes": []}
+    for size in args.sizes:
+        entry = {"nodes": size}
+
+        pipe = storage.save_pipeline(synthetic_pipeline(models, comp.id, size, f"bench-{size}"))
+        os.remove(compiler.compile_pipeline(pipe, run_key="bench"))  # warm-up
+        samples = []
+        for _ in range(args.compile_repeats):
+            t0 = time.perf_counter()
+            yaml_file = compiler.compile_pipeline(pipe, run_key="bench")
+            samples.append(time.perf_counter() - t0)
+            os.remove(yaml_file)
+        entry["compile"] = summarize(samples)
+
+        # Every worker submits the same pipeline; each compile writes its own file
+        workers = [pipe] * args.concurrency
+        per_worker = max(1, args.submits // args.concurrency)
+
+        def submit_loop(p):
+            lat = []
+            for _ in range(per_worker):
+                t0 = time.perf_counter()
+                r = api.post(f"/pipelines/{p.id}/run")
+                lat.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    raise RuntimeError(f"Submit failed: {r.status_code} {r.text}")
+            return lat
+
+        # The KFP SDK prints run links on every submit
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                submit_samples = [s for lat in pool.map(submit_loop, workers) for s in lat]
+            wall = time.perf_counter() - t0
+        entry["submit"] = summarize(submit_samples)
+        entry["submit"]["runs_per_s"] = round(len(submit_samples) / wall, 3) if wall else 0.0
+
+        for route in ("status", "nodes/status"):
+            samples = []
+            for i in range(args.polls):
+                p = workers[i % len(workers)]
+                t0 = time.perf_counter()
+                r = api.get(f"/pipelines/{p.id}/{route}")
+                samples.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    raise RuntimeError(f"Poll failed: {r.status_code} {r.text}")
+            entry["poll_" + route.replace("/", "_")] = summarize(samples)
+
+        result["sizes"].append(entry)
+        print(f"{size:>5} nodes  compile p50 {entry['compile']['p50_ms']:>9.1f} ms  "
+              f"submit {entry['submit']['runs_per_s']:>7.2f} runs/s  "
+              f"status p50/p99 {entry['poll_status']['p50_ms']:.1f}/{entry['poll_status']['p99_ms']:.1f} ms  "
+              f"nodes/status p50/p99 {entry['poll_nodes_status']['p50_ms']:.1f}/{entry['poll_nodes_status']['p99_ms']:.1f} ms")
+
+    result["fake_kfp_requests"] = server.state.requests
+    server.shutdown()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the backend against a fake KFP API")
+    parser.add_argument("--sizes", default="5,20,50,100", help="Comma separated node counts")
+    parser.add_argument("--compile-repeats", type=int, default=5)
+    parser.add_argument("--submits", type=int, default=20, help="Runs submitted per size")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--polls", type=int, default=200, help="Requests per status route and size")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake KFP latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--pending-s", type=float, default=0.5)
+    parser.add_argument("--running-s", type=float, default=2.0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file the results are appended to")
+    parser.add_argument("--label", default="", help="Free-form tag stored with the results")
+    cli_args = parser.parse_args()
+    cli_args.sizes = [int(s) for s in cli_args.sizes.split(",") if s.strip()]
+    cli_args.output = os.path.abspath(cli_args.output)
+
+    started = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    metrics = run(cli_args)
+    try:
+        import kfp
+        kfp_version = kfp.__version__
+    except Exception:
+        kfp_version = "unknown"
+    record = {
+        "timestamp": started,
+        "commit": git_commit(),
+        "label": cli_args.label,
+        "python": platform.python_version(),
+        "kfp": kfp_version,
+        "config": {k: getattr(cli_args, k) for k in ("compile_repeats", "submits", "concurrency", "polls",
+                                                      "latency_ms", "jitter_ms", "pending_s", "running_s")},
+        **metrics,
+    }
+    os.makedirs(os.path.dirname(cli_args.output), exist_ok=True)
+    with open(cli_args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Results appended to {cli_args.output}")
@@ -0,0 +1,122 @@
+"""
+Startup-time guard for the backend, based on `python -X importtime`.
+
+Imports `main` in fresh interpreters and fails (exit code 1) when:
+  - a module that must load lazily (the KFP SDK) is imported at startup,
+  - the median cumulative import time of `main` exceeds --budget-ms, or
+  - it regressed more than --tolerance against the best recent result
+    recorded in --output on this machine.
+
+Each invocation appends one JSON line to --output:
+
+    cd backend && python benchmarks/bench_startup.py
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BACKEND_DIR, "benchmarks", "results", "startup.jsonl")
+
+# Top-level packages that must only load on first compile/submit
+LAZY_MODULES = ("kfp", "kfp_server_api", "google.protobuf")
+
+def import_times(module: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Imports module in a fresh interpreter and returns ({module: self_us},
+    {module: cumulative_us}) as reported by -X importtime.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+    self_us, cumulative_us = {}, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            name = name.strip()
+            self_us[name] = int(own)
+            cumulative_us[name] = int(cumulative)
+        except ValueError:
+            continue
+    return self_us, cumulative_us
+
+def best_recent(output: str, machine: str, count: int = 10) -> float:
+    if not os.path.exists(output):
+        return 0.0
+    history = []
+    with open(output, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("machine") == machine and record.get("passed"):
+                history.append(record["median_ms"])
+    recent = history[-count:]
+    return min(recent) if recent else 0.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Guard backend import time against regressions")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="Absolute limit for the median")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against the best recent passing result, as a fraction")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to print")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSONL file the results are appended to")
+    cli_args = parser.parse_args()
+    cli_args.output = os.path.abspath(cli_args.output)
+
+    # Warm-up run so bytecode compilation isn't counted
+    import_times(cli_args.module)
+    samples: List[float] = []
+    last_self: Dict[str, int] = {}
+    for _ in range(cli_args.runs):
+        last_self, cumulative = import_times(cli_args.module)
+        samples.append(cumulative.get(cli_args.module, 0) / 1000.0)
+    median_ms = statistics.median(samples)
+
+    failures = []
+    eager = sorted(m for m in last_self if any(m == lazy or m.startswith(lazy + ".") for lazy in LAZY_MODULES))
+    if eager:
+        failures.append(f"modules that must load lazily were imported at startup: {', '.join(eager[:5])}"
+                        f"{' ...' if len(eager) > 5 else ''}")
+    if median_ms > cli_args.budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds the {cli_args.budget_ms:.0f} ms budget")
+    machine = f"{platform.node()}/{platform.python_version()}"
+    baseline = best_recent(cli_args.output, machine)
+    if baseline and median_ms > baseline * (1 + cli_args.tolerance):
+        failures.append(f"median import time {median_ms:.1f} ms regressed more than "
+                        f"{cli_args.tolerance:.0%} against {baseline:.1f} ms")
+
+    print(f"import {cli_args.module}: median {median_ms:.1f} ms over {cli_args.runs} runs "
+          f"(min {min(samples):.1f}, max {max(samples):.1f})")
+    print("slowest imports (self time):")
+    for name, us in sorted(last_self.items(), key=lambda kv: kv[1], reverse=True)[:cli_args.top]:
+        print(f"  {us / 1000.0:8.1f} ms  {name}")
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "machine": machine,
+        "module": cli_args.module,
+        "samples_ms": [round(s, 3) for s in samples],
+        "median_ms": round(median_ms, 3),
+        "baseline_ms": baseline,
+        "passed": not failures,
+        "failures": failures,
+    }
+    os.makedirs(os.path.dirname(cli_args.output), exist_ok=True)
+    with open(cli_args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
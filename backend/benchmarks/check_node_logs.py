@@ -0,0 +1,117 @@
+"""
+End-to-end check of GET /pipelines/{id}/nodes/{node_id}/logs against the
+file-backed log source, without a cluster.
+
+Writes timestamped logs for a single-pod node and a two-pod fan-out node
+under a temporary LOG_FILE_ROOT and registers a file source that records
+what each read was asked for. The node -> pods map is seeded into the
+node_logs cache as a finished run's, so no KFP call is made. Then checks
+tail (including tail across pods and the native tail only for a single
+pod), since, regex and timestamps, and exits with code 1 on any failure:
+
+    cd backend && python benchmarks/check_node_logs.py
+"""
+import os
+import sys
+import tempfile
+import warnings
+from datetime import datetime, timedelta, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+RUN_ID = "run-logs-check"
+LINES_PER_POD = 50
+
+def write_log(root: str, pod: str, start: datetime, step_s: int) -> None:
+    # Line i is stamped start + i * step_s; every tenth line is an error
+    with open(os.path.join(root, f"{pod}.log"), "w") as f:
+        for i in range(LINES_PER_POD):
+            at = (start + timedelta(seconds=i * step_s)).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+            level = "ERROR" if i % 10 == 9 else "INFO"
+            f.write(f"{at} {level} {pod} line {i}\n")
+
+def main() -> int:
+    log_root = tempfile.mkdtemp(prefix="node-logs-")
+    # Must be set before the backend modules read their configuration
+    os.environ["LOG_SOURCES"] = "file"
+    os.environ["LOG_FILE_ROOT"] = log_root
+    os.chdir(tempfile.mkdtemp(prefix="node-logs-data-"))
+    warnings.simplefilter("ignore")
+
+    import models
+    import node_logs
+    import storage
+    from fastapi.testclient import TestClient
+    from main import app
+
+    reads = []
+
+    def read_file(run_id, pod, since_s, tail):
+        reads.append((pod, tail))
+        return node_logs.read_from_file(run_id, pod, since_s, tail)
+
+    node_logs.register_source("file", read_file)
+
+    # Old lines an hour back, recent ones from 40s ago, one second apart
+    now = datetime.now(timezone.utc)
+    write_log(log_root, "train-pod", now - timedelta(seconds=40), 1)
+    write_log(log_root, "fan-pod-0", now - timedelta(hours=1), 1)
+    write_log(log_root, "fan-pod-1", now - timedelta(seconds=40), 1)
+
+    pipe = storage.save_pipeline(models.Pipeline(name="logs-check", nodes=[
+        models.PipelineNode(id=node_id, component_id="c", label=node_id, position={"x": 0, "y": 0})
+        for node_id in ("train", "fan")]))
+    pipe.last_run_id = RUN_ID
+    storage.save_pipeline(pipe)
+    node_logs.node_pods(RUN_ID, "train", lambda: ({"train": ["train-pod"], "fan": ["fan-pod-0", "fan-pod-1"]}, True))
+
+    api = TestClient(app)
+    failures = []
+
+    def logs(node_id: str, **params) -> list:
+        del reads[:]
+        r = api.get(f"/pipelines/{pipe.id}/nodes/{node_id}/logs", params=params)
+        if r.status_code != 200:
+            failures.append(f"{node_id} {params}: HTTP {r.status_code} {r.text}")
+            return []
+        return r.text.splitlines()
+
+    def check(name: str, got, expected) -> None:
+        ok = got == expected
+        print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(f"{name}: expected {expected!r}, got {got!r}")
+
+    got = logs("train", tail=3)
+    check("tail on one pod", got, [f"INFO train-pod line {i}" for i in (47, 48)] + ["ERROR train-pod line 49"])
+    check("tail on one pod is read natively", reads, [("train-pod", 3)])
+
+    got = logs("fan", tail=3)
+    check("tail across pods", got, [f"[fan-pod-1] INFO fan-pod-1 line {i}" for i in (47, 48)] +
+          ["[fan-pod-1] ERROR fan-pod-1 line 49"])
+    check("tail across pods reads whole logs", reads, [("fan-pod-0", None), ("fan-pod-1", None)])
+
+    got = logs("fan", regex="ERROR", tail=2)
+    check("regex then tail", got, ["[fan-pod-1] ERROR fan-pod-1 line 39", "[fan-pod-1] ERROR fan-pod-1 line 49"])
+
+    got = logs("fan", since=60, regex="ERROR")
+    check("since drops old lines", got, [f"[fan-pod-1] ERROR fan-pod-1 line {i}" for i in (9, 19, 29, 39, 49)])
+
+    # Line i is 40 - i seconds old, plus however long the check has run so far
+    kept = [int(line.rsplit(" ", 1)[1]) for line in logs("train", since=15)]
+    check("since keeps the last 15s", bool(kept) and kept[0] in (25, 26, 27) and kept == list(range(kept[0], 50)), True)
+
+    got = logs("train", tail=1, timestamps=True)
+    check("timestamps kept on request", bool(got) and node_logs._TIMESTAMP.match(got[0]) is not None, True)
+
+    r = api.get(f"/pipelines/{pipe.id}/nodes/train/logs", params={"regex": "("})
+    check("invalid regex is a 400", r.status_code, 400)
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Stand-in for the KFP v2beta1 REST API, covering the calls kfp_client makes:
+healthz, experiments list/create, runs create/get, task_runs and artifacts.
+
+Runs move PENDING -> RUNNING -> SUCCEEDED (or FAILED) on a wall clock;
+each task of the submitted pipeline spec runs for an equal slice of the
+RUNNING phase, in the order the spec lists them, and reports start/end
+times and a pod name once started. Every response is
+delayed by the configured latency.
+
+    python benchmarks/fake_kfp_server.py --port 30088 --latency-ms 20
+    KFP_ENDPOINT=http://localhost:30088 uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIXES = ("/pipeline/apis/v2beta1", "/apis/v2beta1")
+
+class FakeKFPState:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, pending_s: float = 0.5,
+                 running_s: float = 2.0, fail_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.pending_s = pending_s
+        self.running_s = running_s
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.experiments: Dict[str, dict] = {}
+        self.runs: Dict[str, dict] = {}
+        self.requests = 0
+
+    def delay(self) -> None:
+        with self._lock:
+            self.requests += 1
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+
+    def find_experiment(self, display_name: Optional[str]) -> List[dict]:
+        with self._lock:
+            return [e for e in self.experiments.values() if not display_name or e["display_name"] == display_name]
+
+    def create_experiment(self, body: dict) -> dict:
+        exp = {
+            "experiment_id": str(uuid.uuid4()),
+            "display_name": body.get("display_name") or "Default",
+            "namespace": body.get("namespace") or "",
+            "created_at": _now(),
+        }
+        with self._lock:
+            # Names are unique per namespace, as in KFP; concurrent creates get the same experiment
+            for existing in self.experiments.values():
+                if existing["display_name"] == exp["display_name"] and existing["namespace"] == exp["namespace"]:
+                    return existing
+            self.experiments[exp["experiment_id"]] = exp
+        return exp
+
+    def create_run(self, body: dict) -> dict:
+        spec = body.get("pipeline_spec") or {}
+        # The SDK nests the compiled spec next to the platform spec
+        spec = spec.get("pipeline_spec") or spec
+        tasks = (((spec.get("root") or {}).get("dag") or {}).get("tasks") or {})
+        task_names = [((t.get("taskInfo") or {}).get("name") or key) for key, t in tasks.items()]
+        with self._lock:
+            failed = self._random.random() < self.fail_rate
+        run = {
+            "run_id": str(uuid.uuid4()),
+            "display_name": body.get("display_name") or "",
+            "experiment_id": body.get("experiment_id") or "",
+            "runtime_config": body.get("runtime_config") or {},
+            "created_at": _now(),
+            "_started": time.monotonic(),
+            "_started_wall": time.time(),
+            "_tasks": task_names,
+            "_final": "FAILED" if failed else "SUCCEEDED",
+        }
+        with self._lock:
+            self.runs[run["run_id"]] = run
+        return self.render_run(run)
+
+    def _task_state(self, run: dict, index: int, elapsed: float) -> str:
+        if elapsed < self.pending_s:
+            return "PENDING"
+        slot = self.running_s / max(len(run["_tasks"]), 1)
+        start = self.pending_s + index * slot
+        if elapsed < start:
+            return "PENDING"
+        if elapsed < start + slot:
+            return "RUNNING"
+        # A failed run fails on its last task; earlier tasks succeed
+        if run["_final"] == "FAILED" and index == len(run["_tasks"]) - 1:
+            return "FAILED"
+        return "SUCCEEDED"
+
+    def render_run(self, run: dict) -> dict:
+        elapsed = time.monotonic() - run["_started"]
+        if elapsed < self.pending_s:
+            state = "PENDING"
+        elif elapsed < self.pending_s + self.running_s:
+            state = "RUNNING"
+        else:
+            state = run["_final"]
+        tasks = []
+        for i, name in enumerate(run["_tasks"]):
+            task_state = self._task_state(run, i, elapsed)
+            outputs = {}
+            if task_state == "SUCCEEDED":
+                outputs["output"] = {"artifacts": [{"uri": f"s3://fake/{run['run_id']}/{name}/output"}]}
+            task = {
+                "run_id": run["run_id"],
+                "task_id": f"{run['run_id']}-{i}",
+                "display_name": name,
+                "state": task_state,
+                "outputs": outputs,
+            }
+            if task_state != "PENDING":
+                slot = self.running_s / max(len(run["_tasks"]), 1)
+                start = run["_started_wall"] + self.pending_s + i * slot
+                task["start_time"] = _now(start)
+                task["child_tasks"] = [{"pod_name": f"{run['run_id'][:8]}-{i}-pod"}]
+                if task_state != "RUNNING":
+                    task["end_time"] = _now(start + slot)
+            tasks.append(task)
+        return {
+            "run_id": run["run_id"],
+            "display_name": run["display_name"],
+            "experiment_id": run["experiment_id"],
+            "runtime_config": run["runtime_config"],
+            "created_at": run["created_at"],
+            "state": state,
+            "run_details": {"task_details": tasks},
+        }
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        with self._lock:
+            run = self.runs.get(run_id)
+        return self.render_run(run) if run else None
+
+def _now(ts: Optional[float] = None) -> str:
+    dt = datetime.fromtimestamp(time.time() if ts is None else ts, timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}Z"
+
+def _strip_prefix(path: str) -> Optional[str]:
+    for prefix in API_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return path[len(prefix):] or "/"
+    return None
+
+def make_handler(state: FakeKFPState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length).decode("utf-8"))
+            except ValueError:
+                return {}
+
+        def _route(self, method: str) -> None:
+            url = urlparse(self.path)
+            path = _strip_prefix(url.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = self._body() if method == "POST" else {}
+            state.delay()
+            if path is None:
+                return self._send(404, {"error": f"Unknown path {url.path}"})
+            if path == "/healthz":
+                return self._send(200, {"commit_sha": "fake", "tag_name": "2.0.0"})
+            if path == "/experiments":
+                if method == "POST":
+                    return self._send(200, state.create_experiment(body))
+                display_name = None
+                try:
+                    flt = json.loads(query.get("filter") or "{}")
+                    for p in flt.get("predicates") or []:
+                        if p.get("key") == "display_name":
+                            display_name = p.get("stringValue") or p.get("string_value")
+                except ValueError:
+                    pass
+                return self._send(200, {"experiments": state.find_experiment(display_name)})
+            if path == "/runs" and method == "POST":
+                return self._send(200, state.create_run(body))
+            if path.startswith("/runs/") and method == "GET":
+                run = state.get_run(path[len("/runs/"):])
+                if not run:
+                    return self._send(404, {"error": "Run not found"})
+                return self._send(200, run)
+            if path in ("/task_runs", "/tasks") and method == "GET":
+                run = state.get_run(query.get("run_id") or "")
+                return self._send(200, {"task_runs": run["run_details"]["task_details"] if run else []})
+            if path.startswith("/artifacts/") and method == "GET":
+                return self._send(200, {"artifact_id": path[len("/artifacts/"):], "uri": f"s3://fake/{path[len('/artifacts/'):]}"})
+            return self._send(404, {"error": f"Unsupported {method} {url.path}"})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+    return Handler
+
+def start_server(state: Optional[FakeKFPState] = None, host: str = "127.0.0.1", port: int = 0):
+    """
+    Serves the fake API from a daemon thread. Returns (server, endpoint);
+    port 0 picks a free port.
+    """
+    state = state or FakeKFPState()
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake KFP v2beta1 API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=30088)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--pending-s", type=float, default=0.5, help="Seconds a run stays PENDING")
+    parser.add_argument("--running-s", type=float, default=2.0, help="Seconds a run stays RUNNING")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of runs that end FAILED")
+    parser.add_argument("--seed", type=int, default=None)
+    cli_args = parser.parse_args()
+    fake_state = FakeKFPState(cli_args.latency_ms, cli_args.jitter_ms, cli_args.pending_s,
+                              cli_args.running_s, cli_args.fail_rate, cli_args.seed)
+    srv = ThreadingHTTPServer((cli_args.host, cli_args.port), make_handler(fake_state))
+    print(f"Fake KFP API listening on http://{cli_args.host}:{cli_args.port}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
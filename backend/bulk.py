@@ -0,0 +1,255 @@
+"""
+Bulk import and export of components and pipelines.
+
+Imports come as a JSON list of components (POST /components:bulk) or as an
+archive (POST /import), either JSON Lines of
+
+    {"kind": "component" | "pipeline", "data": {...}}
+
+or a tar.gz with components/<id>.json and pipelines/<id>.json members, the
+two formats GET /export produces. Items are read and processed in batches of
+BULK_BATCH_SIZE: each batch is validated in chunks, spread over
+BULK_WORKERS processes once it is large enough to pay for them, then written
+at once (concurrent file writes, one search index transaction). An invalid
+item is reported with its position and does not stop the others.
+
+Exports stream the stored files as they are read, so memory use does not
+grow with the size of the catalog.
+"""
+import io
+import json
+import multiprocessing
+import os
+import tarfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+import component_search
+import storage
+from metrics import STORAGE_LATENCY
+from models import Component, Pipeline
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+# Validation processes; 0 or 1 validates in the request thread
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Items per validation task handed to a worker process
+BULK_CHUNK_SIZE = 500
+# Errors listed in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+KINDS = ("component", "pipeline")
+_DIRS = {"component": "components", "pipeline": "pipelines"}
+_GZIP_MAGIC = b"\x1f\x8b"
+
+def _validate_chunk(kind: str, items: List[Tuple[str, object]]) -> List[tuple]:
+    """
+    Validates (ref, data) pairs as components or pipelines. Returns
+    (ref, id, json text, search index row, error) per item. Runs in worker
+    processes, so takes and returns only plain data.
+    """
+    model = Component if kind == "component" else Pipeline
+    out = []
+    for ref, data in items:
+        try:
+            if not isinstance(data, dict):
+                raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+            obj = model(**data)
+            if not obj.id:
+                obj.id = str(uuid.uuid4())
+            elif not storage.is_safe_id(obj.id):
+                # Ids become file names; imported ones must not reach outside the data directory
+                raise ValueError(f"Invalid id {obj.id!r}: must not contain path separators or be '.' or '..'")
+            row = component_search.row(obj) if kind == "component" else None
+            out.append((ref, obj.id, obj.json(), row, None))
+        except Exception as e:
+            out.append((ref, data.get("id") if isinstance(data, dict) else None, None, None, str(e)))
+    return out
+
+class Importer:
+    """Validates and writes items batch by batch, collecting a per-item report."""
+
+    def __init__(self):
+        self.imported = {kind: 0 for kind in KINDS}
+        self.failed = 0
+        self.errors = []
+        self._pool = None
+
+    def error(self, ref: str, kind: Optional[str], item_id: Optional[str], message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"ref": ref, "kind": kind, "id": item_id, "error": message})
+
+    def _validate(self, kind: str, items: List[Tuple[str, object]]) -> List[tuple]:
+        chunks = [items[i:i + BULK_CHUNK_SIZE] for i in range(0, len(items), BULK_CHUNK_SIZE)]
+        if BULK_WORKERS <= 1 or len(chunks) < 2:
+            return [r for chunk in chunks for r in _validate_chunk(kind, chunk)]
+        if self._pool is None:
+            # spawn: forking a server process with live threads is unsafe
+            self._pool = ProcessPoolExecutor(max_workers=BULK_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return [r for result in self._pool.map(_validate_chunk, [kind] * len(chunks), chunks) for r in result]
+
+    @STORAGE_LATENCY.time(op="import", kind="batch")
+    def _batch(self, items: List[Tuple[str, str, object]]) -> None:
+        for kind in KINDS:
+            pairs = [(ref, data) for ref, k, data in items if k == kind]
+            if not pairs:
+                continue
+            docs = {}
+            for ref, item_id, text, row, err in self._validate(kind, pairs):
+                if err:
+                    self.error(ref, kind, item_id, err)
+                else:
+                    # A later duplicate id in the batch wins, as with sequential saves
+                    docs[item_id] = (item_id, text, row)
+            if not docs:
+                continue
+            try:
+                if kind == "component":
+                    storage.save_component_docs(list(docs.values()))
+                else:
+                    storage.save_pipeline_docs([d[:2] for d in docs.values()])
+                self.imported[kind] += len(docs)
+            except Exception as e:
+                print(f"Failed to write {kind} batch: {e}")
+                for item_id in docs:
+                    self.error("", kind, item_id, f"Write failed: {e}")
+
+    def run(self, items: Iterable[Tuple[str, Optional[str], object, Optional[str]]]) -> dict:
+        """
+        Imports (ref, kind, data, parse error) items; ref locates the item in
+        the input (list index, line number or archive member) for the report.
+        """
+        batch = []
+        try:
+            for ref, kind, data, err in items:
+                if err:
+                    self.error(ref, kind, None, err)
+                    continue
+                batch.append((ref, kind, data))
+                if len(batch) >= BULK_BATCH_SIZE:
+                    self._batch(batch)
+                    batch = []
+            if batch:
+                self._batch(batch)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+        return self.report()
+
+    def report(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+def import_components(items: List[object]) -> dict:
+    return Importer().run((f"[{i}]", "component", data, None) for i, data in enumerate(items))
+
+def _jsonl_items(f: IO[bytes]) -> Iterator[tuple]:
+    for lineno, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        ref = f"line {lineno}"
+        try:
+            entry = json.loads(line)
+        except ValueError as e:
+            yield ref, None, None, f"Invalid JSON: {e}"
+            continue
+        kind = entry.get("kind") if isinstance(entry, dict) else None
+        if kind not in KINDS:
+            yield ref, None, None, f"Expected {{\"kind\": {' | '.join(KINDS)}, \"data\": {{...}}}}"
+            continue
+        yield ref, kind, entry.get("data"), None
+
+def _tar_items(f: IO[bytes]) -> Iterator[tuple]:
+    kinds = {d: k for k, d in _DIRS.items()}
+    try:
+        with tarfile.open(fileobj=f, mode="r|gz") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                parts = member.name.lstrip("./").split("/")
+                kind = kinds.get(parts[0]) if len(parts) == 2 and parts[1].endswith(".json") else None
+                if kind is None:
+                    yield member.name, None, None, f"Expected {' or '.join(d + '/<id>.json' for d in kinds)}"
+                    continue
+                try:
+                    data = json.loads(tar.extractfile(member).read())
+                except ValueError as e:
+                    yield member.name, kind, None, f"Invalid JSON: {e}"
+                    continue
+                yield member.name, kind, data, None
+    except (tarfile.TarError, EOFError, OSError) as e:
+        yield "archive", None, None, f"Unreadable archive: {e}"
+
+def import_archive(f: IO[bytes]) -> dict:
+    """Imports a JSONL or tar.gz archive (told apart by the gzip magic) from a seekable file."""
+    gzipped = f.read(2) == _GZIP_MAGIC
+    f.seek(0)
+    return Importer().run(_tar_items(f) if gzipped else _jsonl_items(f))
+
+# Export
+
+def _stored(kinds: Iterable[str]) -> Iterator[Tuple[str, str, bytes]]:
+    """(kind, id, JSON bytes) of every stored entity of the given kinds."""
+    for kind in kinds:
+        directory = storage.COMPONENTS_DIR if kind == "component" else storage.PIPELINES_DIR
+        if not os.path.isdir(directory):
+            continue
+        filenames = sorted(os.listdir(directory))
+        oplogs = {f for f in filenames if f.endswith(".ops.jsonl")}
+        for filename in filenames:
+            if not filename.endswith(".json"):
+                continue
+            item_id = filename[:-len(".json")]
+            path = os.path.join(directory, filename)
+            try:
+                if f"{item_id}.ops.jsonl" in oplogs:
+                    # Pending incremental edits live in the op log; export the current state
+                    data = storage.get_pipeline(item_id).json().encode("utf-8")
+                else:
+                    with open(path, "rb") as fh:
+                        data = fh.read()
+            except (OSError, AttributeError) as e:
+                # Deleted while exporting
+                print(f"Skipping {kind} {item_id} in export: {e}")
+                continue
+            yield kind, item_id, data.strip()
+
+def export_jsonl(kinds: Iterable[str]) -> Iterator[bytes]:
+    for kind, _, data in _stored(kinds):
+        yield b'{"kind": "' + kind.encode() + b'", "data": ' + data + b"}\n"
+
+class _Sink(io.RawIOBase):
+    """Write-only file collecting tarfile output until it is drained into the response."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+def export_tar(kinds: Iterable[str]) -> Iterator[bytes]:
+    sink = _Sink()
+    with tarfile.open(fileobj=sink, mode="w|gz") as tar:
+        for kind, item_id, data in _stored(kinds):
+            info = tarfile.TarInfo(f"{_DIRS[kind]}/{item_id}.json")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
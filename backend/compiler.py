@@ -2,43 +2,378 @@ from kfp import dsl
 from kfp import compiler
 from kfp.components import load_component_from_text
 from kfp import kubernetes
+from kfp.dsl import Input, Output, Dataset
+from kfp.dsl.structures import InputSpec
+from kfp.dsl.types import type_utils
+from kfp.dsl.yaml_component import YamlComponent
+import copy
+import functools
+import hashlib
+import inspect
+import json
 import tempfile
+import threading
 import os
-from typing import Dict
-from models import Pipeline, Component
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from pydantic import BaseModel
+from models import Pipeline, Component, PipelineNode, CachingPolicy, parse_duration
 import storage
+import storage_profiles
+import resource_usage
+import subpipelines
+import lineage
+import volcano
+from metrics import COMPILE_PHASE
 
-def compile_pipeline(pipeline: Pipeline) -> str:
+# Extra input fed the node's cache token (lineage.cache_token), so KFP cache
+# fingerprints change before a cached result would be older than max_staleness
+CACHE_TOKEN_INPUT = 'kfp_cache_token'
+
+# KFP traces pipelines through a process-wide context, so concurrent
+# compiles (e.g. requests served from the threadpool) must not overlap
+_compile_lock = threading.Lock()
+
+# Artifact classes by schema title, for importing URIs into typed inputs of imported specs
+_ARTIFACT_CLASSES = {cls.schema_title: cls for cls in (
+    dsl.Artifact, dsl.Dataset, dsl.Model, dsl.Metrics, dsl.ClassificationMetrics,
+    dsl.SlicedClassificationMetrics, dsl.HTML, dsl.Markdown)}
+
+_PARAMETER_ANNOTATIONS = {'Integer': int, 'Float': float, 'Boolean': bool, 'List': list, 'Dict': dict}
+
+# Node args are strings; typed parameters of imported specs need the declared type
+_PARAMETER_PARSERS = {
+    'Integer': int,
+    'Float': float,
+    'Boolean': lambda v: v.strip().lower() in ('1', 'true', 'yes'),
+    'List': json.loads,
+    'Dict': json.loads,
+}
+
+def _merge_policy(base: BaseModel, override: Optional[BaseModel]) -> BaseModel:
+    """
+    Returns a copy of base with every field that is set (not None or blank) on override applied.
+    """
+    merged = base.copy(deep=True)
+    if override is not None:
+        for field, value in override.dict().items():
+            if value is not None and value != '':
+                setattr(merged, field, value)
+    return merged
+
+def _resolve_caching(comp: Component, node: PipelineNode) -> CachingPolicy:
+    policy = _merge_policy(comp.caching, node.caching)
+    if policy.enabled is None:
+        policy.enabled = False
+    return policy
+
+@functools.lru_cache(maxsize=256)
+def _spec_component(spec_text: str, cache_token: bool = False) -> YamlComponent:
+    """
+    Loads an imported component spec (Component.spec) once per distinct text.
+    With cache_token, a copy that also declares CACHE_TOKEN_INPUT; tasks copy
+    the container spec they modify, so loaded components can be shared.
+    """
+    comp = load_component_from_text(spec_text)
+    if not cache_token:
+        return comp
+    spec = copy.deepcopy(comp.component_spec)
+    spec.inputs = {**(spec.inputs or {}), CACHE_TOKEN_INPUT: InputSpec(type='String')}
+    return YamlComponent(spec, comp.component_yaml)
+
+def _artifact_class(input_spec: Optional[InputSpec]) -> type:
+    if input_spec is None:
+        return dsl.Dataset
+    return _ARTIFACT_CLASSES.get(input_spec.type.split('@', 1)[0], dsl.Artifact)
+
+def _spec_argument(node: PipelineNode, name: str, input_spec: Optional[InputSpec], value: str):
+    """A node argument as the value an input of an imported spec expects."""
+    if input_spec is None:
+        return value
+    if not type_utils.is_parameter_type(input_spec.type):
+        return dsl.importer(artifact_uri=value, artifact_class=_artifact_class(input_spec)).outputs['artifact']
+    parse = _PARAMETER_PARSERS.get(input_spec.type)
+    try:
+        return parse(value) if parse else value
+    except ValueError:
+        raise ValueError(f"Argument '{name}' of node {node.id} is not a valid {input_spec.type}: {value!r}")
+
+def _sanitize(name: str) -> str:
+    s = ''.join(ch if (ch.isalnum() or ch == '_') else '_' for ch in name)
+    if s and s[0].isdigit():
+        s = '_' + s
+    return s
+
+def downstream_closure(pipeline: Pipeline, start_node_id: str) -> Set[str]:
+    """
+    Returns the ids of start_node_id and every node reachable from it.
+    """
+    if not any(n.id == start_node_id for n in pipeline.nodes):
+        raise ValueError(f"Start node {start_node_id} not found in pipeline")
+    children = {}
+    for edge in pipeline.edges:
+        children.setdefault(edge.source, []).append(edge.target)
+    selected = {start_node_id}
+    stack = [start_node_id]
+    while stack:
+        for v in children.get(stack.pop(), []):
+            if v not in selected:
+                selected.add(v)
+                stack.append(v)
+    return selected
+
+def _volcano_group_name(owner: str, suffix: str) -> str:
+    """
+    PodGroup name <owner>-<suffix> as a DNS label. Past 63 characters the
+    owner (pipeline or sweep id) is replaced by its hash, so the suffix that
+    tells groups apart (run key, node id) is always kept whole.
+    """
+    def label(s: str) -> str:
+        return ''.join(ch if ch.isalnum() or ch in '-.' else '-' for ch in s.lower())
+
+    group = label(f"{owner}-{suffix}")
+    if len(group) > 63:
+        kind, _, owner_id = owner.partition('-')
+        group = label(f"{kind}-{hashlib.sha1(owner_id.encode()).hexdigest()[:10]}-{suffix}")
+    if len(group) > 63:
+        group = f"{owner.partition('-')[0]}-{hashlib.sha1(group.encode()).hexdigest()[:16]}"
+    return group.strip('-.')
+
+def _volcano_annotations(pipeline: Pipeline, node: PipelineNode, comp: Component, width: Optional[int],
+                         run_key: str, sweep_id: Optional[str]) -> Dict[str, str]:
+    """
+    Pod annotations placing a node's pods in their own Volcano PodGroup, and
+    the group's settings, from which volcano.create_pod_groups creates it.
+
+    Groups are per node and per run (or per sweep), so concurrent runs of the
+    same pipeline never share a group and minAvailable only counts pods that
+    can actually coexist: the iterations of a fan-out node (up to width), or
+    the same node across the runs of a sweep. width is None when a fan-out's
+    items are only known once the run is submitted.
+    """
+    settings = _merge_policy(comp.volcano, node.volcano)
+    scope = settings.group_scope or 'run'
+    if scope not in ('run', 'sweep'):
+        raise ValueError(f"Unknown Volcano group scope '{scope}' on node {node.id}")
+    if scope == 'sweep' and not sweep_id:
+        raise ValueError(f"Node {node.id} uses a per-sweep Volcano group but the run has no sweep id")
+    min_available = settings.min_available or 1
+    if scope == 'run' and width is not None and min_available > width:
+        # A gang that can never be filled would hold its partial allocation forever
+        raise ValueError(f"Volcano minAvailable {min_available} on node {node.id} exceeds the {width} pods it can run at once")
+
+    if scope == 'sweep':
+        group = _volcano_group_name(f"sweep-{sweep_id}", node.id)
+    else:
+        group = _volcano_group_name(f"pipeline-{pipeline.id}", f"{run_key}-{node.id}")
+
+    annotations = {
+        volcano.GROUP_NAME_ANNOTATION: group,
+        volcano.MIN_MEMBER_ANNOTATION: str(min_available),
+    }
+    if settings.queue:
+        annotations[volcano.QUEUE_ANNOTATION] = settings.queue
+    if settings.priority_class:
+        annotations[volcano.PRIORITY_CLASS_ANNOTATION] = settings.priority_class
+    return annotations
+
+def _nested_spec_key(sub: Pipeline, artifact_ports: Set[str], stack: Tuple[str, ...], run_key: str,
+                     sweep_id: Optional[str], right_size: bool) -> str:
+    """
+    Hash of everything a nested pipeline's compiled spec depends on: the
+    pipeline, its components and nested pipelines (recursively), which ports
+    take artifacts, storage profiles, and the time/run dependent inputs
+    (cache tokens, Volcano group names, recommended requests).
+    """
+    content = {"artifact_ports": sorted(artifact_ports), "pipelines": [], "components": {}, "cache_tokens": {}, "right_size": {},
+               "profiles": [p.dict() for p in storage_profiles.list_profiles()["profiles"]]}
+    uses_volcano = False
+    pending = [(sub, stack)]
+    while pending:
+        pipe, pipe_stack = pending.pop()
+        content["pipelines"].append(pipe.dict(exclude={"last_run_id", "revision"}))
+        for node in pipe.nodes:
+            if node.kind == 'pipeline':
+                pending.append((subpipelines.load_nested(node, pipe_stack + (pipe.id,)), pipe_stack + (pipe.id,)))
+                continue
+            comp = storage.get_component(node.component_id)
+            if not comp:
+                raise ValueError(f"Component {node.component_id} not found for node {node.id}")
+            content["components"][comp.id] = comp.dict()
+            uses_volcano = uses_volcano or comp.volcano_enabled
+            caching = _resolve_caching(comp, node)
+            if caching.enabled and caching.max_staleness:
+                content["cache_tokens"][f"{pipe.id}/{node.id}"] = lineage.cache_token(
+                    pipe.id, node.id, parse_duration(caching.max_staleness))
+            if right_size:
+                content["right_size"][comp.id] = resource_usage.recommend(comp.id)["recommended"]
+    if uses_volcano:
+        # Group names are per run (or sweep)
+        content["run"] = [run_key, sweep_id]
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def compile_pipeline(pipeline: Pipeline, start_node_id: Optional[str] = None,
+                     upstream_artifacts: Optional[Dict[str, Dict[str, str]]] = None,
+                     run_key: Optional[str] = None, sweep_id: Optional[str] = None,
+                     right_size: bool = False, artifact_ports: Optional[Set[str]] = None,
+                     output_file: Optional[str] = None, nested_in: Tuple[str, ...] = (),
+                     arguments: Optional[Dict[str, object]] = None) -> str:
     """
     Compiles a Pipeline model into a KFP YAML file.
-    Returns the path to the compiled YAML file.
+    Returns the path to the compiled YAML file: output_file, or else a new
+    temporary file that the caller removes once done with it.
+
+    With start_node_id set, only that node and its downstream closure are
+    compiled. Data edges coming from skipped upstream nodes are fed through
+    dsl.importer from upstream_artifacts ({node_id: {output_name: uri}}),
+    typically recovered from a previous run.
+
+    run_key makes Volcano group names unique to the run being compiled (a
+    fresh one is generated when omitted); sweep_id names the shared group of
+    nodes using the per-sweep scope. arguments are the run's, if known: the
+    Volcano gang size of a fan-out node is checked against the items they
+    give it rather than its default ones.
+
+    right_size replaces each component's CPU/memory requests with the ones
+    recommended from its measured usage (resource_usage.recommend), where
+    there are enough samples; node overrides still win, and requests never
+    exceed the limits.
+
+    Nodes of kind "pipeline" run another saved pipeline as a sub-DAG: it is
+    compiled on its own (memoized in subpipelines) and loaded back as a graph
+    component, with edges and args bound to its ports. artifact_ports,
+    nested_in and output_file are set for those nested compiles: the names of
+    input ports fed artifacts, the enclosing pipeline ids, and where to write.
     """
+    run_key = run_key or uuid.uuid4().hex[:8]
     
-    # 1. Load all referenced components
+    # 0. Select the nodes to compile
+    selected = {n.id for n in pipeline.nodes}
+    if start_node_id:
+        selected = downstream_closure(pipeline, start_node_id)
+    upstream_artifacts = upstream_artifacts or {}
+
+    def _upstream_uri(node_id: str, output_name: str) -> Optional[str]:
+        outs = upstream_artifacts.get(node_id) or {}
+        return outs.get(_sanitize(output_name)) or outs.get(output_name)
+
+    for edge in pipeline.edges:
+        if edge.target in selected and edge.source not in selected and edge.sourceHandle and edge.targetHandle:
+            if not _upstream_uri(edge.source, edge.sourceHandle):
+                raise ValueError(f"No artifact from a previous run for output '{edge.sourceHandle}' of node {edge.source}")
+
+    # 1. Load all referenced components and nested pipelines
+    stack = nested_in + (pipeline.id,)
     component_map: Dict[str, Component] = {}
+    nested_map: Dict[str, Pipeline] = {}
+    with COMPILE_PHASE.time(phase="load_components"):
+        for node in pipeline.nodes:
+            if node.id not in selected:
+                continue
+            if node.kind == 'pipeline':
+                nested_map[node.id] = subpipelines.load_nested(node, stack)
+                continue
+            comp = storage.get_component(node.component_id)
+            if not comp:
+                raise ValueError(f"Component {node.component_id} not found for node {node.id}")
+            component_map[node.component_id] = comp
+
+    # Outputs of imported specs that are parameters rather than artifacts, with their types
+    parameter_outputs: Dict[Tuple[str, str], str] = {}
     for node in pipeline.nodes:
-        comp = storage.get_component(node.component_id)
-        if not comp:
-            raise ValueError(f"Component {node.component_id} not found for node {node.id}")
-        component_map[node.component_id] = comp
+        comp = component_map.get(node.component_id) if node.id in selected else None
+        if comp and comp.spec:
+            for name, out in (_spec_component(comp.spec).component_spec.outputs or {}).items():
+                if type_utils.is_parameter_type(out.type):
+                    parameter_outputs[(node.id, name)] = out.type
 
-    # 2. Define the pipeline function dynamically
-    def _sanitize(name: str) -> str:
-        s = ''.join(ch if (ch.isalnum() or ch == '_') else '_' for ch in name)
-        if s and s[0].isdigit():
-            s = '_' + s
-        return s
+    recommended: Dict[str, dict] = {}
+    if right_size:
+        with COMPILE_PHASE.time(phase="right_size"):
+            for comp_id in component_map:
+                recommended[comp_id] = resource_usage.recommend(comp_id)["recommended"]
+
+    # Ports of this pipeline when it is itself compiled as a nested pipeline
+    in_ports, out_ports = subpipelines.ports(pipeline, nested_in) if artifact_ports is not None else ([], [])
+    if artifact_ports is not None:
+        subpipelines.validate_ports(pipeline, in_ports, out_ports, nested_in)
+    node_kinds = {n.id: n.kind for n in pipeline.nodes}
+    port_inputs: Dict[str, List[tuple]] = {}
+    for port in in_ports:
+        port_inputs.setdefault(port.node_id, []).append((port.handle, _sanitize(port.name), port.name in artifact_ports))
+    for port in out_ports:
+        if node_kinds.get(port.node_id) == 'parallel_for':
+            raise ValueError(f"Output port '{port.name}' cannot come from fan-out node {port.node_id}; collect it first")
+
+    # Nested pipelines: each unique (sub-pipeline, port types, options) is compiled once
+    nested_components = {}
+    loaded_specs = {}
+    for node_id, sub in nested_map.items():
+        node = next(n for n in pipeline.nodes if n.id == node_id)
+        sub_in, sub_out = subpipelines.ports(sub, stack)
+        fed = {e.targetHandle for e in pipeline.edges if e.target == node_id and e.targetHandle}
+        for handle in fed:
+            if handle not in {p.name for p in sub_in}:
+                raise ValueError(f"Nested pipeline node {node_id} has no input '{handle}'")
+        sub_artifacts = {p.name for p in sub_in if p.name in fed or
+                         str((node.args or {}).get(p.name) or '').startswith('s3://')}
+        key = _nested_spec_key(sub, sub_artifacts, stack, run_key, sweep_id, right_size)
+
+        def build(sub=sub, sub_artifacts=sub_artifacts):
+            fd, path = tempfile.mkstemp(prefix=f"{sub.id}-", suffix=".yaml")
+            os.close(fd)
+            try:
+                compile_pipeline(sub, run_key=run_key, sweep_id=sweep_id, right_size=right_size,
+                                 artifact_ports=sub_artifacts, output_file=path, nested_in=stack)
+                with open(path, "r") as f:
+                    return f.read()
+            finally:
+                os.remove(path)
+
+        if key not in loaded_specs:
+            loaded_specs[key] = load_component_from_text(subpipelines.cached_spec(key, build))
+        nested_components[node_id] = (loaded_specs[key], sub, sub_in)
+
+    # Fan-out items become pipeline parameters so their width is decided per run
+    fan_out_params = {}
+    for node in pipeline.nodes:
+        if node.id not in selected or node.kind != 'parallel_for':
+            continue
+        if not node.loop_input:
+            raise ValueError(f"Fan-out node {node.id} has no loop input")
+        if any(e.target == node.id and e.targetHandle == node.loop_input for e in pipeline.edges):
+            raise ValueError(f"Loop input '{node.loop_input}' of fan-out node {node.id} cannot be fed by an edge")
+        raw_items = (node.args or {}).get(node.loop_input) or '[]'
+        try:
+            items = json.loads(raw_items)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            raise ValueError(f"Loop input '{node.loop_input}' of fan-out node {node.id} must be a JSON list")
+        fan_out_params[node.id] = (_sanitize(f"{node.id}_items"), items)
 
-    def _build_component_yaml(comp: Component, artifact_inputs: set):
+    for edge in pipeline.edges:
+        if edge.target in selected and node_kinds.get(edge.source) == 'parallel_for' and edge.sourceHandle:
+            if node_kinds.get(edge.target) != 'collect':
+                raise ValueError(f"Outputs of fan-out node {edge.source} can only be consumed by a collect node")
+
+    # 2. Define the pipeline function dynamically
+    def _build_component_yaml(comp: Component, artifact_inputs: set, cache_token: bool = False,
+                              parameter_types: Optional[Dict[str, str]] = None):
         in_map = {i.name: _sanitize(i.name) for i in comp.inputs}
         out_map = {o.name: _sanitize(o.name) for o in comp.outputs}
         lines = []
         lines.append(f"name: {comp.name}")
-        if comp.inputs:
+        if comp.inputs or cache_token:
             lines.append("inputs:")
             for inp in comp.inputs:
                 lines.append(f"  - name: {in_map[inp.name]}")
-                lines.append(f"    type: {'Dataset' if inp.name in artifact_inputs else 'string'}")
+                lines.append(f"    type: {'Dataset' if inp.name in artifact_inputs else (parameter_types or {}).get(inp.name, 'string')}")
+            if cache_token:
+                # Not passed to the container; it only varies the cache fingerprint
+                lines.append(f"  - name: {CACHE_TOKEN_INPUT}")
+                lines.append("    type: String")
         if comp.outputs:
             lines.append("outputs:")
             for out in comp.outputs:
@@ -81,12 +416,83 @@ def compile_pipeline(pipeline: Pipeline) -> str:
                     lines.append(f"    - \"{sa}\"")
         return "\n".join(lines), in_map, out_map
 
-    @dsl.pipeline(
-        name=pipeline.name,
-        description=pipeline.description
-    )
-    def dynamic_pipeline():
+    def _build_container_component(comp: Component, artifact_inputs: set, list_inputs: set, cache_token: bool = False,
+                                   parameter_types: Optional[Dict[str, str]] = None):
+        # Same mapping as _build_component_yaml, but through dsl.container_component,
+        # which (unlike component YAML) can declare List[Dataset] inputs for dsl.Collected
+        in_map = {i.name: _sanitize(i.name) for i in comp.inputs}
+        out_map = {o.name: _sanitize(o.name) for o in comp.outputs}
+        params = []
+        for inp in comp.inputs:
+            if inp.name in list_inputs:
+                annotation = Input[List[Dataset]]
+            elif inp.name in artifact_inputs:
+                annotation = Input[Dataset]
+            else:
+                annotation = _PARAMETER_ANNOTATIONS.get((parameter_types or {}).get(inp.name), str)
+            params.append(inspect.Parameter(in_map[inp.name], inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=annotation))
+        if cache_token:
+            params.append(inspect.Parameter(CACHE_TOKEN_INPUT, inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=str))
+        for out in comp.outputs:
+            params.append(inspect.Parameter(out_map[out.name], inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Output[Dataset]))
+
+        def component_func(*placeholders):
+            ph = dict(zip([p.name for p in params], placeholders))
+            args = []
+            output_names = {o.name for o in comp.outputs}
+            for a in comp.args or []:
+                if a.startswith("{{") and "inputs.parameters." in a:
+                    name = a.split("inputs.parameters.", 1)[1].split("}}", 1)[0]
+                    value = ph[in_map.get(name, _sanitize(name))]
+                    if name in artifact_inputs and name not in list_inputs:
+                        value = value.path
+                    args.append(value)
+                elif a.startswith("/tmp/outputs/") and a[len("/tmp/outputs/"):] in output_names:
+                    args.append(ph[out_map[a[len("/tmp/outputs/"):]]].path)
+                else:
+                    args.append(str(a))
+            return dsl.ContainerSpec(image=comp.image, command=list(comp.command or []) or None, args=args or None)
+
+        component_func.__name__ = _sanitize(comp.name)
+        component_func.__signature__ = inspect.Signature(params)
+        component_func.__annotations__ = {p.name: p.annotation for p in params}
+        return dsl.container_component(component_func), in_map, out_map
+
+    # Artifact ports have no default, so they come first
+    port_params = [(_sanitize(p.name), p.name in artifact_ports) for p in in_ports]
+    param_names = ([name for name, is_artifact in port_params if is_artifact] +
+                   [name for name, _ in fan_out_params.values()] +
+                   [name for name, is_artifact in port_params if not is_artifact])
+    outputs_type = NamedTuple('Outputs', [(_sanitize(p.name), Dataset) for p in out_ports]) if out_ports else None
+
+    def dynamic_pipeline(*param_values):
         tasks = {}
+        pipeline_params = dict(zip(param_names, param_values))
+
+        def bind_inputs(node: PipelineNode, incoming_edges: list, in_map: Dict[str, str], list_inputs: Set[str],
+                        input_specs: Optional[Dict[str, InputSpec]] = None) -> dict:
+            kwargs = {}
+            # Edge-based inputs
+            for edge in incoming_edges:
+                source_task = tasks.get(edge.source)
+                if source_task and edge.sourceHandle:
+                    target_key = in_map.get(edge.targetHandle, _sanitize(edge.targetHandle))
+                    src_out_key = _sanitize(edge.sourceHandle)
+                    if edge.targetHandle in list_inputs:
+                        # Fan-in: gather the output of every loop iteration
+                        kwargs[target_key] = dsl.Collected(source_task.outputs[src_out_key])
+                    else:
+                        kwargs[target_key] = source_task.outputs[src_out_key]
+                elif edge.source not in selected and edge.sourceHandle:
+                    # Upstream node skipped in a partial run: reuse its previous output
+                    target_key = in_map.get(edge.targetHandle, _sanitize(edge.targetHandle))
+                    artifact_class = _artifact_class((input_specs or {}).get(target_key))
+                    imp = dsl.importer(artifact_uri=_upstream_uri(edge.source, edge.sourceHandle), artifact_class=artifact_class)
+                    kwargs[target_key] = imp.outputs['artifact']
+            # Inputs fed through this pipeline's own ports when it is nested
+            for handle, param_name, _ in port_inputs.get(node.id, []):
+                kwargs.setdefault(in_map.get(handle, _sanitize(handle)), pipeline_params[param_name])
+            return kwargs
         
         # Build adjacency list for topological sort
         adj_list = {node.id: [] for node in pipeline.nodes}
@@ -116,66 +522,112 @@ def compile_pipeline(pipeline: Pipeline) -> str:
             
         # Create tasks in topological order
         for node_id in sorted_nodes:
+            if node_id not in selected:
+                continue
             # Find the node object
             node = next(n for n in pipeline.nodes if n.id == node_id)
-            comp = component_map[node.component_id]
             incoming_edges = [e for e in pipeline.edges if e.target == node.id and e.targetHandle]
-            artifact_inputs = set(e.targetHandle for e in incoming_edges if e.targetHandle)
+            if node.kind == 'pipeline':
+                comp_func, sub, sub_in = nested_components[node.id]
+                in_map = {p.name: _sanitize(p.name) for p in sub_in}
+                kwargs = bind_inputs(node, incoming_edges, in_map, set())
+                for arg_name, arg_value in (node.args or {}).items():
+                    key = in_map.get(arg_name)
+                    if key and key not in kwargs and arg_value:
+                        if arg_value.startswith('s3://'):
+                            kwargs[key] = dsl.importer(artifact_uri=arg_value, artifact_class=dsl.Dataset).outputs['artifact']
+                        else:
+                            kwargs[key] = arg_value
+                task = comp_func(**kwargs)
+                task.set_display_name(f"{node.id}-{sub.name}")
+                tasks[node.id] = task
+                for edge in pipeline.edges:
+                    if edge.target == node.id and tasks.get(edge.source):
+                        task.after(tasks[edge.source])
+                continue
+            comp = component_map[node.component_id]
+            # Parameter outputs of imported specs feed parameter inputs of their type, not artifacts
+            parameter_types = {e.targetHandle: parameter_outputs[(e.source, e.sourceHandle)]
+                               for e in incoming_edges if (e.source, e.sourceHandle) in parameter_outputs}
+            artifact_inputs = set(e.targetHandle for e in incoming_edges
+                                  if e.targetHandle and e.targetHandle not in parameter_types)
+            artifact_inputs |= {handle for handle, _, is_artifact in port_inputs.get(node.id, []) if is_artifact}
             importer_inputs = set()
             if node.args:
                 for arg_name, arg_value in node.args.items():
                     if isinstance(arg_value, str) and arg_value.startswith('s3://'):
                         importer_inputs.add(arg_name)
-            if (not comp.command) and (not comp.args):
+            if not comp.spec and (not comp.command) and (not comp.args):
                 raise ValueError(f"Component '{comp.name}' has empty command and args; please provide at least one")
-            spec_text, in_map, out_map = _build_component_yaml(comp, artifact_inputs | importer_inputs)
-            comp_func = load_component_from_text(spec_text)
+            caching = _resolve_caching(comp, node)
+            cache_token = None
+            if caching.enabled and caching.max_staleness:
+                cache_token = lineage.cache_token(pipeline.id, node.id, parse_duration(caching.max_staleness))
+            list_inputs = set()
+            if node.kind == 'collect':
+                list_inputs = set(e.targetHandle for e in incoming_edges if node_kinds.get(e.source) == 'parallel_for' and e.sourceHandle)
+            input_specs = None
+            if comp.spec:
+                comp_func = _spec_component(comp.spec, cache_token is not None)
+                input_specs = comp_func.component_spec.inputs or {}
+                in_map = {name: name for name in input_specs}
+            elif list_inputs:
+                comp_func, in_map, out_map = _build_container_component(comp, artifact_inputs | importer_inputs, list_inputs, cache_token is not None,
+                                                                       parameter_types)
+            else:
+                spec_text, in_map, out_map = _build_component_yaml(comp, artifact_inputs | importer_inputs, cache_token is not None,
+                                                                 parameter_types)
+                comp_func = load_component_from_text(spec_text)
             # Build kwargs for component call
-            kwargs = {}
-            # Edge-based inputs
-            for edge in incoming_edges:
-                source_task = tasks.get(edge.source)
-                if source_task and edge.sourceHandle:
-                    target_key = in_map.get(edge.targetHandle, _sanitize(edge.targetHandle))
-                    src_out_key = _sanitize(edge.sourceHandle)
-                    kwargs[target_key] = source_task.outputs[src_out_key]
+            kwargs = bind_inputs(node, incoming_edges, in_map, list_inputs, input_specs)
+            if cache_token is not None:
+                kwargs[CACHE_TOKEN_INPUT] = cache_token
             # Constant inputs from node.args
             if node.args:
                 for arg_name, arg_value in node.args.items():
                     key = in_map.get(arg_name, _sanitize(arg_name))
                     if key not in kwargs:
-                        if isinstance(arg_value, str) and arg_value.startswith('s3://'):
+                        if input_specs is not None:
+                            kwargs[key] = _spec_argument(node, arg_name, input_specs.get(key), arg_value)
+                        elif isinstance(arg_value, str) and arg_value.startswith('s3://'):
                             imp = dsl.importer(artifact_uri=arg_value, artifact_class=dsl.Dataset)
                             kwargs[key] = imp.outputs['artifact']
                         else:
                             kwargs[key] = arg_value
-            task = comp_func(**kwargs)
+            if node.kind == 'parallel_for':
+                param_name, _ = fan_out_params[node.id]
+                loop_key = in_map.get(node.loop_input, _sanitize(node.loop_input))
+                with dsl.ParallelFor(pipeline_params[param_name], parallelism=node.parallelism or 0) as item:
+                    kwargs[loop_key] = item
+                    task = comp_func(**kwargs)
+            else:
+                task = comp_func(**kwargs)
             # Ensure task display name contains node id for status mapping
             try:
                 task.set_display_name(f"{node.id}-{comp.name}")
             except Exception:
                 pass
 
-            # Auto-inject MinIO environment variables and credentials
+            # Object-store access from the node's storage profile (Component default, Node override)
+            profile = storage_profiles.resolve(node.storage_profile or comp.storage_profile)
             try:
-                task.set_env_variable('AWS_REGION', 'us-east-1')
-                task.set_env_variable('AWS_ENDPOINT_URL', 'http://10.96.2.78:9000')
-                task.set_env_variable('AWS_ENDPOINT_URL_S3', 'http://10.96.2.78:9000')
-                task.set_env_variable('S3_FORCE_PATH_STYLE', 'true')
-                task.set_env_variable('AWS_S3_FORCE_PATH_STYLE', 'true')
-                task.set_env_variable('AWS_USE_PATH_STYLE_REQUESTS', 'true')
-                task.set_env_variable('AWS_S3_USE_PATH_STYLE', 'true')
-                kubernetes.use_secret_as_env(
-                    task=task,
-                    secret_name='mlpipeline-minio-artifact',
-                    secret_key_to_env={
-                        'accesskey': 'AWS_ACCESS_KEY_ID',
-                        'secretkey': 'AWS_SECRET_ACCESS_KEY'
-                    }
-                )
-                task.set_caching_options(False)
+                for env_name, env_value in storage_profiles.env_spec(profile.name, node.node_pool):
+                    task.set_env_variable(env_name, env_value)
+                if profile.secret_name:
+                    kubernetes.use_secret_as_env(
+                        task=task,
+                        secret_name=profile.secret_name,
+                        secret_key_to_env={
+                            profile.access_key_field: 'AWS_ACCESS_KEY_ID',
+                            profile.secret_key_field: 'AWS_SECRET_ACCESS_KEY'
+                        }
+                    )
             except Exception:
                 pass
+            if node.node_pool:
+                kubernetes.add_node_selector(task, label_key=storage_profiles.node_pool_label(), label_value=node.node_pool)
+
+            task.set_caching_options(caching.enabled)
 
             
             # Set resources (Component defaults)
@@ -183,7 +635,13 @@ def compile_pipeline(pipeline: Pipeline) -> str:
             cpu_limit = comp.resources.cpu_limit
             memory_request = comp.resources.memory_request
             memory_limit = comp.resources.memory_limit
-            gpu_limit = comp.resources.gpu_limit
+            try:
+                gpu_type, gpu_limit = comp.resources.accelerator(node.resources)
+            except ValueError as e:
+                raise ValueError(f"Node {node.label} ({node.id}): {e}")
+            rec = recommended.get(node.component_id) or {}
+            cpu_request = rec.get("cpu_request") or cpu_request
+            memory_request = rec.get("memory_request") or memory_request
 
             # Override with Node specific resources
             if node.resources:
@@ -191,24 +649,49 @@ def compile_pipeline(pipeline: Pipeline) -> str:
                 if node.resources.get("cpu_limit"): cpu_limit = node.resources["cpu_limit"]
                 if node.resources.get("memory_request"): memory_request = node.resources["memory_request"]
                 if node.resources.get("memory_limit"): memory_limit = node.resources["memory_limit"]
-                # GPU override not implemented in UI yet, but logic would be similar
 
-            try:
-                if cpu_request: task.set_cpu_request(cpu_request)
-                if cpu_limit: task.set_cpu_limit(cpu_limit)
-                if memory_request: task.set_memory_request(memory_request)
-                if memory_limit: task.set_memory_limit(memory_limit)
-                if gpu_limit: task.set_gpu_limit(gpu_limit)
-            except Exception:
-                pass
+            # A recommended request above the limit would be rejected by the API server
+            if rec.get("cpu_request") == cpu_request and cpu_limit and \
+                    resource_usage.parse_cpu(cpu_request) > resource_usage.parse_cpu(cpu_limit):
+                cpu_request = cpu_limit
+            if rec.get("memory_request") == memory_request and memory_limit and \
+                    resource_usage.parse_memory(memory_request) > resource_usage.parse_memory(memory_limit):
+                memory_request = memory_limit
+
+            if cpu_request: task.set_cpu_request(cpu_request)
+            if cpu_limit: task.set_cpu_limit(cpu_limit)
+            if memory_request: task.set_memory_request(memory_request)
+            if memory_limit: task.set_memory_limit(memory_limit)
+            if gpu_type: task.set_accelerator_type(gpu_type)
+            if gpu_limit: task.set_accelerator_limit(gpu_limit)
+
+            # Retry and timeout policy (Component defaults, Node overrides)
+            retry = _merge_policy(comp.retry, node.retry)
+            if retry.num_retries:
+                task.set_retry(
+                    num_retries=retry.num_retries,
+                    backoff_duration=retry.backoff_duration,
+                    backoff_factor=retry.backoff_factor,
+                    backoff_max_duration=retry.backoff_max_duration,
+                )
+            timeout = node.timeout or comp.timeout
+            if timeout:
+                kubernetes.set_timeout(task, parse_duration(timeout))
             
             # Volcano annotations
-            try:
-                if comp.volcano_enabled:
-                    task.add_pod_annotation("scheduling.k8s.io/group-name", f"pipeline-{pipeline.id}")
-                    task.add_pod_annotation("schedulerName", "volcano")
-            except Exception:
-                pass
+            if comp.volcano_enabled:
+                width = 1
+                if node.kind == 'parallel_for':
+                    param_name, items = fan_out_params[node.id]
+                    if param_name in (arguments or {}):
+                        items = arguments[param_name]
+                        items = json.loads(items) if isinstance(items, str) else items
+                    elif not items:
+                        # Items left to the run's arguments: unknown until it is submitted
+                        items = None
+                    width = min(node.parallelism or len(items), len(items)) if items is not None else None
+                for key, value in _volcano_annotations(pipeline, node, comp, width, run_key, sweep_id).items():
+                    kubernetes.add_pod_annotation(task, key, value)
             
             tasks[node.id] = task
             
@@ -222,7 +705,41 @@ def compile_pipeline(pipeline: Pipeline) -> str:
                 if source_task:
                     task.after(source_task)
 
-    # 3. Compile
-    output_file = os.path.join(tempfile.gettempdir(), f"{pipeline.id}.yaml")
-    compiler.Compiler().compile(dynamic_pipeline, output_file)
+        if outputs_type is not None:
+            return outputs_type(**{_sanitize(p.name): tasks[p.node_id].outputs[_sanitize(p.handle)] for p in out_ports})
+
+    params = [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Input[Dataset])
+              for name, is_artifact in port_params if is_artifact]
+    params += [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=list, default=items)
+               for name, items in fan_out_params.values()]
+    params += [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=str, default='')
+               for name, is_artifact in port_params if not is_artifact]
+    dynamic_pipeline.__signature__ = inspect.Signature(
+        params, return_annotation=outputs_type if outputs_type is not None else inspect.Signature.empty)
+    dynamic_pipeline.__annotations__ = {p.name: p.annotation for p in params}
+    if outputs_type is not None:
+        dynamic_pipeline.__annotations__['return'] = outputs_type
+
+    # 3. Compile, by default to a file of this compile's own: concurrent runs
+    # of the same pipeline read theirs back after the lock is released
+    own_file = output_file is None
+    if own_file:
+        fd, output_file = tempfile.mkstemp(prefix=f"{pipeline.id}-", suffix=".yaml")
+        os.close(fd)
+    wait_start = time.perf_counter()
+    try:
+        with _compile_lock:
+            COMPILE_PHASE.observe(time.perf_counter() - wait_start, phase="lock_wait")
+            # dsl.pipeline traces the function body, building every task
+            with COMPILE_PHASE.time(phase="trace"):
+                dynamic_pipeline = dsl.pipeline(
+                    name=pipeline.name,
+                    description=pipeline.description
+                )(dynamic_pipeline)
+            with COMPILE_PHASE.time(phase="compile"):
+                compiler.Compiler().compile(dynamic_pipeline, output_file)
+    except BaseException:
+        if own_file:
+            os.remove(output_file)
+        raise
     return output_file
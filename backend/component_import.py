@@ -0,0 +1,55 @@
+"""
+Imports KFP component YAML into the catalog.
+
+Both formats KFP writes are accepted: v1 component YAML (name, inputs,
+outputs, implementation.container) and the v2 IR produced by
+@dsl.component(output_component_file=...) or the KFP compiler, which is how
+v2 Python components are shared. The original YAML is kept in
+Component.spec and the compiler loads it as-is, so artifact and parameter
+types and the Python executor survive; the mapped fields only serve the
+builder, search and local runs.
+"""
+from models import Component, ComponentInput, ComponentOutput
+
+def _type_name(kfp_type: str, is_list: bool = False) -> str:
+    # system.Dataset@0.0.1 -> Dataset; parameter types (String, Integer, ...) as they are
+    name = str(kfp_type or "String").split("@", 1)[0]
+    if name.startswith("system."):
+        name = name[len("system."):]
+    return f"List[{name}]" if is_list else name
+
+def _arg(value) -> str:
+    """A container command/args item in the catalog's own placeholder syntax where there is one."""
+    from kfp.dsl import placeholders
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (placeholders.InputValuePlaceholder, placeholders.InputPathPlaceholder)):
+        return f"{{{{inputs.parameters.{value.input_name}}}}}"
+    if isinstance(value, placeholders.OutputPathPlaceholder):
+        return f"/tmp/outputs/{value.output_name}"
+    # Executor input, concat, if-present, ...: KFP's own rendering
+    to_string = getattr(value, "_to_string", None)
+    return to_string() if to_string else str(value)
+
+def parse_component_yaml(text: str) -> Component:
+    """Maps a KFP component YAML onto a Component that keeps the YAML as its spec."""
+    from kfp.components import load_component_from_text
+    try:
+        spec = load_component_from_text(text).component_spec
+    except Exception as e:
+        raise ValueError(f"Not a valid KFP component: {e}")
+    container = spec.implementation.container if spec.implementation else None
+    if container is None:
+        raise ValueError(f"'{spec.name}' is a pipeline, not a container component")
+    return Component(
+        name=spec.name,
+        description=spec.description,
+        image=container.image,
+        command=[_arg(c) for c in container.command or []] or None,
+        args=[_arg(a) for a in container.args or []] or None,
+        inputs=[ComponentInput(name=name, type=_type_name(i.type, i.is_artifact_list), description=i.description)
+                for name, i in (spec.inputs or {}).items()],
+        outputs=[ComponentOutput(name=name, type=_type_name(o.type, o.is_artifact_list), description=o.description)
+                 for name, o in (spec.outputs or {}).items()],
+        spec=text,
+    )
@@ -0,0 +1,197 @@
+"""
+Search index over the component catalog (SQLite FTS5), so the builder can
+query components server-side instead of downloading the whole catalog.
+
+Name, description, image and input/output names and types are indexed;
+results are ranked with BM25, weighting name matches highest. Input/output
+types are also kept as a facet that can be filtered on. storage keeps the
+index current on every save/delete; at first use it is reconciled with the
+component files, picking up files changed while the server was down.
+"""
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional
+
+from metrics import STORAGE_LATENCY
+from models import Component
+
+SEARCH_DB = os.getenv("SEARCH_DB", os.path.join("data", "search.db"))
+MAX_PAGE_SIZE = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS component_types (
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    PRIMARY KEY (id, type)
+);
+CREATE INDEX IF NOT EXISTS idx_component_types_type ON component_types (type);
+-- Rows share the rowid of their components row: id is not indexed here, so
+-- updates and deletes go by rowid instead of scanning the table
+CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+    id UNINDEXED, name, description, image, io, tokenize = 'unicode61'
+);
+"""
+# Bumped when the schema changes; the index is rebuilt from the component files
+_SCHEMA_VERSION = 1
+
+# bm25() weights per FTS column: id, name, description, image, io
+_WEIGHTS = (0.0, 10.0, 2.0, 3.0, 4.0)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(SEARCH_DB) or ".", exist_ok=True)
+                conn = sqlite3.connect(SEARCH_DB)
+                conn.execute("PRAGMA journal_mode=WAL")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                    conn.executescript("DROP TABLE IF EXISTS components; DROP TABLE IF EXISTS component_types; "
+                                       "DROP TABLE IF EXISTS components_fts;")
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+                conn.close()
+                _initialized = True
+                _reconcile()
+    return sqlite3.connect(SEARCH_DB, timeout=10)
+
+def _types(component: Component) -> List[str]:
+    return sorted({p.type for p in component.inputs + component.outputs if p.type})
+
+def row(component: Component) -> tuple:
+    """The indexed fields of a component: (id, name, description, image, io, types)."""
+    io = " ".join(f"{p.name} {p.type}" for p in component.inputs + component.outputs)
+    return (component.id, component.name, component.description or "", component.image, io, _types(component))
+
+def _write(conn: sqlite3.Connection, fields: tuple, mtime: Optional[float]) -> None:
+    component_id, name, description, image, io, types = fields
+    found = conn.execute("SELECT rowid FROM components WHERE id = ?", (component_id,)).fetchone()
+    if found:
+        rowid = found[0]
+        conn.execute("DELETE FROM components_fts WHERE rowid = ?", (rowid,))
+        conn.execute("UPDATE components SET name = ?, mtime = ? WHERE rowid = ?", (name, mtime, rowid))
+    else:
+        rowid = conn.execute("INSERT INTO components (id, name, mtime) VALUES (?, ?, ?)",
+                             (component_id, name, mtime)).lastrowid
+    conn.execute("DELETE FROM component_types WHERE id = ?", (component_id,))
+    conn.execute("INSERT INTO components_fts (rowid, id, name, description, image, io) VALUES (?, ?, ?, ?, ?, ?)",
+                 (rowid, component_id, name, description, image, io))
+    conn.executemany("INSERT INTO component_types (id, type) VALUES (?, ?)",
+                     [(component_id, t) for t in types])
+
+def _delete(conn: sqlite3.Connection, component_id: str) -> None:
+    conn.execute("DELETE FROM components_fts WHERE rowid = (SELECT rowid FROM components WHERE id = ?)",
+                 (component_id,))
+    conn.execute("DELETE FROM component_types WHERE id = ?", (component_id,))
+    conn.execute("DELETE FROM components WHERE id = ?", (component_id,))
+
+def _reconcile() -> None:
+    # Deferred: storage imports this module to keep the index current
+    import storage
+    on_disk = {}
+    if os.path.isdir(storage.COMPONENTS_DIR):
+        for filename in os.listdir(storage.COMPONENTS_DIR):
+            if filename.endswith(".json"):
+                on_disk[filename[:-len(".json")]] = os.path.getmtime(os.path.join(storage.COMPONENTS_DIR, filename))
+    conn = sqlite3.connect(SEARCH_DB, timeout=10)
+    try:
+        indexed = dict(conn.execute("SELECT id, mtime FROM components").fetchall())
+        with conn:
+            for component_id in indexed.keys() - on_disk.keys():
+                _delete(conn, component_id)
+            for component_id, mtime in on_disk.items():
+                if indexed.get(component_id) != mtime:
+                    comp = storage.get_component(component_id)
+                    if comp:
+                        _write(conn, row(comp), mtime)
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="write", kind="search")
+def index(component: Component, mtime: Optional[float] = None) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            _write(conn, row(component), mtime)
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="write", kind="search")
+def index_rows(rows: List[tuple]) -> None:
+    """Indexes many components in one transaction, from (row(component), mtime) pairs."""
+    conn = _connect()
+    try:
+        with conn:
+            for fields, mtime in rows:
+                _write(conn, fields, mtime)
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="delete", kind="search")
+def remove(component_id: str) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            _delete(conn, component_id)
+    finally:
+        conn.close()
+
+def _match_expression(q: str) -> Optional[str]:
+    # Every word must match, as a prefix, in any column; quoting keeps FTS syntax out of user input
+    words = re.findall(r"\w+", q or "")
+    return " ".join(f'"{w}"*' for w in words) or None
+
+@STORAGE_LATENCY.time(op="read", kind="search")
+def search(q: str = "", type: Optional[str] = None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Returns {total, offset, limit, results: [{id, name, score}], facets: {type: {name: count}}}
+    for components matching every word of q (all components if q is blank),
+    optionally only those with an input or output of the given type.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+    match = _match_expression(q)
+    where, params = [], []
+    if match:
+        where.append("components_fts MATCH ?")
+        params.append(match)
+    if type:
+        # By rowid: id is UNINDEXED in the FTS table, filtering on it scans every row
+        where.append("rowid IN (SELECT c.rowid FROM component_types t JOIN components c ON c.id = t.id "
+                     "WHERE t.type = ?)")
+        params.append(type)
+    clause = f"WHERE {' AND '.join(where)}" if where else ""
+    rank = f"bm25(components_fts, {', '.join(str(w) for w in _WEIGHTS)})" if match else "0"
+    conn = _connect()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM components_fts {clause}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT id, name, {rank} AS score FROM components_fts {clause} "
+                            f"ORDER BY score, name LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        # Facet counts over the text matches, before the type filter
+        if match:
+            facets = conn.execute("SELECT t.type, COUNT(*) FROM components_fts f JOIN components c ON c.rowid = f.rowid "
+                                  "JOIN component_types t ON t.id = c.id WHERE components_fts MATCH ? "
+                                  "GROUP BY t.type ORDER BY COUNT(*) DESC, t.type", [match]).fetchall()
+        else:
+            facets = conn.execute("SELECT type, COUNT(*) FROM component_types "
+                                  "GROUP BY type ORDER BY COUNT(*) DESC, type").fetchall()
+    finally:
+        conn.close()
+    return {
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        # bm25() is lower for better matches; report higher-is-better
+        "results": [{"id": r[0], "name": r[1], "score": -r[2]} for r in rows],
+        "facets": {"type": dict(facets)},
+    }
@@ -1,18 +1,43 @@
 import os
-from kfp import Client
 import json
 from urllib.request import urlopen, Request
 from urllib.parse import urlencode
+from functools import wraps
+from metrics import KFP_CALL_LATENCY, KFP_CALL_ERRORS, KFP_STATUS_STRATEGY
 
 KFP_ENDPOINT = os.getenv("KFP_ENDPOINT", "http://localhost:30088")
 PIPELINE_ROOT = os.getenv("PIPELINE_ROOT", os.getenv("KFP_PIPELINE_ROOT", "s3://mlpipeline/test-pipeline-root"))
 
-def submit_pipeline(pipeline_file_path: str, run_name: str):
-    client = Client(host=KFP_ENDPOINT)
+def _client():
+    # Imported on first use; the SDK pulls in protobuf and the generated API
+    # client, which would otherwise slow down every backend start
+    from kfp import Client
+    return Client(host=KFP_ENDPOINT)
+
+def _instrumented(call: str):
+    # Times each upstream call and counts the ones that raise
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with KFP_CALL_LATENCY.time(call=call):
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    KFP_CALL_ERRORS.inc(call=call)
+                    raise
+        return wrapper
+    return decorator
+
+def _strategy(call: str, strategy: str) -> None:
+    KFP_STATUS_STRATEGY.inc(call=call, strategy=strategy)
+
+@_instrumented("submit_pipeline")
+def submit_pipeline(pipeline_file_path: str, run_name: str, arguments: dict = None):
+    client = _client()
     try:
         run_result = client.create_run_from_pipeline_package(
             pipeline_file=pipeline_file_path,
-            arguments={},
+            arguments=arguments or {},
             run_name=run_name,
             experiment_name="Default",
             pipeline_root=PIPELINE_ROOT,
@@ -22,8 +47,9 @@ def submit_pipeline(pipeline_file_path: str, run_name: str):
         print(f"Failed to submit pipeline: {e}")
         raise e
 
+@_instrumented("get_run_status")
 def get_run_status(run_id: str) -> str:
-    client = Client(host=KFP_ENDPOINT)
+    client = _client()
     try:
         run = client.get_run(run_id)
         # Try common attributes across KFP v1/v2
@@ -34,6 +60,7 @@ def get_run_status(run_id: str) -> str:
                 try:
                     val = getattr(obj, attr)
                     if isinstance(val, str) and val:
+                        _strategy("get_run_status", "attribute")
                         return val
                 except Exception:
                     pass
@@ -43,6 +70,7 @@ def get_run_status(run_id: str) -> str:
                 d = run.to_dict()
                 status = d.get('state') or d.get('status') or (d.get('run') or {}).get('state') or (d.get('run') or {}).get('status')
                 if status:
+                    _strategy("get_run_status", "to_dict")
                     return status
         except Exception:
             pass
@@ -52,16 +80,19 @@ def get_run_status(run_id: str) -> str:
                 jd = json.loads(run.to_json())
                 status = jd.get('state') or jd.get('status') or (jd.get('run') or {}).get('state') or (jd.get('run') or {}).get('status')
                 if status:
+                    _strategy("get_run_status", "to_json")
                     return status
         except Exception:
             pass
+        _strategy("get_run_status", "none")
         return "unknown"
     except Exception as e:
         print(f"Failed to get run status: {e}")
         raise e
 
+@_instrumented("get_run_node_statuses")
 def get_run_node_statuses(run_id: str) -> dict:
-    client = Client(host=KFP_ENDPOINT)
+    client = _client()
     try:
         run = client.get_run(run_id)
         # v1 (Argo) path: parse workflow_manifest
@@ -79,6 +110,7 @@ def get_run_node_statuses(run_id: str) -> dict:
                     if name and phase:
                         result[name] = phase
                 if result:
+                    _strategy("get_run_node_statuses", "workflow_manifest")
                     return result
         except Exception:
             pass
@@ -113,6 +145,7 @@ def get_run_node_statuses(run_id: str) -> dict:
                     walk(v)
         walk(d)
         if result:
+            _strategy("get_run_node_statuses", "dict_walk")
             return result
         # v2 SDK: parse run_details if present
         try:
@@ -135,6 +168,7 @@ def get_run_node_statuses(run_id: str) -> dict:
                     if name and st:
                         out[name] = st
                 if out:
+                    _strategy("get_run_node_statuses", "run_details")
                     return out
         except Exception:
             pass
@@ -164,8 +198,97 @@ def get_run_node_statuses(run_id: str) -> dict:
         for p in rest_paths:
             out = try_v2_task_runs(p)
             if out:
+                _strategy("get_run_node_statuses", f"rest_{p.rsplit('/', 1)[-1]}")
                 return out
+        _strategy("get_run_node_statuses", "none")
         return {}
     except Exception as e:
         print(f"Failed to get run node statuses: {e}")
         raise e
+
+@_instrumented("get_artifact")
+def _get_artifact_uri(artifact_id: str):
+    for path in ('/apis/v2beta1/artifacts', '/pipeline/apis/v2beta1/artifacts'):
+        try:
+            req = Request(f"{KFP_ENDPOINT}{path}/{artifact_id}")
+            with urlopen(req) as resp:
+                data = json.loads(resp.read().decode('utf-8'))
+                uri = data.get('uri') or (data.get('artifact') or {}).get('uri')
+                if uri:
+                    return uri
+        except Exception:
+            pass
+    return None
+
+@_instrumented("get_run_artifacts")
+def get_run_artifacts(run_id: str) -> dict:
+    """
+    Returns {task display name: {output name: artifact uri}} for the outputs
+    recorded in a run's task details.
+    """
+    client = _client()
+    try:
+        run = client.get_run(run_id)
+        rd = getattr(run, 'run_details', None)
+        dd = None
+        if rd is not None:
+            if isinstance(rd, dict):
+                dd = rd
+            elif hasattr(rd, 'to_dict'):
+                dd = rd.to_dict()
+            elif hasattr(rd, 'to_json'):
+                dd = json.loads(rd.to_json())
+        result = {}
+        for it in (dd or {}).get('task_details') or []:
+            name = it.get('display_name') or it.get('task_name') or it.get('name')
+            if not name:
+                continue
+            for out_name, art_list in (it.get('outputs') or {}).items():
+                art_list = art_list or {}
+                # Some servers inline the artifacts, others only reference them by id
+                uris = [a.get('uri') for a in art_list.get('artifacts') or [] if a.get('uri')]
+                if not uris:
+                    uris = [_get_artifact_uri(a) for a in art_list.get('artifact_ids') or []]
+                uris = [u for u in uris if u]
+                if uris:
+                    result.setdefault(name, {})[out_name] = uris[0]
+        return result
+    except Exception as e:
+        print(f"Failed to get run artifacts: {e}")
+        raise e
+
+@_instrumented("get_run_tasks")
+def get_run_task_details(run_id: str) -> list:
+    """
+    Returns [{name, state, start_time, end_time, pods}] for the tasks in a
+    run's details; times are datetimes or RFC 3339 strings as the server
+    reports them, pods the names of the task's pods.
+    """
+    client = _client()
+    try:
+        run = client.get_run(run_id)
+        rd = getattr(run, 'run_details', None)
+        dd = None
+        if rd is not None:
+            if isinstance(rd, dict):
+                dd = rd
+            elif hasattr(rd, 'to_dict'):
+                dd = rd.to_dict()
+            elif hasattr(rd, 'to_json'):
+                dd = json.loads(rd.to_json())
+        tasks = []
+        for it in (dd or {}).get('task_details') or []:
+            name = it.get('display_name') or it.get('task_name') or it.get('name')
+            if not name:
+                continue
+            tasks.append({
+                'name': name,
+                'state': it.get('state'),
+                'start_time': it.get('start_time'),
+                'end_time': it.get('end_time'),
+                'pods': [c.get('pod_name') for c in it.get('child_tasks') or [] if c.get('pod_name')],
+            })
+        return tasks
+    except Exception as e:
+        print(f"Failed to get run task details: {e}")
+        raise e
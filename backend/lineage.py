@@ -0,0 +1,255 @@
+"""
+Local artifact lineage index (SQLite). Records which run/node consumed or
+produced an artifact URI, so lookups are index hits instead of KFP scans.
+
+Inputs are recorded at submit time from the compiled spec (importer tasks and
+the tasks they feed); outputs are recorded once a run reaches a terminal state,
+from the run's task details. Runs submitted but not completed are what
+run_watcher polls.
+
+It also keeps each cached node's cache token (see cache_token), which
+decides which of the node's cached results a compile may reuse.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import yaml
+
+from metrics import STORAGE_LATENCY
+from run_states import TERMINAL_STATES
+
+LINEAGE_DB = os.getenv("LINEAGE_DB", os.path.join("data", "lineage.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    pipeline_id TEXT NOT NULL,
+    submitted_at REAL,
+    completed_at REAL,
+    state TEXT
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    uri TEXT NOT NULL,
+    pipeline_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    node_id TEXT,
+    task TEXT NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL,
+    source TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    UNIQUE (run_id, task, role, name, uri)
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_uri ON artifacts (uri);
+CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (pipeline_id, run_id);
+CREATE TABLE IF NOT EXISTS cache_tokens (
+    pipeline_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    token TEXT NOT NULL,
+    issued_at REAL NOT NULL,
+    PRIMARY KEY (pipeline_id, node_id)
+);
+"""
+
+_COLUMNS = ("uri", "pipeline_id", "run_id", "node_id", "task", "name", "role", "source", "recorded_at")
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM artifacts"
+_INSERT = f"INSERT OR IGNORE INTO artifacts ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(LINEAGE_DB) or ".", exist_ok=True)
+                conn = sqlite3.connect(LINEAGE_DB)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                conn.close()
+                _initialized = True
+    # One short-lived connection per call; WAL lets readers run alongside a writer
+    return sqlite3.connect(LINEAGE_DB, timeout=10)
+
+def _node_id(task_name: str, node_ids: Iterable[str]) -> Optional[str]:
+    # Compiled tasks are displayed as <node_id>-<component name>
+    prefix = task_name.split("-", 1)[0]
+    return prefix if prefix in node_ids else None
+
+def spec_inputs(pipeline_spec: dict) -> List[tuple]:
+    """
+    Returns [(task display name, input name, uri)] for every task fed by an
+    importer in the compiled spec, following artifacts into nested DAGs
+    (e.g. ParallelFor bodies).
+    """
+    components = pipeline_spec.get("components") or {}
+    executors = (pipeline_spec.get("deploymentSpec") or {}).get("executors") or {}
+    importer_uris = {}
+    for label, executor in executors.items():
+        uri = (((executor.get("importer") or {}).get("artifactUri") or {}).get("constant"))
+        if isinstance(uri, str):
+            importer_uris[label] = uri
+
+    found = []
+
+    def walk(dag: dict, channels: Dict[str, str]):
+        tasks = dag.get("tasks") or {}
+        producers = {}
+        for name, task in tasks.items():
+            comp = components.get((task.get("componentRef") or {}).get("name")) or {}
+            if comp.get("executorLabel") in importer_uris:
+                producers[name] = importer_uris[comp["executorLabel"]]
+        for name, task in tasks.items():
+            if name in producers:
+                continue
+            resolved = {}
+            for in_name, spec in ((task.get("inputs") or {}).get("artifacts") or {}).items():
+                upstream = spec.get("taskOutputArtifact")
+                if upstream and upstream.get("producerTask") in producers:
+                    resolved[in_name] = producers[upstream["producerTask"]]
+                elif spec.get("componentInputArtifact") in channels:
+                    resolved[in_name] = channels[spec["componentInputArtifact"]]
+            comp = components.get((task.get("componentRef") or {}).get("name")) or {}
+            if "dag" in comp:
+                walk(comp["dag"], resolved)
+            else:
+                display = (task.get("taskInfo") or {}).get("name") or name
+                found.extend((display, in_name, uri) for in_name, uri in resolved.items())
+
+    walk((pipeline_spec.get("root") or {}).get("dag") or {}, {})
+    return found
+
+@STORAGE_LATENCY.time(op="write", kind="lineage")
+def record_submission(pipeline, run_id: str, pipeline_file_path: str) -> int:
+    """Indexes the artifacts a submitted run consumes; returns the number of rows added."""
+    with open(pipeline_file_path, "r") as f:
+        # The pipeline spec is the first document; a platform spec may follow
+        spec = next(iter(yaml.safe_load_all(f)), None) or {}
+    node_ids = {n.id for n in pipeline.nodes}
+    now = time.time()
+    rows = [(uri, pipeline.id, run_id, _node_id(task, node_ids), task, name, "input", "spec", now)
+            for task, name, uri in spec_inputs(spec)]
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO runs (run_id, pipeline_id, submitted_at) VALUES (?, ?, ?)",
+                         (run_id, pipeline.id, now))
+            before = conn.total_changes
+            conn.executemany(_INSERT, rows)
+            return conn.total_changes - before
+    finally:
+        conn.close()
+
+def is_completed(run_id: str) -> bool:
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT completed_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return bool(row and row[0])
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="read", kind="lineage")
+def pending_runs(submitted_after: float = 0.0) -> List[tuple]:
+    """(run_id, pipeline_id) of runs submitted after the given time whose outputs are not indexed yet."""
+    conn = _connect()
+    try:
+        return conn.execute("SELECT run_id, pipeline_id FROM runs WHERE completed_at IS NULL AND submitted_at >= ? "
+                            "ORDER BY submitted_at", (submitted_after,)).fetchall()
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="write", kind="lineage")
+def record_completion(pipeline, run_id: str, state: str, artifacts_by_task: dict) -> int:
+    """
+    Indexes a finished run's outputs from {task display name: {output name: uri}}
+    and marks the run completed so it is not fetched again.
+    """
+    node_ids = {n.id for n in pipeline.nodes}
+    now = time.time()
+    rows = [(uri, pipeline.id, run_id, _node_id(task, node_ids), task, name, "output", "run_details", now)
+            for task, outputs in (artifacts_by_task or {}).items()
+            for name, uri in (outputs or {}).items() if uri]
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO runs (run_id, pipeline_id) VALUES (?, ?)", (run_id, pipeline.id))
+            conn.execute("UPDATE runs SET completed_at = ?, state = ? WHERE run_id = ?", (now, state, run_id))
+            before = conn.total_changes
+            conn.executemany(_INSERT, rows)
+            return conn.total_changes - before
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="read", kind="lineage")
+def latest_outputs(pipeline_id: str) -> Dict[str, Dict[str, str]]:
+    """{node_id: {output name: uri}} of the pipeline, each from the last indexed run that produced it."""
+    conn = _connect()
+    try:
+        cur = conn.execute("SELECT node_id, name, uri FROM artifacts WHERE pipeline_id = ? AND role = 'output' "
+                           "AND node_id IS NOT NULL ORDER BY recorded_at", (pipeline_id,))
+        outputs = {}
+        for node_id, name, uri in cur:
+            outputs.setdefault(node_id, {})[name] = uri
+        return outputs
+    finally:
+        conn.close()
+
+def _rows(cursor) -> List[dict]:
+    return [dict(zip(_COLUMNS, r)) for r in cursor.fetchall()]
+
+@STORAGE_LATENCY.time(op="read", kind="lineage")
+def find_by_uri(uri: str, prefix: bool = False) -> List[dict]:
+    """Runs/nodes that consumed or produced uri (or any uri under it with prefix=True)."""
+    conn = _connect()
+    try:
+        if prefix:
+            # Range scan on idx_artifacts_uri rather than LIKE, which can't use the index
+            cur = conn.execute(_SELECT + " WHERE uri >= ? AND uri < ? "
+                               "ORDER BY recorded_at, uri", (uri, uri + "\U0010ffff"))
+        else:
+            cur = conn.execute(_SELECT + " WHERE uri = ? ORDER BY recorded_at",
+                               (uri,))
+        return _rows(cur)
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="read", kind="lineage")
+def get_run(pipeline_id: str, run_id: str) -> Optional[dict]:
+    """Returns the run's index entry with its artifacts, or None if the run was never indexed."""
+    conn = _connect()
+    try:
+        run = conn.execute("SELECT submitted_at, completed_at, state FROM runs WHERE run_id = ? AND pipeline_id = ?",
+                           (run_id, pipeline_id)).fetchone()
+        if not run:
+            return None
+        artifacts = _rows(conn.execute(_SELECT + " WHERE pipeline_id = ? AND run_id = ? "
+                                       "ORDER BY role, task, name", (pipeline_id, run_id)))
+        return {"submitted_at": run[0], "completed_at": run[1], "state": run[2], "artifacts": artifacts}
+    finally:
+        conn.close()
+
+@STORAGE_LATENCY.time(op="write", kind="lineage")
+def cache_token(pipeline_id: str, node_id: str, max_age_s: float) -> str:
+    """
+    The node's cache token: the current one while it was issued less than
+    max_age_s ago, else a new one. Compiles feed it to the task as an input,
+    so it is part of KFP's cache fingerprint: a cached result is only reused
+    by tasks with the token it ran under, and since the token predates the
+    result, no result older than max_age_s is reused.
+    """
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("INSERT INTO cache_tokens (pipeline_id, node_id, token, issued_at) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (pipeline_id, node_id) DO UPDATE SET token = excluded.token, "
+                         "issued_at = excluded.issued_at WHERE cache_tokens.issued_at <= ?",
+                         (pipeline_id, node_id, f"{now:.6f}", now, now - max_age_s))
+            return conn.execute("SELECT token FROM cache_tokens WHERE pipeline_id = ? AND node_id = ?",
+                                (pipeline_id, node_id)).fetchone()[0]
+    finally:
+        conn.close()
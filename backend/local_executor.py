@@ -0,0 +1,330 @@
+"""
+Runs a Pipeline on this machine without a KFP cluster.
+
+Each node's command/args run as a subprocess (the component image is not
+used, so scripts must exist locally; LOCAL_PATH_MAP rewrites path prefixes
+such as /app). Nodes whose upstream nodes have finished run concurrently,
+at most LOCAL_MAX_WORKERS at a time; the iterations of a fan-out node run
+concurrently as well, at most its parallelism (LOCAL_MAX_WORKERS if unset)
+at a time, on top of the other running nodes. Artifacts are plain directories under
+the run directory, and s3://bucket/key arguments resolve to
+LOCAL_S3_ROOT/bucket/key. Node states use the same names as KFP so they can
+be served through /nodes/status unchanged.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+from models import Pipeline, PipelineNode, Component
+import storage
+import resource_usage
+
+LOCAL_RUNS_DIR = os.getenv("LOCAL_RUNS_DIR", os.path.join("data", "local_runs"))
+LOCAL_S3_ROOT = os.getenv("LOCAL_S3_ROOT", os.path.join("data", "local_s3"))
+LOCAL_MAX_WORKERS = int(os.getenv("LOCAL_MAX_WORKERS", str(os.cpu_count() or 2)))
+# Semicolon separated prefix rewrites, e.g. "/app=example/mnist_kubeflow_volcano/components/train"
+LOCAL_PATH_MAP = os.getenv("LOCAL_PATH_MAP", "")
+
+RUN_ID_PREFIX = "local-"
+
+_runs_lock = threading.Lock()
+_node_states: Dict[str, Dict[str, str]] = {}
+
+def is_local_run(run_id: Optional[str]) -> bool:
+    return bool(run_id) and run_id.startswith(RUN_ID_PREFIX)
+
+def _run_dir(run_id: str) -> str:
+    # Absolute so scripts that change directory still find their inputs
+    return os.path.abspath(os.path.join(LOCAL_RUNS_DIR, run_id))
+
+def node_log_path(run_id: str, node_id: str) -> str:
+    return os.path.join(_run_dir(run_id), node_id, "log.txt")
+
+def _parse_path_map(spec: str) -> List[tuple]:
+    pairs = []
+    for item in spec.split(";"):
+        if "=" in item:
+            src, dst = item.split("=", 1)
+            pairs.append((src.strip(), dst.strip()))
+    return pairs
+
+def _rewrite_path(token: str, path_map: List[tuple]) -> str:
+    for src, dst in path_map:
+        if token == src or token.startswith(src.rstrip("/") + "/"):
+            return dst + token[len(src):]
+    return token
+
+def s3_to_local(uri: str) -> str:
+    return os.path.abspath(os.path.join(LOCAL_S3_ROOT, uri[len("s3://"):]))
+
+def node_output_dir(run_id: str, node_id: str, output_name: str) -> str:
+    return os.path.join(_run_dir(run_id), node_id, "outputs", output_name)
+
+def _set_state(run_id: str, node_id: str, state: str) -> None:
+    with _runs_lock:
+        states = _node_states.setdefault(run_id, {})
+        states[node_id] = state
+        # Persisted so statuses survive a backend restart; written under the
+        # lock and swapped in whole, so an older snapshot never lands last
+        status_path = os.path.join(_run_dir(run_id), "status.json")
+        with open(status_path + ".tmp", "w") as f:
+            json.dump(states, f)
+        os.replace(status_path + ".tmp", status_path)
+
+def build_command(run_id: str, pipeline: Pipeline, node: PipelineNode, comp: Component,
+                  path_map: List[tuple], loop_item: Optional[str] = None,
+                  iteration: Optional[int] = None) -> List[str]:
+    """
+    Resolves a node's command and args the same way the compiler maps them
+    to KFP placeholders, but onto local paths and values.
+    """
+    inputs = {}
+    for edge in pipeline.edges:
+        if edge.target == node.id and edge.sourceHandle and edge.targetHandle:
+            inputs[edge.targetHandle] = node_output_dir(run_id, edge.source, edge.sourceHandle)
+    for arg_name, arg_value in (node.args or {}).items():
+        if arg_name in inputs:
+            continue
+        if isinstance(arg_value, str) and arg_value.startswith("s3://"):
+            arg_value = s3_to_local(arg_value)
+        inputs[arg_name] = arg_value
+    if node.kind == "parallel_for" and node.loop_input:
+        inputs[node.loop_input] = loop_item
+
+    def out_dir(name: str) -> str:
+        path = node_output_dir(run_id, node.id, name)
+        if iteration is not None:
+            path = os.path.join(path, str(iteration))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    output_names = {o.name for o in comp.outputs}
+    cmd = []
+    for a in list(comp.command or []) + list(comp.args or []):
+        if a.startswith("{{") and "inputs.parameters." in a:
+            name = a.split("inputs.parameters.", 1)[1].split("}}", 1)[0]
+            value = inputs.get(name)
+            if value is None:
+                raise ValueError(f"Input '{name}' of node {node.id} has no value")
+            cmd.append(str(value))
+        elif a.startswith("/tmp/outputs/") and a[len("/tmp/outputs/"):] in output_names:
+            cmd.append(out_dir(a[len("/tmp/outputs/"):]))
+        else:
+            cmd.append(_rewrite_path(str(a), path_map))
+    if cmd and cmd[0] == "python":
+        # Run scripts with the backend's interpreter rather than whatever is on PATH
+        cmd[0] = sys.executable
+    return cmd
+
+def _run_measured(cmd: List[str], log) -> tuple:
+    """
+    Runs cmd and returns (exit code, {cpu_cores, memory_bytes, duration_s}).
+    Usage comes from the child's rusage where os.wait4 exists; elsewhere only
+    the duration is measured.
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    if not hasattr(os, "wait4"):
+        code = proc.wait()
+        return code, {"duration_s": time.monotonic() - start}
+    _, status, ru = os.wait4(proc.pid, 0)
+    duration = max(time.monotonic() - start, 1e-3)
+    proc.returncode = code = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in KiB on Linux
+    return code, {"cpu_cores": (ru.ru_utime + ru.ru_stime) / duration, "memory_bytes": ru.ru_maxrss * 1024,
+                  "duration_s": duration}
+
+def _run_iterations(invocations: List[List[str]], parallelism: int, log_path: str) -> tuple:
+    """
+    Runs a fan-out node's iterations, at most parallelism at a time, and
+    returns (all succeeded, largest usage of any iteration). Each iteration
+    logs to its own file, appended to the node's log once it finishes. No
+    further iterations start once one has failed.
+    """
+    failed = threading.Event()
+    log_lock = threading.Lock()
+
+    def run(i: int, cmd: List[str]):
+        if failed.is_set():
+            return None
+        part_path = f"{log_path}.{i}"
+        with open(part_path, "w+") as log:
+            log.write(f"$ {' '.join(cmd)}\n")
+            log.flush()
+            code, used = _run_measured(cmd, log)
+            log.seek(0)
+            text = log.read()
+        os.remove(part_path)
+        with log_lock, open(log_path, "a") as log:
+            log.write(text)
+        if code != 0:
+            failed.set()
+        return used
+
+    measured = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(invocations)))) as pool:
+        for used in pool.map(run, range(len(invocations)), invocations):
+            # Each iteration is a pod of its own on KFP; size for the largest
+            for k, v in (used or {}).items():
+                measured[k] = max(measured.get(k, 0), v)
+    return not failed.is_set(), measured
+
+def _run_node(run_id: str, pipeline: Pipeline, node: PipelineNode, comp: Component, path_map: List[tuple],
+              usage: Optional[Dict[str, dict]] = None) -> bool:
+    _set_state(run_id, node.id, "RUNNING")
+    log_path = node_log_path(run_id, node.id)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    if node.kind == "parallel_for":
+        items = json.loads((node.args or {}).get(node.loop_input) or "[]")
+        invocations = [build_command(run_id, pipeline, node, comp, path_map, str(item), i) for i, item in enumerate(items)]
+        open(log_path, "w").close()
+        ok, measured = _run_iterations(invocations, node.parallelism or LOCAL_MAX_WORKERS, log_path)
+    else:
+        cmd = build_command(run_id, pipeline, node, comp, path_map)
+        with open(log_path, "w") as log:
+            log.write(f"$ {' '.join(cmd)}\n")
+            log.flush()
+            code, measured = _run_measured(cmd, log)
+        ok = code == 0
+    if ok and usage is not None:
+        usage[node.id] = measured
+    _set_state(run_id, node.id, "SUCCEEDED" if ok else "FAILED")
+    return ok
+
+def execute(run_id: str, pipeline: Pipeline, max_workers: Optional[int] = None, path_map: Optional[str] = None) -> Dict[str, str]:
+    """
+    Runs the pipeline to completion and returns {node_id: state}.
+    Downstream nodes of a failed node are marked SKIPPED.
+    """
+    path_pairs = _parse_path_map(LOCAL_PATH_MAP if path_map is None else path_map)
+    node_map = {n.id: n for n in pipeline.nodes}
+    components = {}
+    for node in pipeline.nodes:
+        if node.kind == "pipeline":
+            raise ValueError(f"Node {node.id} runs a nested pipeline, which local runs don't support")
+        comp = storage.get_component(node.component_id)
+        if not comp:
+            raise ValueError(f"Component {node.component_id} not found for node {node.id}")
+        if any("{{$" in a for a in list(comp.command or []) + list(comp.args or [])):
+            # KFP Python components read their inputs through the KFP executor
+            raise ValueError(f"Component '{comp.name}' of node {node.id} needs the KFP executor, which local runs don't provide")
+        components[node.id] = comp
+
+    children = {n.id: [] for n in pipeline.nodes}
+    in_degree = {n.id: 0 for n in pipeline.nodes}
+    for edge in pipeline.edges:
+        if edge.source in children and edge.target in in_degree:
+            children[edge.source].append(edge.target)
+            in_degree[edge.target] += 1
+
+    os.makedirs(_run_dir(run_id), exist_ok=True)
+    for node_id in node_map:
+        _set_state(run_id, node_id, "PENDING")
+
+    blocked = set()
+    usage = {}
+    with ThreadPoolExecutor(max_workers=max_workers or LOCAL_MAX_WORKERS) as pool:
+        running = {}
+
+        def submit(node_id):
+            fut = pool.submit(_run_node, run_id, pipeline, node_map[node_id], components[node_id], path_pairs, usage)
+            running[fut] = node_id
+
+        def finish(node_id, ok):
+            for v in children[node_id]:
+                if not ok:
+                    blocked.add(v)
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    if v in blocked:
+                        _set_state(run_id, v, "SKIPPED")
+                        finish(v, False)
+                    else:
+                        submit(v)
+
+        for node_id, degree in list(in_degree.items()):
+            if degree == 0:
+                submit(node_id)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                node_id = running.pop(fut)
+                try:
+                    ok = fut.result()
+                except Exception as e:
+                    with open(node_log_path(run_id, node_id), "a") as log:
+                        log.write(f"Failed to start node: {e}\n")
+                    _set_state(run_id, node_id, "FAILED")
+                    ok = False
+                finish(node_id, ok)
+
+    # Nodes in a cycle never become ready
+    for node_id in node_map:
+        if get_node_statuses(run_id).get(node_id) == "PENDING":
+            _set_state(run_id, node_id, "SKIPPED")
+    try:
+        resource_usage.record(pipeline.id, run_id, usage, {n.id: n.component_id for n in pipeline.nodes if n.component_id}, "local")
+    except Exception as e:
+        print(f"Failed to record resource usage for run {run_id}: {e}")
+    return get_node_statuses(run_id)
+
+def start_run(pipeline: Pipeline, max_workers: Optional[int] = None, path_map: Optional[str] = None) -> str:
+    """
+    Starts executing the pipeline in a background thread and returns the run id.
+    """
+    run_id = f"{RUN_ID_PREFIX}{uuid.uuid4()}"
+    os.makedirs(_run_dir(run_id), exist_ok=True)
+    with _runs_lock:
+        _node_states[run_id] = {n.id: "PENDING" for n in pipeline.nodes}
+
+    def target():
+        try:
+            execute(run_id, pipeline, max_workers, path_map)
+        except Exception as e:
+            print(f"Local run {run_id} failed: {e}")
+            for node_id, state in get_node_statuses(run_id).items():
+                if state in ("PENDING", "RUNNING"):
+                    _set_state(run_id, node_id, "FAILED")
+
+    threading.Thread(target=target, daemon=True).start()
+    return run_id
+
+def get_node_statuses(run_id: str) -> Dict[str, str]:
+    with _runs_lock:
+        if run_id in _node_states:
+            return dict(_node_states[run_id])
+    status_path = os.path.join(_run_dir(run_id), "status.json")
+    if os.path.exists(status_path):
+        with open(status_path, "r") as f:
+            return json.load(f)
+    return {}
+
+def get_run_status(run_id: str) -> str:
+    states = set(get_node_statuses(run_id).values())
+    if not states:
+        return "unknown"
+    if "RUNNING" in states or "PENDING" in states:
+        return "RUNNING"
+    if "FAILED" in states:
+        return "FAILED"
+    return "SUCCEEDED"
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a saved pipeline locally")
+    parser.add_argument("pipeline_id")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--path-map", default=None, help="Prefix rewrites, e.g. /app=./components/train")
+    cli_args = parser.parse_args()
+    pipe = storage.get_pipeline(cli_args.pipeline_id)
+    if not pipe:
+        sys.exit(f"Pipeline {cli_args.pipeline_id} not found")
+    rid = f"{RUN_ID_PREFIX}{uuid.uuid4()}"
+    result = execute(rid, pipe, cli_args.workers, cli_args.path_map)
+    print(json.dumps({"run_id": rid, "nodes": result}, indent=2))
+    sys.exit(0 if all(s == "SUCCEEDED" for s in result.values()) else 1)
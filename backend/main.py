@@ -1,11 +1,40 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import Response, FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional
 import models
 import storage
-import compiler
 import kfp_client
+import local_executor
+import lineage
+import artifact_preview
+import storage_profiles
+import resource_usage
+import admission
+import subpipelines
+import component_search
+import component_import
+import node_logs
+import bulk
+import run_watcher
+import run_states
+import volcano
+import metrics
+import profiling
 import os
+import re
+import tempfile
+import threading
+import time
+
+# Import the KFP SDK in the background once the server is up, so the first
+# compile/submit doesn't pay for it; CRUD routes never need it
+KFP_PREWARM = os.getenv("KFP_PREWARM", "true").lower() in ("1", "true", "yes")
+# Apply recommended resource requests when /compile or /run don't say otherwise
+RIGHT_SIZE_DEFAULT = os.getenv("RIGHT_SIZE_DEFAULT", "false").lower() in ("1", "true", "yes")
+# Uploads to /import are buffered in memory up to this size, on disk beyond
+IMPORT_SPOOL_BYTES = 8 * 2**20
 
 app = FastAPI()
 
@@ -17,19 +46,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so ids in the path don't explode cardinality
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=route)
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+
+def _import_kfp():
+    try:
+        import compiler
+        from kfp import Client
+    except Exception as e:
+        print(f"Failed to prewarm KFP SDK: {e}")
+
+@app.on_event("startup")
+def prewarm_kfp():
+    if KFP_PREWARM:
+        threading.Thread(target=_import_kfp, daemon=True).start()
+
+@app.on_event("startup")
+def resume_run_watch():
+    # Runs submitted before a restart still get their completion work
+    watcher.start()
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
+@app.get("/storage-profiles")
+def get_storage_profiles():
+    try:
+        return storage_profiles.list_profiles()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Components
 @app.post("/components", response_model=models.Component)
 def create_component(component: models.Component):
     return storage.save_component(component)
 
+@app.post("/components:bulk")
+def bulk_create_components(components: List[Any] = Body(...)):
+    try:
+        return bulk.import_components(components)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/components:import", response_model=models.Component)
+async def import_component_yaml(request: Request):
+    # Body is the component YAML as KFP writes it (v1 or v2 IR)
+    text = (await request.body()).decode("utf-8")
+    try:
+        comp = await run_in_threadpool(component_import.parse_component_yaml, text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(storage.save_component, comp)
+
 @app.get("/components", response_model=List[models.Component])
 def get_components():
     return storage.list_components()
 
+@app.get("/components/search")
+def search_components(q: str = "", type: Optional[str] = None, limit: int = 20, offset: int = 0):
+    try:
+        while True:
+            found = component_search.search(q, type=type, limit=limit, offset=offset)
+            comps = [storage.get_component(hit["id"]) for hit in found["results"]]
+            stale = [hit["id"] for hit, comp in zip(found["results"], comps) if comp is None]
+            if not stale:
+                break
+            # Files removed behind the index's back: drop them so total, facets and the page agree
+            for component_id in stale:
+                component_search.remove(component_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    results = [{"component": comp, "score": hit["score"]} for hit, comp in zip(found["results"], comps)]
+    return {**found, "results": results}
+
 @app.get("/components/{component_id}", response_model=models.Component)
 def get_component(component_id: str):
     comp = storage.get_component(component_id)
@@ -37,6 +142,15 @@ def get_component(component_id: str):
         raise HTTPException(status_code=404, detail="Component not found")
     return comp
 
+@app.get("/components/{component_id}/recommendations")
+def get_component_recommendations(component_id: str):
+    if not storage.get_component(component_id):
+        raise HTTPException(status_code=404, detail="Component not found")
+    try:
+        return resource_usage.recommend(component_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/components/{component_id}")
 def delete_component(component_id: str):
     success = storage.delete_component(component_id)
@@ -45,8 +159,22 @@ def delete_component(component_id: str):
     return {"status": "deleted"}
 
 # Pipelines
+def _check_node_resources(nodes: List[models.PipelineNode]) -> None:
+    # GPU overrides are only valid together with the component's defaults
+    for node in nodes:
+        if not node.component_id or not node.resources:
+            continue
+        comp = storage.get_component(node.component_id)
+        if not comp:
+            continue
+        try:
+            comp.resources.accelerator(node.resources)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Node {node.label} ({node.id}): {e}")
+
 @app.post("/pipelines", response_model=models.Pipeline)
 def create_pipeline(pipeline: models.Pipeline):
+    _check_node_resources(pipeline.nodes)
     return storage.save_pipeline(pipeline)
 
 @app.get("/pipelines", response_model=List[models.Pipeline])
@@ -60,6 +188,28 @@ def get_pipeline(pipeline_id: str):
         raise HTTPException(status_code=404, detail="Pipeline not found")
     return pipe
 
+@app.get("/pipelines/{pipeline_id}/ports")
+def get_pipeline_ports(pipeline_id: str):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    try:
+        inputs, outputs = subpipelines.ports(pipe)
+        return {"inputs": inputs, "outputs": outputs}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.patch("/pipelines/{pipeline_id}", response_model=models.Pipeline)
+def patch_pipeline(pipeline_id: str, patch: models.PipelinePatch):
+    _check_node_resources([op.node for op in patch.ops if op.node])
+    try:
+        pipe = storage.patch_pipeline(pipeline_id, patch.ops)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    return pipe
+
 @app.delete("/pipelines/{pipeline_id}")
 def delete_pipeline(pipeline_id: str):
     success = storage.delete_pipeline(pipeline_id)
@@ -67,29 +217,164 @@ def delete_pipeline(pipeline_id: str):
         raise HTTPException(status_code=404, detail="Pipeline not found")
     return {"status": "deleted"}
 
+@app.post("/pipelines/{pipeline_id}/compile")
+def compile_pipeline(pipeline_id: str, request: Request, response: Response, from_node: Optional[str] = None,
+                     right_size: Optional[bool] = None):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    if from_node and not any(n.id == from_node for n in pipe.nodes):
+        raise HTTPException(status_code=404, detail="Node not found")
+    if from_node and not pipe.last_run_id:
+        raise HTTPException(status_code=400, detail="Partial compile requires a previous run to take upstream artifacts from")
+    try:
+        with profiling.capture(request, response, "compile", pipeline_id=pipeline_id, nodes=len(pipe.nodes)):
+            import compiler  # deferred: loads the KFP SDK
+            upstream_artifacts = _upstream_artifacts(pipe) if from_node else None
+            yaml_file = compiler.compile_pipeline(pipe, start_node_id=from_node, upstream_artifacts=upstream_artifacts,
+                                                  right_size=RIGHT_SIZE_DEFAULT if right_size is None else right_size)
+        try:
+            with open(yaml_file, "r") as f:
+                return {"status": "compiled", "yaml": f.read()}
+        finally:
+            os.remove(yaml_file)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/pipelines/{pipeline_id}/run")
-def run_pipeline(pipeline_id: str):
+def run_pipeline(pipeline_id: str, request: Request, response: Response, from_node: Optional[str] = None,
+                 source_run_id: Optional[str] = None, sweep_id: Optional[str] = None, right_size: Optional[bool] = None,
+                 team: Optional[str] = None, priority: int = 0,
+                 arguments: Optional[Dict[str, Any]] = Body(None, embed=True)):
     pipe = storage.get_pipeline(pipeline_id)
     if not pipe:
         raise HTTPException(status_code=404, detail="Pipeline not found")
+    if from_node and not any(n.id == from_node for n in pipe.nodes):
+        raise HTTPException(status_code=404, detail="Node not found")
+    if from_node and not (source_run_id or pipe.last_run_id):
+        raise HTTPException(status_code=400, detail="Partial run requires a previous run to take upstream artifacts from")
     
     try:
-        # Compile
-        yaml_file = compiler.compile_pipeline(pipe)
+        with profiling.capture(request, response, "run", pipeline_id=pipeline_id, nodes=len(pipe.nodes)):
+            import compiler  # deferred: loads the KFP SDK
+            # Partial run: recover upstream outputs from previous runs
+            upstream_artifacts = _upstream_artifacts(pipe, source_run_id) if from_node else None
+
+            # Compile
+            yaml_file = compiler.compile_pipeline(pipe, start_node_id=from_node, upstream_artifacts=upstream_artifacts, sweep_id=sweep_id,
+                                                  right_size=RIGHT_SIZE_DEFAULT if right_size is None else right_size,
+                                                  arguments=arguments)
         
-        # Submit
-        run_name = f"Run {pipe.name}"
-        result = kfp_client.submit_pipeline(yaml_file, run_name)
-        # Robust run_id extraction across KFP versions
-        run_id = getattr(result, 'run_id', None)
-        if not run_id:
+            # Submit
+            run_name = f"Run {pipe.name}" if not from_node else f"Run {pipe.name} from {from_node}"
             try:
-                run_obj = getattr(result, 'run', None)
-                run_id = getattr(run_obj, 'id', None) or getattr(result, 'id', None)
-            except Exception:
-                run_id = None
-        pipe.last_run_id = run_id
-        storage.save_pipeline(pipe)
+                if not admission.controller.enabled:
+                    return {"status": "submitted", "run_id": _submit_run(pipe, yaml_file, run_name, arguments)}
+                # Queued runs may be released long after this request; keep the spec in memory
+                with open(yaml_file, "r") as f:
+                    spec_text = f.read()
+            finally:
+                os.remove(yaml_file)
+
+        sub = admission.controller.submit(
+            pipe.id, lambda: _submit_queued(pipe.id, spec_text, run_name, arguments),
+            team=team or request.headers.get("X-Team"), priority=priority)
+        if sub.state == "failed":
+            raise RuntimeError(sub.error)
+        if sub.state == "queued":
+            return {"status": "queued", "queue_id": sub.id, "position": (admission.controller.get(sub.id) or {}).get("position")}
+        return {"status": "submitted", "run_id": sub.run_id, "queue_id": sub.id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _upstream_artifacts(pipe: models.Pipeline, source_run_id: Optional[str] = None) -> dict:
+    """
+    {node_id: {output name: uri}} for a partial run to import. An explicit
+    source run supplies them all. By default the last run's outputs are
+    completed with each node's latest indexed ones, since a partial last run
+    has none for the nodes it skipped.
+    """
+    if source_run_id:
+        return _map_to_node_ids(pipe, kfp_client.get_run_artifacts(source_run_id))
+    upstream = lineage.latest_outputs(pipe.id)
+    for node_id, outputs in _map_to_node_ids(pipe, kfp_client.get_run_artifacts(pipe.last_run_id)).items():
+        upstream.setdefault(node_id, {}).update(outputs)
+    return upstream
+
+def _submit_run(pipe: models.Pipeline, yaml_file: str, run_name: str, arguments: Optional[Dict[str, Any]]) -> Optional[str]:
+    # The PodGroups the run's pods name must exist before its pods are created
+    groups = volcano.create_pod_groups(yaml_file)
+    try:
+        # Run arguments override pipeline parameters, e.g. <node_id>_items of fan-out nodes
+        result = kfp_client.submit_pipeline(yaml_file, run_name, arguments)
+    except Exception:
+        volcano.delete_pod_groups(groups)
+        raise
+    # Robust run_id extraction across KFP versions
+    run_id = getattr(result, 'run_id', None)
+    if not run_id:
+        try:
+            run_obj = getattr(result, 'run', None)
+            run_id = getattr(run_obj, 'id', None) or getattr(result, 'id', None)
+        except Exception:
+            run_id = None
+    pipe.last_run_id = run_id
+    # Not a full save of pipe: it was read before the compile, and edits made since would be lost
+    storage.set_pipeline_last_run(pipe.id, run_id)
+    if run_id:
+        try:
+            volcano.label_run(groups, run_id)
+        except Exception as e:
+            print(f"Failed to label PodGroups of run {run_id}: {e}")
+        try:
+            lineage.record_submission(pipe, run_id, yaml_file)
+        except Exception as e:
+            print(f"Failed to index run inputs: {e}")
+        watcher.start()
+    return run_id
+
+def _submit_queued(pipeline_id: str, spec_text: str, run_name: str, arguments: Optional[Dict[str, Any]]) -> Optional[str]:
+    # Released from the admission queue, possibly much later: take the pipeline as it is now
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise ValueError(f"Pipeline {pipeline_id} was deleted while queued")
+    fd, path = tempfile.mkstemp(prefix=f"{pipeline_id}-", suffix=".yaml")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(spec_text)
+        return _submit_run(pipe, path, run_name, arguments)
+    finally:
+        os.remove(path)
+
+# Admission queue
+@app.get("/queue")
+def get_queue():
+    return admission.controller.snapshot()
+
+@app.get("/queue/{queue_id}")
+def get_queued_run(queue_id: str):
+    entry = admission.controller.get(queue_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Queued run not found")
+    return entry
+
+@app.delete("/queue/{queue_id}")
+def cancel_queued_run(queue_id: str):
+    sub = admission.controller.cancel(queue_id)
+    if not sub:
+        raise HTTPException(status_code=404, detail="Queued run not found")
+    if sub.state != "canceled":
+        raise HTTPException(status_code=400, detail=f"Run already {sub.state}")
+    return {"status": "canceled"}
+
+@app.post("/pipelines/{pipeline_id}/local-run")
+def run_pipeline_locally(pipeline_id: str, max_workers: Optional[int] = None):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    try:
+        run_id = local_executor.start_run(pipe, max_workers=max_workers)
+        storage.set_pipeline_last_run(pipe.id, run_id)
         return {"status": "submitted", "run_id": run_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -102,61 +387,302 @@ def get_pipeline_status(pipeline_id: str):
     if not pipe.last_run_id:
         return {"status": "unknown"}
     try:
-        status = kfp_client.get_run_status(pipe.last_run_id)
+        if local_executor.is_local_run(pipe.last_run_id):
+            status = local_executor.get_run_status(pipe.last_run_id)
+        else:
+            status = kfp_client.get_run_status(pipe.last_run_id)
+            _on_run_status(pipe, pipe.last_run_id, status)
         return {"run_id": pipe.last_run_id, "status": status}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _on_run_status(pipe: models.Pipeline, run_id: str, status: str) -> None:
+    """
+    Work due on a KFP run's status, wherever it is seen (/status, /nodes/status
+    or the run watcher): once terminal, its Volcano PodGroups are deleted, its
+    outputs are indexed, its resource usage is collected and its admission
+    slot is freed.
+    """
+    _release_pod_groups(run_id, status)
+    _index_run_outputs(pipe, run_id, status)
+    _collect_run_usage(pipe, run_id, status)
+    admission.controller.observe(run_id, status)
+
+def _watched_run_status(pipeline_id: str, run_id: str, status: str) -> None:
+    # A deleted pipeline's run is still indexed (without node ids), so it stops being watched
+    pipe = storage.get_pipeline(pipeline_id) or models.Pipeline(id=pipeline_id, name=pipeline_id)
+    _on_run_status(pipe, run_id, status)
+
+watcher = run_watcher.RunWatcher(_watched_run_status, run_watcher.RUN_WATCH_POLL_S, run_watcher.RUN_WATCH_MAX_AGE_S)
+
+def _release_pod_groups(run_id: str, status: str) -> None:
+    # Before the run is marked completed (by indexing its outputs), so this happens once per run
+    if str(status).upper() not in run_states.TERMINAL_STATES:
+        return
+    try:
+        if not lineage.is_completed(run_id):
+            volcano.delete_run_pod_groups(run_id)
+    except Exception as e:
+        print(f"Failed to delete PodGroups of run {run_id}: {e}")
+
+def _index_run_outputs(pipe: models.Pipeline, run_id: str, status: str) -> None:
+    # Fetch a run's outputs once, the first time it is seen in a terminal state
+    if str(status).upper() not in run_states.TERMINAL_STATES:
+        return
+    try:
+        if not lineage.is_completed(run_id):
+            lineage.record_completion(pipe, run_id, status, kfp_client.get_run_artifacts(run_id))
+    except Exception as e:
+        print(f"Failed to index run outputs: {e}")
+
+_usage_collecting = set()
+_usage_lock = threading.Lock()
+
+def _collect_run_usage(pipe: models.Pipeline, run_id: str, status: str) -> None:
+    # Once per finished run, in the background: metrics sources can be slow
+    if str(status).upper() not in run_states.TERMINAL_STATES:
+        return
+    with _usage_lock:
+        if run_id in _usage_collecting:
+            return
+        _usage_collecting.add(run_id)
+
+    def target():
+        try:
+            if not resource_usage.has_run(run_id):
+                samples = _map_to_node_ids(pipe, resource_usage.collect(run_id))
+                resource_usage.record(pipe.id, run_id, samples, {n.id: n.component_id for n in pipe.nodes if n.component_id},
+                                      resource_usage.USAGE_SOURCE)
+        except Exception as e:
+            print(f"Failed to collect resource usage for run {run_id}: {e}")
+            with _usage_lock:
+                _usage_collecting.discard(run_id)
+
+    threading.Thread(target=target, daemon=True).start()
+
+def _map_to_node_ids(pipe: models.Pipeline, by_name: dict) -> dict:
+    """
+    Maps values keyed by KFP task display name onto pipeline node ids, using the
+    <node_id>- display name prefix, a unique node label, or a unique component name.
+    """
+    mapped = {}
+
+    node_ids = {n.id for n in getattr(pipe, 'nodes', [])}
+
+    label_counts = {}
+    for n in getattr(pipe, 'nodes', []):
+        label_counts[n.label] = label_counts.get(n.label, 0) + 1
+    label_to_id = {n.label: n.id for n in getattr(pipe, 'nodes', []) if label_counts.get(n.label, 0) == 1}
+
+    comp_counts = {}
+    comp_name_to_id = {}
+    for n in getattr(pipe, 'nodes', []):
+        try:
+            comp = storage.get_component(n.component_id)
+        except Exception:
+            comp = None
+        if comp and getattr(comp, 'name', None):
+            nm = comp.name
+            comp_counts[nm] = comp_counts.get(nm, 0) + 1
+            comp_name_to_id.setdefault(nm, []).append(n.id)
+
+    unique_comp_to_id = {nm: ids[0] for nm, ids in comp_name_to_id.items() if comp_counts.get(nm, 0) == 1}
+
+    for name, st in (by_name or {}).items():
+        if not isinstance(name, str):
+            continue
+        if '-' in name:
+            nid = name.split('-', 1)[0]
+            if nid in node_ids:
+                mapped[nid] = st
+                continue
+        if name in label_to_id:
+            mapped[label_to_id[name]] = st
+            continue
+        if name in unique_comp_to_id:
+            mapped[unique_comp_to_id[name]] = st
+
+    return mapped
+
 @app.get("/pipelines/{pipeline_id}/nodes/status")
-def get_pipeline_node_statuses(pipeline_id: str):
+def get_pipeline_node_statuses(pipeline_id: str, request: Request, response: Response):
     pipe = storage.get_pipeline(pipeline_id)
     if not pipe:
         raise HTTPException(status_code=404, detail="Pipeline not found")
     if not pipe.last_run_id:
         return {}
     try:
-        statuses = kfp_client.get_run_node_statuses(pipe.last_run_id)
-        mapped = {}
+        if local_executor.is_local_run(pipe.last_run_id):
+            return local_executor.get_node_statuses(pipe.last_run_id)
+        with profiling.capture(request, response, "nodes_status", pipeline_id=pipeline_id):
+            statuses = kfp_client.get_run_node_statuses(pipe.last_run_id)
+            metrics.record_task_cache(pipe.last_run_id, statuses)
+            mapped = _map_to_node_ids(pipe, statuses)
+            _check_run_finished(pipe, pipe.last_run_id, statuses)
+        return mapped or statuses
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        node_ids = {n.id for n in getattr(pipe, 'nodes', [])}
+def _check_run_finished(pipe: models.Pipeline, run_id: str, statuses: dict) -> None:
+    # Every task done: ask for the run's own status once, until the run is indexed as completed
+    if not statuses or any(str(st).upper() not in run_states.TASK_DONE_STATES for st in statuses.values()):
+        return
+    try:
+        if not lineage.is_completed(run_id):
+            _on_run_status(pipe, run_id, kfp_client.get_run_status(run_id))
+    except Exception as e:
+        print(f"Failed to check whether run {run_id} finished: {e}")
 
-        label_counts = {}
-        for n in getattr(pipe, 'nodes', []):
-            label_counts[n.label] = label_counts.get(n.label, 0) + 1
-        label_to_id = {n.label: n.id for n in getattr(pipe, 'nodes', []) if label_counts.get(n.label, 0) == 1}
+def _node_pods(pipe: models.Pipeline, run_id: str) -> tuple:
+    # Status first: tasks listed after the run finished are all there is
+    final = str(kfp_client.get_run_status(run_id)).upper() in run_states.TERMINAL_STATES
+    tasks = kfp_client.get_run_task_details(run_id)
+    return _map_to_node_ids(pipe, {t["name"]: t["pods"] for t in tasks if t["pods"]}), final
 
-        comp_counts = {}
-        comp_name_to_id = {}
-        for n in getattr(pipe, 'nodes', []):
-            try:
-                comp = storage.get_component(n.component_id)
-            except Exception:
-                comp = None
-            if comp and getattr(comp, 'name', None):
-                nm = comp.name
-                comp_counts[nm] = comp_counts.get(nm, 0) + 1
-                comp_name_to_id.setdefault(nm, []).append(n.id)
-
-        unique_comp_to_id = {nm: ids[0] for nm, ids in comp_name_to_id.items() if comp_counts.get(nm, 0) == 1}
-
-        for name, st in (statuses or {}).items():
-            if not isinstance(name, str):
-                continue
-            if '-' in name:
-                nid = name.split('-', 1)[0]
-                if nid in node_ids:
-                    mapped[nid] = st
-                    continue
-            if name in label_to_id:
-                mapped[label_to_id[name]] = st
-                continue
-            if name in unique_comp_to_id:
-                mapped[unique_comp_to_id[name]] = st
+@app.get("/pipelines/{pipeline_id}/nodes/{node_id}/logs")
+def get_node_logs(pipeline_id: str, node_id: str, run_id: Optional[str] = None, tail: Optional[int] = None,
+                  since: Optional[int] = None, regex: Optional[str] = None, timestamps: bool = False):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    if not any(n.id == node_id for n in pipe.nodes):
+        raise HTTPException(status_code=404, detail="Node not found")
+    run_id = run_id or pipe.last_run_id
+    if not run_id:
+        raise HTTPException(status_code=404, detail="Pipeline has no run")
+    if (tail is not None and tail <= 0) or (since is not None and since <= 0):
+        raise HTTPException(status_code=400, detail="tail and since must be positive")
+    try:
+        pods = []
+        if not local_executor.is_local_run(run_id):
+            pods = node_logs.node_pods(run_id, node_id, lambda: _node_pods(pipe, run_id))
+        lines = node_logs.open_logs(run_id, node_id, pods, tail=tail, since_s=since, pattern=regex, timestamps=timestamps)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if lines is None:
+        raise HTTPException(status_code=404, detail="No logs for node")
+    return StreamingResponse((line + "\n" for line in lines), media_type="text/plain")
 
-        return mapped or statuses
+# Lineage
+@app.get("/artifacts")
+def get_artifact_lineage(uri: str, prefix: bool = False):
+    entries = lineage.find_by_uri(uri, prefix=prefix)
+    return {
+        "uri": uri,
+        "producers": [e for e in entries if e["role"] == "output"],
+        "consumers": [e for e in entries if e["role"] == "input"],
+    }
+
+@app.get("/pipelines/{pipeline_id}/runs/{run_id}/artifacts")
+def get_run_artifacts(pipeline_id: str, run_id: str):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    run = lineage.get_run(pipeline_id, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not indexed")
+    if not run["completed_at"]:
+        # Outputs are only indexed once; until then check whether the run has finished
+        try:
+            _index_run_outputs(pipe, run_id, kfp_client.get_run_status(run_id))
+        except Exception as e:
+            print(f"Failed to get run status: {e}")
+        run = lineage.get_run(pipeline_id, run_id)
+    artifacts = run.pop("artifacts")
+    run.update({
+        "run_id": run_id,
+        "inputs": [a for a in artifacts if a["role"] == "input"],
+        "outputs": [a for a in artifacts if a["role"] == "output"],
+    })
+    return run
+
+def _node_artifact_uri(pipe: models.Pipeline, run_id: str, node_id: str, name: str) -> Optional[str]:
+    if local_executor.is_local_run(run_id):
+        return local_executor.node_output_dir(run_id, node_id, name)
+    # KFP keys outputs by their sanitized name (clean-data -> clean_data)
+    names = {name, "".join(ch if (ch.isalnum() or ch == "_") else "_" for ch in name)}
+    run = lineage.get_run(pipe.id, run_id)
+    for a in (run or {}).get("artifacts", []):
+        if a["role"] == "output" and a["node_id"] == node_id and a["name"] in names:
+            return a["uri"]
+    if run and run["completed_at"]:
+        return None
+    outputs = _map_to_node_ids(pipe, kfp_client.get_run_artifacts(run_id)).get(node_id) or {}
+    return next((outputs[n] for n in names if n in outputs), None)
+
+@app.get("/pipelines/{pipeline_id}/nodes/{node_id}/artifacts/{name}/preview")
+def preview_node_artifact(pipeline_id: str, node_id: str, name: str, run_id: Optional[str] = None,
+                          file: Optional[str] = None, rows: int = 20, sample: str = "head"):
+    pipe = storage.get_pipeline(pipeline_id)
+    if not pipe:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+    if not any(n.id == node_id for n in pipe.nodes):
+        raise HTTPException(status_code=404, detail="Node not found")
+    run_id = run_id or pipe.last_run_id
+    if not run_id:
+        raise HTTPException(status_code=404, detail="Pipeline has no runs")
+    if sample not in ("head", "spread"):
+        raise HTTPException(status_code=400, detail="sample must be 'head' or 'spread'")
+    try:
+        uri = _node_artifact_uri(pipe, run_id, node_id, name)
+        if not uri:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        return {"run_id": run_id, "node_id": node_id, "name": name,
+                **artifact_preview.preview(uri, file=file, rows=rows, sample=sample)}
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Import / export
+@app.post("/import")
+async def import_archive(request: Request):
+    # Spool the upload first: tar members and JSONL lines are then read in a worker thread
+    spool = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(bulk.import_archive, spool)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        spool.close()
+
+@app.get("/export")
+def export_archive(kinds: str = "component,pipeline", format: str = "jsonl"):
+    selected = [k.strip() for k in kinds.split(",") if k.strip()]
+    unknown = [k for k in selected if k not in bulk.KINDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"kinds must be a subset of {','.join(bulk.KINDS)}")
+    if format == "jsonl":
+        return StreamingResponse(bulk.export_jsonl(selected), media_type="application/x-ndjson",
+                                 headers={"Content-Disposition": 'attachment; filename="export.jsonl"'})
+    if format == "tar.gz":
+        return StreamingResponse(bulk.export_tar(selected), media_type="application/gzip",
+                                 headers={"Content-Disposition": 'attachment; filename="export.tar.gz"'})
+    raise HTTPException(status_code=400, detail="format must be jsonl or tar.gz")
+
+# Debug
+@app.get("/debug/profiles")
+def get_profiles():
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return profiling.list_profiles()
+
+@app.get("/debug/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    if not profiling.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    path = profiling.stats_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,168 @@
+"""
+In-process Prometheus metrics rendered by GET /metrics.
+
+Counters and histograms are plain dicts keyed by label values behind one
+lock per metric, so recording costs a dict lookup and a few additions.
+Label values must come from small fixed sets (route templates, phase
+names), never from ids.
+"""
+import bisect
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from run_states import TASK_DONE_STATES
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class _Timer(contextlib.ContextDecorator):
+    """Observes elapsed seconds into a histogram; works as a decorator too."""
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls don't share a start time
+        return _Timer(self.histogram, self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._start, **self.labels)
+        return False
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = Counter("backend_http_requests_total", "HTTP requests by route template and status code",
+                        ("method", "route", "status"))
+HTTP_LATENCY = Histogram("backend_http_request_duration_seconds", "HTTP request latency by route template",
+                         ("method", "route"))
+COMPILE_PHASE = Histogram("backend_compile_phase_seconds", "compile_pipeline time per phase",
+                          ("phase",))
+KFP_CALL_LATENCY = Histogram("backend_kfp_call_duration_seconds", "Latency of calls to the KFP API",
+                             ("call",))
+KFP_CALL_ERRORS = Counter("backend_kfp_call_errors_total", "Failed calls to the KFP API", ("call",))
+KFP_STATUS_STRATEGY = Counter("backend_kfp_status_strategy_total",
+                              "Which run/task status extraction strategy produced the result",
+                              ("call", "strategy"))
+STORAGE_LATENCY = Histogram("backend_storage_duration_seconds", "Local JSON storage latency",
+                            ("op", "kind"))
+CACHE_REQUESTS = Counter("backend_cache_requests_total", "Cache lookups by cache and result",
+                         ("cache", "result"))
+
+# KFP task cache accounting: each finished run is counted once
+_counted_runs: "OrderedDict[str, None]" = OrderedDict()
+_counted_runs_lock = threading.Lock()
+_COUNTED_RUNS_MAX = 10000
+
+def record_task_cache(run_id: str, statuses: dict) -> None:
+    """
+    Counts KFP execution cache hits (CACHED tasks) and misses for a run once
+    all of its tasks have reached a terminal state.
+    """
+    states = [s.upper() for s in (statuses or {}).values() if isinstance(s, str)]
+    if not run_id or not states or any(s not in TASK_DONE_STATES for s in states):
+        return
+    with _counted_runs_lock:
+        if run_id in _counted_runs:
+            return
+        _counted_runs[run_id] = None
+        if len(_counted_runs) > _COUNTED_RUNS_MAX:
+            _counted_runs.popitem(last=False)
+    hits = sum(1 for s in states if s == "CACHED")
+    misses = sum(1 for s in states if s == "SUCCEEDED")
+    if hits:
+        CACHE_REQUESTS.inc(hits, cache="kfp_task", result="hit")
+    if misses:
+        CACHE_REQUESTS.inc(misses, cache="kfp_task", result="miss")
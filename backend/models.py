@@ -1,6 +1,41 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 from typing import List, Dict, Optional, Any
 
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+def parse_duration(value: str) -> int:
+    """
+    Parses durations such as '90s', '15m', '12h', '30d' or a bare number of seconds.
+    """
+    v = str(value).strip().lower()
+    try:
+        if v and v[-1] in _DURATION_UNITS:
+            seconds = int(float(v[:-1]) * _DURATION_UNITS[v[-1]])
+        else:
+            seconds = int(float(v))
+    except ValueError:
+        raise ValueError(f"Invalid duration '{value}'")
+    if seconds <= 0:
+        raise ValueError(f"Duration must be positive: '{value}'")
+    return seconds
+
+# Accelerator counts the KFP SDK accepts
+_ACCELERATOR_LIMITS = ("1", "2", "4", "8", "16")
+
+def check_gpu_limit(value: Optional[str]) -> None:
+    if value is not None and str(value).strip() and str(value).strip() not in _ACCELERATOR_LIMITS:
+        raise ValueError(f"gpu_limit must be one of {', '.join(_ACCELERATOR_LIMITS)}, got '{value}'")
+
+def check_accelerator(gpu_type: Optional[str], gpu_limit: Optional[str]) -> None:
+    """
+    Raises ValueError for an invalid gpu_limit or a gpu_type without one,
+    which KFP would otherwise turn into a request for a single accelerator.
+    A limit without a type is ignored by KFP.
+    """
+    check_gpu_limit(gpu_limit)
+    if gpu_type and not gpu_limit:
+        raise ValueError(f"gpu_type '{gpu_type}' requires gpu_limit")
+
 class ComponentInput(BaseModel):
     name: str
     type: str
@@ -19,6 +54,54 @@ class ComponentResources(BaseModel):
     gpu_type: Optional[str] = None
     gpu_limit: Optional[str] = None
 
+    @model_validator(mode="after")
+    def check_gpu(self):
+        check_accelerator(self.gpu_type, self.gpu_limit)
+        return self
+
+    def accelerator(self, overrides: Optional[Dict[str, str]] = None):
+        """(gpu_type, gpu_limit) with a node's resource overrides applied, checked as a pair."""
+        overrides = overrides or {}
+        gpu_type = overrides.get("gpu_type") or self.gpu_type
+        gpu_limit = overrides.get("gpu_limit") or self.gpu_limit
+        check_accelerator(gpu_type, gpu_limit)
+        return gpu_type, gpu_limit
+
+class CachingPolicy(BaseModel):
+    enabled: Optional[bool] = None
+    max_staleness: Optional[str] = None # e.g. "12h", "30d", "3600s"
+
+    @field_validator("max_staleness")
+    @classmethod
+    def check_max_staleness(cls, v: Optional[str]) -> Optional[str]:
+        # Blank means unset, as when merging node overrides
+        if v is not None and str(v).strip():
+            parse_duration(v)
+        return v
+
+class RetryPolicy(BaseModel):
+    num_retries: Optional[int] = None
+    backoff_duration: Optional[str] = None # e.g. "30s"
+    backoff_factor: Optional[float] = None
+    backoff_max_duration: Optional[str] = None # e.g. "3600s"
+
+class VolcanoSettings(BaseModel):
+    queue: Optional[str] = None
+    min_available: Optional[int] = None # gang size of the node's PodGroup
+    priority_class: Optional[str] = None
+    group_scope: Optional[str] = None # run (default) | sweep
+
+class StorageProfile(BaseModel):
+    name: str
+    endpoint: str
+    region: str = "us-east-1"
+    path_style: bool = True
+    secret_name: Optional[str] = None # K8s Secret holding the access/secret keys
+    access_key_field: str = "accesskey"
+    secret_key_field: str = "secretkey"
+    proxy_endpoint: Optional[str] = None # in-cluster caching proxy, used instead of endpoint when set
+    node_pool_endpoints: Dict[str, str] = {} # node pool -> nearest endpoint for tasks placed there
+
 class Component(BaseModel):
     id: Optional[str] = None
     name: str
@@ -30,14 +113,37 @@ class Component(BaseModel):
     outputs: List[ComponentOutput] = []
     resources: ComponentResources = ComponentResources()
     volcano_enabled: bool = False
+    volcano: VolcanoSettings = VolcanoSettings()
+    caching: CachingPolicy = CachingPolicy()
+    retry: RetryPolicy = RetryPolicy()
+    timeout: Optional[str] = None # e.g. "2h"; the pod is killed once it runs longer
+    storage_profile: Optional[str] = None # default profile if unset
+    spec: Optional[str] = None # original KFP component YAML when imported; compiled as-is
 
 class PipelineNode(BaseModel):
     id: str
-    component_id: str
+    component_id: Optional[str] = None # unset for kind=pipeline
     label: str
     position: Dict[str, float] # {x: 0, y: 0}
     args: Optional[Dict[str, str]] = {}
-    resources: Optional[Dict[str, str]] = {}
+    resources: Optional[Dict[str, str]] = {} # cpu_*, memory_*, gpu_limit, gpu_type overrides
+    caching: Optional[CachingPolicy] = None # overrides Component.caching field by field
+    kind: str = "component" # component | parallel_for (fan-out) | collect (fan-in) | pipeline (nested)
+    pipeline_id: Optional[str] = None # pipeline: saved Pipeline run as a sub-DAG, wired through its ports
+    loop_input: Optional[str] = None # parallel_for: input receiving each item of the JSON list in args
+    parallelism: Optional[int] = None # parallel_for: max concurrent iterations, unlimited if unset
+    retry: Optional[RetryPolicy] = None # overrides Component.retry field by field
+    timeout: Optional[str] = None
+    volcano: Optional[VolcanoSettings] = None # overrides Component.volcano field by field
+    storage_profile: Optional[str] = None # overrides Component.storage_profile
+    node_pool: Optional[str] = None # pins the task to a node pool and picks that pool's storage endpoint
+
+    @field_validator("resources")
+    @classmethod
+    def check_resources(cls, v: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        # Pairing with gpu_type depends on the component; see ComponentResources.accelerator
+        check_gpu_limit((v or {}).get("gpu_limit"))
+        return v
 
 class PipelineEdge(BaseModel):
     id: str
@@ -46,10 +152,32 @@ class PipelineEdge(BaseModel):
     sourceHandle: Optional[str] = None # output name
     targetHandle: Optional[str] = None # input name
 
+class PipelinePort(BaseModel):
+    name: str
+    node_id: str
+    handle: str # input or output name on the node
+
 class Pipeline(BaseModel):
     id: Optional[str] = None
     name: str
     description: Optional[str] = None
     nodes: List[PipelineNode] = []
     edges: List[PipelineEdge] = []
+    # Interface when nested in another pipeline; derived from unconnected inputs/outputs if empty
+    inputs: List[PipelinePort] = []
+    outputs: List[PipelinePort] = []
     last_run_id: Optional[str] = None
+    revision: int = 0
+
+class PipelinePatchOp(BaseModel):
+    op: str # add_node | move_node | remove_node | add_edge | remove_edge | set_arg
+    node: Optional[PipelineNode] = None
+    node_id: Optional[str] = None
+    position: Optional[Dict[str, float]] = None
+    edge: Optional[PipelineEdge] = None
+    edge_id: Optional[str] = None
+    name: Optional[str] = None
+    value: Optional[str] = None # set_arg: None removes the argument
+
+class PipelinePatch(BaseModel):
+    ops: List[PipelinePatchOp] = []
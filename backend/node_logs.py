@@ -0,0 +1,218 @@
+"""
+Logs of a pipeline node, read from where they live and filtered server-side.
+
+Local runs read the node's log file. For KFP runs the node's pods are looked
+up once per run (task details -> node ids) and cached, for good once the run
+has finished; each pod's log then
+comes from the first source in LOG_SOURCES that has it:
+
+  - "kubernetes": the pod's container log through the Kubernetes API, while
+    the pod still exists
+  - "archive": the log Argo archived to the object store once the pod is
+    gone, at LOG_ARCHIVE_URI (with Argo's archiveLogs keyFormat set to
+    logs/{{workflow.labels.pipeline/runid}}/{{pod.name}})
+  - "file": <LOG_FILE_ROOT>/<pod>.log, a local stand-in for the cluster
+
+Other sources can be added with register_source(name, read), where
+read(run_id, pod, since_s, tail) returns an iterator of log lines, or None
+if the source has no log for the pod. Lines may start with an RFC 3339
+timestamp (as the Kubernetes source requests); since is applied to those
+and the timestamps are stripped unless asked for. tail is only passed on
+when no other filter applies and the node has a single pod, so sources may
+apply it natively.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import local_executor
+import object_store
+from metrics import CACHE_REQUESTS
+
+LOG_SOURCES = [s.strip() for s in os.getenv("LOG_SOURCES", "kubernetes,archive").split(",") if s.strip()]
+KFP_NAMESPACE = os.getenv("KFP_NAMESPACE", "kubeflow")
+# Container of a KFP task pod that runs the component's command
+LOG_CONTAINER = os.getenv("LOG_CONTAINER", "main")
+LOG_ARCHIVE_URI = os.getenv("LOG_ARCHIVE_URI", "s3://mlpipeline/logs/{run_id}/{pod}/main.log")
+LOG_FILE_ROOT = os.getenv("LOG_FILE_ROOT", os.path.join("data", "pod_logs"))
+LOG_POD_CACHE_SIZE = int(os.getenv("LOG_POD_CACHE_SIZE", "256"))
+# Until a run finishes its pods can still change (retries, fan-out iterations)
+LOG_POD_REFRESH_S = 5.0
+# Stored logs are read in blocks of this size, from the end when only the tail is wanted
+LOG_READ_BLOCK = 64 * 1024
+
+_TIMESTAMP = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d) ")
+
+_pods = OrderedDict()
+_pods_lock = threading.Lock()
+
+# Node -> pods
+
+def node_pods(run_id: str, node_id: str, resolve: Callable[[], Tuple[Dict[str, List[str]], bool]]) -> List[str]:
+    """
+    Pods that ran the node, from the run's node -> pods map. resolve() returns
+    the map and whether the run has finished; the map of a finished run is
+    cached for good, that of a running one for LOG_POD_REFRESH_S.
+    """
+    now = time.monotonic()
+    with _pods_lock:
+        cached = _pods.get(run_id)
+        if cached is not None:
+            _pods.move_to_end(run_id)
+    if cached is not None:
+        mapping, final, resolved_at = cached
+        if final or (node_id in mapping and now - resolved_at < LOG_POD_REFRESH_S):
+            CACHE_REQUESTS.inc(cache="log_pods", result="hit")
+            return mapping.get(node_id) or []
+    CACHE_REQUESTS.inc(cache="log_pods", result="miss")
+    mapping, final = resolve()
+    with _pods_lock:
+        _pods[run_id] = (mapping, final, now)
+        while len(_pods) > LOG_POD_CACHE_SIZE:
+            _pods.popitem(last=False)
+    return mapping.get(node_id) or []
+
+# Sources
+
+def _store_lines(store, key: str, tail: Optional[int] = None) -> Optional[Iterator[str]]:
+    size = store.size(key)
+    if size is None:
+        return None
+    if tail:
+        # Read blocks back from the end until they hold tail lines
+        start, data = size, b""
+        while start > 0 and data.count(b"\n") <= tail:
+            start = max(0, start - LOG_READ_BLOCK)
+            data = store.read_range(key, start, min(LOG_READ_BLOCK, size - start)) + data
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        return iter(lines[-tail:])
+
+    def forward():
+        pending = b""
+        for start in range(0, size, LOG_READ_BLOCK):
+            pending += store.read_range(key, start, min(LOG_READ_BLOCK, size - start))
+            *complete, pending = pending.split(b"\n")
+            for line in complete:
+                yield line.decode("utf-8", errors="replace")
+        if pending:
+            yield pending.decode("utf-8", errors="replace")
+    return forward()
+
+_kube_lock = threading.Lock()
+_kube_api = None
+
+def _core_api():
+    global _kube_api
+    with _kube_lock:
+        if _kube_api is None:
+            from kubernetes import client, config  # deferred: optional dependency
+            try:
+                config.load_incluster_config()
+            except config.ConfigException:
+                config.load_kube_config()
+            _kube_api = client.CoreV1Api()
+        return _kube_api
+
+def read_from_kubernetes(run_id: str, pod: str, since_s: Optional[int], tail: Optional[int]) -> Optional[Iterator[str]]:
+    from kubernetes.client.rest import ApiException
+    try:
+        resp = _core_api().read_namespaced_pod_log(pod, KFP_NAMESPACE, container=LOG_CONTAINER, since_seconds=since_s,
+                                                   tail_lines=tail, timestamps=True, _preload_content=False)
+    except ApiException as e:
+        if e.status == 404:
+            # Pod already deleted; the archive may have it
+            return None
+        raise e
+
+    def lines():
+        pending = b""
+        try:
+            for chunk in resp.stream(LOG_READ_BLOCK):
+                pending += chunk
+                *complete, pending = pending.split(b"\n")
+                for line in complete:
+                    yield line.decode("utf-8", errors="replace")
+            if pending:
+                yield pending.decode("utf-8", errors="replace")
+        finally:
+            resp.release_conn()
+    return lines()
+
+def read_from_archive(run_id: str, pod: str, since_s: Optional[int], tail: Optional[int]) -> Optional[Iterator[str]]:
+    store, key = object_store.open_uri(LOG_ARCHIVE_URI.format(run_id=run_id, pod=pod))
+    return _store_lines(store, key, tail)
+
+def read_from_file(run_id: str, pod: str, since_s: Optional[int], tail: Optional[int]) -> Optional[Iterator[str]]:
+    return _store_lines(object_store.LocalStore(), os.path.join(LOG_FILE_ROOT, f"{pod}.log"), tail)
+
+SOURCES: Dict[str, Callable[[str, str, Optional[int], Optional[int]], Optional[Iterator[str]]]] = {
+    "kubernetes": read_from_kubernetes,
+    "archive": read_from_archive,
+    "file": read_from_file,
+}
+
+def register_source(name: str, read: Callable[[str, str, Optional[int], Optional[int]], Optional[Iterator[str]]]) -> None:
+    SOURCES[name] = read
+
+# Reading and filtering
+
+def _line_time(line: str):
+    """(seconds since epoch or None, line without its timestamp)."""
+    m = _TIMESTAMP.match(line)
+    if not m:
+        return None, line
+    # fromisoformat takes at most microseconds; Kubernetes reports nanoseconds
+    fraction = (m.group(2) or "")[:7]
+    zone = "+00:00" if m.group(3) == "Z" else m.group(3)
+    return datetime.fromisoformat(m.group(1) + fraction + zone).timestamp(), line[m.end():]
+
+def _filtered(lines: Iterator[str], pattern: Optional[re.Pattern], since: Optional[float],
+              timestamps: bool, prefix: str) -> Iterator[str]:
+    for line in lines:
+        at, text = _line_time(line)
+        if since is not None and at is not None and at < since:
+            continue
+        if pattern is not None and not pattern.search(text):
+            continue
+        yield prefix + (line if timestamps else text)
+
+def open_logs(run_id: str, node_id: str, pods: List[str], tail: Optional[int] = None, since_s: Optional[int] = None,
+              pattern: Optional[str] = None, timestamps: bool = False) -> Optional[Iterator[str]]:
+    """
+    The node's log lines, filtered: only lines within the last since_s
+    seconds and matching pattern (a regex), then the last tail of those.
+    Lines of fan-out nodes with several pods are prefixed with the pod name.
+    Opens every log before returning, so a missing log or an unreachable
+    source raises here rather than mid-stream. None if no log is found.
+    Raises re.error for an invalid pattern.
+    """
+    regex = re.compile(pattern) if pattern else None
+    since = time.time() - since_s if since_s else None
+    # Sources can only cut the tail themselves when nothing is filtered out after
+    # them and there is a single log, the tail applying to the merged lines
+    single = local_executor.is_local_run(run_id) or len(pods) == 1
+    native_tail = tail if regex is None and since is None and single else None
+    opened = []
+    if local_executor.is_local_run(run_id):
+        log = _store_lines(object_store.LocalStore(), local_executor.node_log_path(run_id, node_id), native_tail)
+        if log is not None:
+            opened.append(("", log))
+    for pod in pods:
+        for name in LOG_SOURCES:
+            if name not in SOURCES:
+                raise ValueError(f"Unknown log source '{name}'")
+            log = SOURCES[name](run_id, pod, since_s, native_tail)
+            if log is not None:
+                opened.append((f"[{pod}] " if len(pods) > 1 else "", log))
+                break
+    if not opened:
+        return None
+
+    def merged():
+        for prefix, log in opened:
+            yield from _filtered(log, regex, since, timestamps, prefix)
+    return iter(deque(merged(), maxlen=tail)) if tail else merged()
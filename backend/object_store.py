@@ -0,0 +1,165 @@
+"""
+Byte-range access to artifact objects, so callers can read the head or tail
+of an object without downloading it.
+
+s3://bucket/key URIs go to the S3-compatible store at S3_ENDPOINT (MinIO, or
+any stand-in speaking the S3 API) through the minio SDK, imported on first
+use. With OBJECT_STORE=local they resolve under LOCAL_S3_ROOT instead, the
+layout the local executor uses; plain paths always read from local disk.
+"""
+import os
+from typing import List, Optional, Tuple
+
+import local_executor
+
+OBJECT_STORE = os.getenv("OBJECT_STORE", "s3")
+S3_ENDPOINT = os.getenv("S3_ENDPOINT", "http://localhost:30099")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", os.getenv("MINIO_ACCESS_KEY", "minio"))
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", os.getenv("MINIO_SECRET_KEY", "minio123"))
+
+class LocalStore:
+    """Objects are files under root; keys are relative paths."""
+
+    def __init__(self, root: str = ""):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key) if self.root else key
+
+    def size(self, key: str) -> Optional[int]:
+        path = self._path(key)
+        return os.path.getsize(path) if os.path.isfile(path) else None
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def list(self, prefix: str, limit: int = 1000) -> List[Tuple[str, int]]:
+        base = self._path(prefix)
+        if not os.path.isdir(base):
+            return []
+        found = []
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                found.append((os.path.relpath(path, self._path("")) if self.root else path, os.path.getsize(path)))
+                if len(found) >= limit:
+                    return found
+        return found
+
+class S3Store:
+    """One bucket of an S3-compatible store; reads use Range requests."""
+
+    def __init__(self, bucket: str, endpoint: str = None, access_key: str = None, secret_key: str = None):
+        self.bucket = bucket
+        self.endpoint = endpoint or S3_ENDPOINT
+        self.access_key = access_key or S3_ACCESS_KEY
+        self.secret_key = secret_key or S3_SECRET_KEY
+
+    def _client(self):
+        from minio import Minio  # deferred: optional dependency
+        host = self.endpoint.replace("https://", "").replace("http://", "")
+        return Minio(host, access_key=self.access_key, secret_key=self.secret_key,
+                     secure=self.endpoint.startswith("https://"))
+
+    def size(self, key: str) -> Optional[int]:
+        from minio.error import S3Error
+        try:
+            return self._client().stat_object(self.bucket, key).size
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+                return None
+            raise e
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        resp = self._client().get_object(self.bucket, key, offset=start, length=length)
+        try:
+            return resp.read()
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    def list(self, prefix: str, limit: int = 1000) -> List[Tuple[str, int]]:
+        found = []
+        prefix = prefix.rstrip("/") + "/" if prefix else ""
+        for obj in self._client().list_objects(self.bucket, prefix=prefix, recursive=True):
+            if not obj.is_dir:
+                found.append((obj.object_name, obj.size))
+                if len(found) >= limit:
+                    break
+        return found
+
+def open_uri(uri: str):
+    """Returns (store, key) for an artifact URI or local path."""
+    if uri.startswith("s3://"):
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        if OBJECT_STORE == "local":
+            return LocalStore(os.path.join(local_executor.LOCAL_S3_ROOT, bucket)), key
+        return S3Store(bucket), key
+    if uri.startswith("file://"):
+        uri = uri[len("file://"):]
+    return LocalStore(), uri
+
+class ReadBudgetExceeded(IOError):
+    pass
+
+class RangeFile:
+    """
+    Read-only, seekable file object over an object that fetches only the
+    ranges actually read, in blocks of at least block_size. Lets pyarrow open
+    Parquet/Arrow files by reading the footer and selected row groups only.
+    Fetching more than max_bytes in total raises ReadBudgetExceeded.
+    """
+
+    def __init__(self, store, key: str, size: int, block_size: int = 64 * 1024, max_bytes: Optional[int] = None):
+        self.store = store
+        self.key = key
+        self._size = size
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.pos = 0
+        self.bytes_read = 0
+        self._buf = b""
+        self._buf_start = 0
+        self.closed = False
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def size(self):
+        return self._size
+
+    def seek(self, offset, whence=0):
+        base = {0: 0, 1: self.pos, 2: self._size}[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self._size - self.pos
+        n = max(0, min(n, self._size - self.pos))
+        offset = self.pos - self._buf_start
+        if not (0 <= offset and offset + n <= len(self._buf)):
+            # Small reads (e.g. a footer length) pull a whole block so the next read is served locally
+            fetch = min(max(n, self.block_size), self._size - self.pos)
+            if self.max_bytes is not None and self.bytes_read + fetch > self.max_bytes:
+                fetch = max(n, self.max_bytes - self.bytes_read)
+                if self.bytes_read + fetch > self.max_bytes:
+                    raise ReadBudgetExceeded(f"Reading {self.key} needs more than {self.max_bytes} bytes")
+            self._buf = self.store.read_range(self.key, self.pos, fetch) if fetch else b""
+            self._buf_start, offset = self.pos, 0
+            self.bytes_read += len(self._buf)
+        data = self._buf[offset:offset + n]
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        self.closed = True
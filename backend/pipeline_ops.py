@@ -0,0 +1,68 @@
+from typing import List
+from models import Pipeline, PipelinePatchOp
+
+def _find_node(pipeline: Pipeline, node_id: str):
+    for n in pipeline.nodes:
+        if n.id == node_id:
+            return n
+    raise ValueError(f"Node {node_id} not found")
+
+def apply_op(pipeline: Pipeline, op: PipelinePatchOp) -> None:
+    """
+    Applies a single node/edge-level edit to the pipeline in place.
+    Raises ValueError if the op is malformed or does not fit the current graph.
+    """
+    if op.op == "add_node":
+        if not op.node:
+            raise ValueError("add_node requires 'node'")
+        if any(n.id == op.node.id for n in pipeline.nodes):
+            raise ValueError(f"Node {op.node.id} already exists")
+        pipeline.nodes.append(op.node)
+    elif op.op == "move_node":
+        if not op.node_id or op.position is None:
+            raise ValueError("move_node requires 'node_id' and 'position'")
+        _find_node(pipeline, op.node_id).position = dict(op.position)
+    elif op.op == "remove_node":
+        if not op.node_id:
+            raise ValueError("remove_node requires 'node_id'")
+        node = _find_node(pipeline, op.node_id)
+        pipeline.nodes.remove(node)
+        # Edges attached to a removed node are dropped with it
+        pipeline.edges = [e for e in pipeline.edges if e.source != op.node_id and e.target != op.node_id]
+    elif op.op == "add_edge":
+        if not op.edge:
+            raise ValueError("add_edge requires 'edge'")
+        if any(e.id == op.edge.id for e in pipeline.edges):
+            raise ValueError(f"Edge {op.edge.id} already exists")
+        _find_node(pipeline, op.edge.source)
+        _find_node(pipeline, op.edge.target)
+        pipeline.edges.append(op.edge)
+    elif op.op == "remove_edge":
+        if not op.edge_id:
+            raise ValueError("remove_edge requires 'edge_id'")
+        remaining = [e for e in pipeline.edges if e.id != op.edge_id]
+        if len(remaining) == len(pipeline.edges):
+            raise ValueError(f"Edge {op.edge_id} not found")
+        pipeline.edges = remaining
+    elif op.op == "set_arg":
+        if not op.node_id or not op.name:
+            raise ValueError("set_arg requires 'node_id' and 'name'")
+        node = _find_node(pipeline, op.node_id)
+        args = dict(node.args or {})
+        if op.value is None:
+            args.pop(op.name, None)
+        else:
+            args[op.name] = op.value
+        node.args = args
+    else:
+        raise ValueError(f"Unknown op '{op.op}'")
+
+def apply_ops(pipeline: Pipeline, ops: List[PipelinePatchOp]) -> Pipeline:
+    """
+    Applies ops in order to a copy of the pipeline; the input is left untouched
+    if any op fails, so a patch either applies completely or not at all.
+    """
+    patched = pipeline.copy(deep=True)
+    for op in ops:
+        apply_op(patched, op)
+    return patched
@@ -0,0 +1,101 @@
+"""
+Opt-in cProfile capture of single requests.
+
+With PROFILING_ENABLED set, a request carrying an `X-Profile: 1` header or
+a `?profile=1` query flag on a profiled route is run under cProfile and the
+result is stored as PROFILE_DIR/<id>.pstats (readable with pstats/snakeviz,
+convertible to a flamegraph with flameprof). The id is returned in the
+X-Profile-Id response header. Only the newest PROFILE_KEEP captures are kept.
+"""
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import Request, Response
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# cProfile cannot run two profilers at once on newer interpreters; a request
+# arriving while another is being captured runs unprofiled
+_capture_lock = threading.Lock()
+
+def requested(request: Request) -> bool:
+    if not PROFILING_ENABLED:
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+def _meta_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+def stats_path(profile_id: str) -> Optional[str]:
+    # Ids come from the URL, so only accept names this module generates
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.pstats")
+    return path if os.path.exists(path) else None
+
+@contextlib.contextmanager
+def capture(request: Request, response: Response, name: str, **meta):
+    """
+    Profiles the enclosed block when the request asks for it, storing the
+    stats under a new id and exposing it through the X-Profile-Id header.
+    """
+    if not requested(request) or not _capture_lock.acquire(blocking=False):
+        yield
+        return
+    profile_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.pstats"))
+            with open(_meta_path(profile_id), "w") as f:
+                json.dump({
+                    "id": profile_id,
+                    "name": name,
+                    "path": request.url.path,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "duration_ms": round(duration * 1000.0, 3),
+                    **meta,
+                }, f)
+            response.headers[PROFILE_ID_HEADER] = profile_id
+            _prune()
+    finally:
+        _capture_lock.release()
+
+def list_profiles() -> List[dict]:
+    if not os.path.exists(PROFILE_DIR):
+        return []
+    profiles = []
+    for filename in os.listdir(PROFILE_DIR):
+        if filename.endswith(".json"):
+            try:
+                with open(os.path.join(PROFILE_DIR, filename), "r") as f:
+                    profiles.append(json.load(f))
+            except Exception as e:
+                print(f"Error loading profile {filename}: {e}")
+    profiles.sort(key=lambda p: p.get("created_at", ""), reverse=True)
+    return profiles
+
+def _prune() -> None:
+    for stale in list_profiles()[PROFILE_KEEP:]:
+        for path in (os.path.join(PROFILE_DIR, f"{stale['id']}.pstats"), _meta_path(stale["id"])):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,223 @@
+"""
+Measured CPU/memory/duration of finished nodes, aggregated per component into
+resource request recommendations.
+
+Samples are kept in USAGE_DB (SQLite), one per (run, node). Local runs record
+their own usage from the child processes' rusage. KFP runs are collected once
+they finish, through a pluggable source selected with USAGE_SOURCE:
+
+  - "kfp": task durations from the run details (no CPU/memory)
+  - "prometheus": durations from the run details plus each task pod's average
+    CPU and peak working set from cAdvisor metrics at PROMETHEUS_URL
+
+Other sources can be added with register_source(name, collect), where
+collect(run_id) returns {task display name: {cpu_cores, memory_bytes, duration_s}}.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from metrics import STORAGE_LATENCY
+
+USAGE_DB = os.getenv("USAGE_DB", os.path.join("data", "usage.db"))
+PROMETHEUS_URL = os.getenv("PROMETHEUS_URL", "")
+USAGE_SOURCE = os.getenv("USAGE_SOURCE", "prometheus" if PROMETHEUS_URL else "kfp")
+# Container of a KFP task pod that runs the component's command
+PROMETHEUS_CONTAINER = os.getenv("PROMETHEUS_CONTAINER", "main")
+# Recommended request = p95 usage * (1 + headroom), from the most recent samples
+RECOMMEND_HEADROOM = float(os.getenv("RECOMMEND_HEADROOM", "0.2"))
+RECOMMEND_MIN_SAMPLES = int(os.getenv("RECOMMEND_MIN_SAMPLES", "3"))
+RECOMMEND_MAX_SAMPLES = int(os.getenv("RECOMMEND_MAX_SAMPLES", "200"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    run_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    pipeline_id TEXT,
+    component_id TEXT NOT NULL,
+    cpu_cores REAL,
+    memory_bytes REAL,
+    duration_s REAL,
+    source TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (run_id, node_id)
+);
+CREATE INDEX IF NOT EXISTS idx_samples_component ON samples (component_id, recorded_at);
+"""
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def _connect() -> sqlite3.Connection:
+    global _initialized
+    if not _initialized:
+        with _init_lock:
+            if not _initialized:
+                os.makedirs(os.path.dirname(USAGE_DB) or ".", exist_ok=True)
+                conn = sqlite3.connect(USAGE_DB)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                conn.close()
+                _initialized = True
+    return sqlite3.connect(USAGE_DB, timeout=10)
+
+@STORAGE_LATENCY.time(op="write", kind="usage")
+def record(pipeline_id: str, run_id: str, samples: Dict[str, dict], components: Dict[str, str], source: str) -> int:
+    """
+    Stores {node_id: {cpu_cores, memory_bytes, duration_s}} for a run;
+    components maps node ids to component ids. Returns the rows added.
+    """
+    now = time.time()
+    rows = [(run_id, node_id, pipeline_id, components[node_id], u.get("cpu_cores"), u.get("memory_bytes"),
+             u.get("duration_s"), source, now)
+            for node_id, u in samples.items() if node_id in components]
+    conn = _connect()
+    try:
+        with conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            return conn.total_changes - before
+    finally:
+        conn.close()
+
+def has_run(run_id: str) -> bool:
+    conn = _connect()
+    try:
+        return conn.execute("SELECT 1 FROM samples WHERE run_id = ? LIMIT 1", (run_id,)).fetchone() is not None
+    finally:
+        conn.close()
+
+# Sources
+
+def _seconds(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def _durations(run_id: str) -> List[dict]:
+    import kfp_client
+    tasks = []
+    for t in kfp_client.get_run_task_details(run_id):
+        start, end = _seconds(t.get("start_time")), _seconds(t.get("end_time"))
+        # Only tasks that ran to completion; cached tasks report no usage
+        if str(t.get("state")).upper() != "SUCCEEDED" or not start or not end or end <= start:
+            continue
+        tasks.append({**t, "start": start, "end": end, "duration_s": end - start})
+    return tasks
+
+def collect_from_kfp(run_id: str) -> Dict[str, dict]:
+    return {t["name"]: {"duration_s": t["duration_s"]} for t in _durations(run_id)}
+
+def _prometheus_value(query: str, at: float) -> Optional[float]:
+    url = f"{PROMETHEUS_URL.rstrip('/')}/api/v1/query?{urlencode({'query': query, 'time': at})}"
+    with urlopen(url, timeout=10) as resp:
+        data = json.loads(resp.read().decode("utf-8"))
+    result = (data.get("data") or {}).get("result") or []
+    values = [float(r["value"][1]) for r in result if r.get("value")]
+    return max(values) if values else None
+
+def collect_from_prometheus(run_id: str) -> Dict[str, dict]:
+    if not PROMETHEUS_URL:
+        raise ValueError("PROMETHEUS_URL is not set")
+    out = {}
+    for t in _durations(run_id):
+        usage = {"duration_s": t["duration_s"]}
+        window = f"{max(1, math.ceil(t['duration_s']))}s"
+        for pod in t["pods"]:
+            selector = f'pod="{pod}",container="{PROMETHEUS_CONTAINER}"'
+            cpu = _prometheus_value(f"sum(increase(container_cpu_usage_seconds_total{{{selector}}}[{window}]))", t["end"])
+            mem = _prometheus_value(f"max(max_over_time(container_memory_working_set_bytes{{{selector}}}[{window}]))", t["end"])
+            # Fan-out tasks have a pod per iteration; size for the largest
+            if cpu is not None:
+                usage["cpu_cores"] = max(usage.get("cpu_cores") or 0.0, cpu / t["duration_s"])
+            if mem is not None:
+                usage["memory_bytes"] = max(usage.get("memory_bytes") or 0.0, mem)
+        out[t["name"]] = usage
+    return out
+
+SOURCES: Dict[str, Callable[[str], Dict[str, dict]]] = {
+    "kfp": collect_from_kfp,
+    "prometheus": collect_from_prometheus,
+}
+
+def register_source(name: str, collect: Callable[[str], Dict[str, dict]]) -> None:
+    SOURCES[name] = collect
+
+def collect(run_id: str, source: Optional[str] = None) -> Dict[str, dict]:
+    """Usage by task display name for a finished KFP run, from the configured source."""
+    name = source or USAGE_SOURCE
+    if name not in SOURCES:
+        raise ValueError(f"Unknown usage source '{name}'")
+    return SOURCES[name](run_id)
+
+# Recommendations
+
+def _percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank, so the result is always an observed value
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+def _summary(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    return {"p50": _percentile(values, 50), "p95": _percentile(values, 95), "max": max(values), "samples": len(values)}
+
+def format_cpu(cores: float) -> str:
+    return f"{max(10, math.ceil(cores * 100) * 10)}m"
+
+def format_memory(num_bytes: float) -> str:
+    return f"{max(16, math.ceil(num_bytes / 2**20))}Mi"
+
+_CPU_UNITS = {"m": 0.001}
+_MEMORY_UNITS = {"Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40, "K": 1e3, "M": 1e6, "G": 1e9, "T": 1e12}
+
+def parse_cpu(value: str) -> float:
+    v = str(value).strip()
+    return float(v[:-1]) * _CPU_UNITS["m"] if v.endswith("m") else float(v)
+
+def parse_memory(value: str) -> float:
+    v = str(value).strip()
+    for unit in sorted(_MEMORY_UNITS, key=len, reverse=True):
+        if v.endswith(unit):
+            return float(v[:-len(unit)]) * _MEMORY_UNITS[unit]
+    return float(v)
+
+@STORAGE_LATENCY.time(op="read", kind="usage")
+def recommend(component_id: str) -> dict:
+    """
+    p50/p95/max of the component's measured usage over its most recent
+    samples, and the requests to set once there are enough of them.
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT cpu_cores, memory_bytes, duration_s FROM samples WHERE component_id = ? "
+                            "ORDER BY recorded_at DESC LIMIT ?", (component_id, RECOMMEND_MAX_SAMPLES)).fetchall()
+    finally:
+        conn.close()
+    cpu = _summary([r[0] for r in rows if r[0] is not None])
+    memory = _summary([r[1] for r in rows if r[1] is not None])
+    recommended = {}
+    if cpu and cpu["samples"] >= RECOMMEND_MIN_SAMPLES:
+        recommended["cpu_request"] = format_cpu(cpu["p95"] * (1 + RECOMMEND_HEADROOM))
+    if memory and memory["samples"] >= RECOMMEND_MIN_SAMPLES:
+        recommended["memory_request"] = format_memory(memory["p95"] * (1 + RECOMMEND_HEADROOM))
+    return {
+        "component_id": component_id,
+        "samples": len(rows),
+        "cpu_cores": cpu,
+        "memory_bytes": memory,
+        "duration_s": _summary([r[2] for r in rows if r[2] is not None]),
+        "recommended": recommended,
+    }
@@ -0,0 +1,11 @@
+"""
+Run and task states after which nothing changes any more, shared by every
+module that waits for runs to finish. KFP reports them in upper case (v2)
+or capitalized (v1 / Argo); compare str(state).upper() against these sets.
+"""
+
+# A run (or task) in one of these states will not change any more
+TERMINAL_STATES = frozenset({"SUCCEEDED", "FAILED", "CANCELED", "CANCELLED", "SKIPPED", "ERROR"})
+
+# Tasks also end as cache hits or without ever running
+TASK_DONE_STATES = TERMINAL_STATES | {"CACHED", "OMITTED"}
@@ -0,0 +1,73 @@
+"""
+Background watch over submitted KFP runs, so the work due when a run
+finishes (indexing its outputs for lineage, collecting its resource usage)
+happens for every run, not just for the one a user happens to poll as the
+pipeline's last run.
+
+The runs watched are those the lineage index has recorded as submitted but
+not completed, so the watch list survives restarts and is shared by every
+worker process. Each is polled every RUN_WATCH_POLL_S seconds and handed to
+the finished callback once its status is terminal; the callback marks it
+completed in the index, which takes it off the list. Runs still unfinished
+after RUN_WATCH_MAX_AGE_S (e.g. deleted from KFP) stop being polled.
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+import lineage
+
+RUN_WATCH_POLL_S = float(os.getenv("RUN_WATCH_POLL_S", "15"))
+RUN_WATCH_MAX_AGE_S = float(os.getenv("RUN_WATCH_MAX_AGE_S", str(7 * 86400)))
+
+class RunWatcher:
+    def __init__(self, on_status: Callable[[str, str, str], None], poll_s: float = 15.0,
+                 max_age_s: float = 7 * 86400, get_status: Optional[Callable[[str], str]] = None):
+        # on_status(pipeline_id, run_id, status) is called for every poll of a watched run
+        self.on_status = on_status
+        self.poll_s = poll_s
+        self.max_age_s = max_age_s
+        self.get_status = get_status or _kfp_status
+        self._lock = threading.Lock()
+        self._thread = None
+        self._kicked = False
+
+    def start(self) -> None:
+        """Starts polling, if not already running; call after recording a submission."""
+        with self._lock:
+            # A poller about to stop for lack of runs checks again
+            self._kicked = True
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def poll_once(self) -> int:
+        """Polls every watched run once; returns how many are still watched."""
+        runs = lineage.pending_runs(time.time() - self.max_age_s)
+        for run_id, pipeline_id in runs:
+            try:
+                self.on_status(pipeline_id, run_id, self.get_status(run_id))
+            except Exception as e:
+                print(f"Failed to poll run {run_id}: {e}")
+        return len(runs)
+
+    def _poll(self) -> None:
+        while True:
+            time.sleep(self.poll_s)
+            with self._lock:
+                self._kicked = False
+            try:
+                watched = self.poll_once()
+            except Exception as e:
+                print(f"Failed to list runs to watch: {e}")
+                watched = 1
+            with self._lock:
+                if not watched and not self._kicked:
+                    self._thread = None
+                    return
+
+def _kfp_status(run_id: str) -> str:
+    import kfp_client
+    return kfp_client.get_run_status(run_id)
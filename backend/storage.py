@@ -1,24 +1,82 @@
 import json
 import os
+import threading
 import uuid
-from typing import List, Optional
-from models import Component, Pipeline
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import List, Optional, Tuple
+from models import Component, Pipeline, PipelinePatchOp
+from pipeline_ops import apply_ops
+from metrics import STORAGE_LATENCY
+import component_search
+
+try:
+    import fcntl
+except ImportError:  # Windows: pipeline writes are serialized within one process only
+    fcntl = None
 
 DATA_DIR = "data"
 COMPONENTS_DIR = os.path.join(DATA_DIR, "components")
 PIPELINES_DIR = os.path.join(DATA_DIR, "pipelines")
+PIPELINE_OPLOG_COMPACT_OPS = int(os.getenv("PIPELINE_OPLOG_COMPACT_OPS", "200"))
+# Concurrent file writes for bulk imports
+BATCH_WRITE_WORKERS = 16
+
+_pipeline_lock = threading.RLock()
 
 os.makedirs(COMPONENTS_DIR, exist_ok=True)
 os.makedirs(PIPELINES_DIR, exist_ok=True)
 
+@contextmanager
+def _pipelines_locked(exclusive: bool = True):
+    """
+    Locks the pipeline files against other threads and worker processes:
+    exclusively for writes (snapshot, op log append, compaction), shared for
+    reads, so a read never sees a snapshot and log from different moments.
+    """
+    with _pipeline_lock if exclusive else nullcontext():
+        if fcntl is None:
+            yield
+            return
+        # A new open file per acquisition, so flock also excludes other threads
+        with open(os.path.join(PIPELINES_DIR, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def is_safe_id(entity_id: str) -> bool:
+    """Whether an id can be used as a file name within its data directory."""
+    return bool(entity_id) and entity_id not in (".", "..") and not any(c in entity_id for c in "/\\\0")
+
+@STORAGE_LATENCY.time(op="write", kind="component")
 def save_component(component: Component) -> Component:
     if not component.id:
         component.id = str(uuid.uuid4())
     file_path = os.path.join(COMPONENTS_DIR, f"{component.id}.json")
     with open(file_path, "w") as f:
         f.write(component.json())
+    component_search.index(component, os.path.getmtime(file_path))
     return component
 
+@STORAGE_LATENCY.time(op="write", kind="component_batch")
+def save_component_docs(docs: List[tuple]) -> None:
+    """
+    Writes many already validated components, given as (id, json text, search
+    index row), with parallel file writes and a single index transaction.
+    """
+    def write(doc):
+        file_path = os.path.join(COMPONENTS_DIR, f"{doc[0]}.json")
+        with open(file_path, "w") as f:
+            f.write(doc[1])
+        return os.path.getmtime(file_path)
+
+    with ThreadPoolExecutor(max_workers=BATCH_WRITE_WORKERS) as pool:
+        mtimes = list(pool.map(write, docs))
+    component_search.index_rows([(doc[2], mtime) for doc, mtime in zip(docs, mtimes)])
+
+@STORAGE_LATENCY.time(op="list", kind="component")
 def list_components() -> List[Component]:
     components = []
     if not os.path.exists(COMPONENTS_DIR):
@@ -33,6 +91,7 @@ def list_components() -> List[Component]:
                     print(f"Error loading component {filename}: {e}")
     return components
 
+@STORAGE_LATENCY.time(op="read", kind="component")
 def get_component(component_id: str) -> Optional[Component]:
     file_path = os.path.join(COMPONENTS_DIR, f"{component_id}.json")
     if os.path.exists(file_path):
@@ -41,46 +100,165 @@ def get_component(component_id: str) -> Optional[Component]:
             return Component(**data)
     return None
 
+@STORAGE_LATENCY.time(op="delete", kind="component")
 def delete_component(component_id: str) -> bool:
     file_path = os.path.join(COMPONENTS_DIR, f"{component_id}.json")
     if os.path.exists(file_path):
         os.remove(file_path)
+        component_search.remove(component_id)
         return True
     return False
 
+def _pipeline_log_path(pipeline_id: str) -> str:
+    return os.path.join(PIPELINES_DIR, f"{pipeline_id}.ops.jsonl")
+
+def _pipeline_log_entries(pipeline_id: str) -> List[dict]:
+    log_path = _pipeline_log_path(pipeline_id)
+    if not os.path.exists(log_path):
+        return []
+    entries = []
+    with open(log_path, "r") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Torn line from an interrupted append; the ops in it were never acknowledged
+                continue
+    return entries
+
+def _replay_pipeline_log(pipeline: Pipeline) -> Tuple[Pipeline, int]:
+    """The pipeline with its logged edits applied, and the number of ops replayed."""
+    logged_ops = 0
+    for entry in _pipeline_log_entries(pipeline.id):
+        if entry.get("revision", 0) <= pipeline.revision:
+            # Already folded into the snapshot by a compaction or full save
+            continue
+        ops = [PipelinePatchOp(**op) for op in entry.get("ops", [])]
+        pipeline = apply_ops(pipeline, ops)
+        pipeline.revision = entry["revision"]
+        logged_ops += len(ops)
+    return pipeline, logged_ops
+
+def _load_pipeline(file_path: str) -> Tuple[Pipeline, int]:
+    with open(file_path, "r") as f:
+        data = json.load(f)
+    return _replay_pipeline_log(Pipeline(**data))
+
+def _write_pipeline_snapshot(pipeline: Pipeline) -> None:
+    file_path = os.path.join(PIPELINES_DIR, f"{pipeline.id}.json")
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(pipeline.json())
+    os.replace(tmp_path, file_path)
+
+@STORAGE_LATENCY.time(op="write", kind="pipeline")
 def save_pipeline(pipeline: Pipeline) -> Pipeline:
     if not pipeline.id:
         pipeline.id = str(uuid.uuid4())
-    file_path = os.path.join(PIPELINES_DIR, f"{pipeline.id}.json")
-    with open(file_path, "w") as f:
-        f.write(pipeline.json())
+    with _pipelines_locked():
+        # A full save supersedes any pending incremental edits. Snapshot first, at
+        # a revision past the logged ones, so a crash before the log is removed
+        # neither loses the edits nor replays them onto the new snapshot
+        entries = _pipeline_log_entries(pipeline.id)
+        pipeline.revision = max([pipeline.revision] + [e.get("revision", 0) for e in entries])
+        _write_pipeline_snapshot(pipeline)
+        if entries:
+            os.remove(_pipeline_log_path(pipeline.id))
     return pipeline
 
+@STORAGE_LATENCY.time(op="write", kind="pipeline_batch")
+def save_pipeline_docs(docs: List[tuple]) -> None:
+    """Writes many already validated pipelines, given as (id, json text), replacing any op logs."""
+    def write(doc):
+        file_path = os.path.join(PIPELINES_DIR, f"{doc[0]}.json")
+        with open(file_path + ".tmp", "w") as f:
+            f.write(doc[1])
+        os.replace(file_path + ".tmp", file_path)
+        log_path = _pipeline_log_path(doc[0])
+        if os.path.exists(log_path):
+            os.remove(log_path)
+
+    with _pipelines_locked(), ThreadPoolExecutor(max_workers=BATCH_WRITE_WORKERS) as pool:
+        list(pool.map(write, docs))
+
+@STORAGE_LATENCY.time(op="patch", kind="pipeline")
+def patch_pipeline(pipeline_id: str, ops: List[PipelinePatchOp]) -> Optional[Pipeline]:
+    """
+    Applies ops atomically and persists them as a single line appended to the
+    pipeline's op log. The log is folded back into the snapshot once it holds
+    PIPELINE_OPLOG_COMPACT_OPS ops. Raises ValueError if any op is invalid.
+    """
+    with _pipelines_locked():
+        file_path = os.path.join(PIPELINES_DIR, f"{pipeline_id}.json")
+        if not os.path.exists(file_path):
+            return None
+        # Counted from the log itself, so every worker process sees the same count
+        pipeline, logged_ops = _load_pipeline(file_path)
+        patched = apply_ops(pipeline, ops)
+        patched.revision = pipeline.revision + 1
+        entry = {"revision": patched.revision, "ops": [json.loads(op.json()) for op in ops]}
+        log_path = _pipeline_log_path(pipeline_id)
+        with open(log_path, "a+b") as f:
+            prefix = b""
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    prefix = b"\n"
+            f.write(prefix + (json.dumps(entry) + "\n").encode("utf-8"))
+        if logged_ops + len(ops) >= PIPELINE_OPLOG_COMPACT_OPS:
+            _write_pipeline_snapshot(patched)
+            os.remove(log_path)
+        return patched
+
+@STORAGE_LATENCY.time(op="write", kind="pipeline_run")
+def set_pipeline_last_run(pipeline_id: str, run_id: Optional[str]) -> Optional[Pipeline]:
+    """
+    Records the pipeline's latest run on its current state, re-read under the
+    lock, so edits made while the run was being compiled and submitted are kept.
+    """
+    with _pipelines_locked():
+        file_path = os.path.join(PIPELINES_DIR, f"{pipeline_id}.json")
+        if not os.path.exists(file_path):
+            return None
+        pipeline = _load_pipeline(file_path)[0]
+        pipeline.last_run_id = run_id
+        # The snapshot now includes every logged edit
+        _write_pipeline_snapshot(pipeline)
+        log_path = _pipeline_log_path(pipeline_id)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        return pipeline
+
+@STORAGE_LATENCY.time(op="list", kind="pipeline")
 def list_pipelines() -> List[Pipeline]:
     pipelines = []
     if not os.path.exists(PIPELINES_DIR):
         return []
-    for filename in os.listdir(PIPELINES_DIR):
-        if filename.endswith(".json"):
-            with open(os.path.join(PIPELINES_DIR, filename), "r") as f:
+    with _pipelines_locked(exclusive=False):
+        for filename in os.listdir(PIPELINES_DIR):
+            if filename.endswith(".json"):
                 try:
-                    data = json.load(f)
-                    pipelines.append(Pipeline(**data))
+                    pipelines.append(_load_pipeline(os.path.join(PIPELINES_DIR, filename))[0])
                 except Exception as e:
                     print(f"Error loading pipeline {filename}: {e}")
     return pipelines
 
+@STORAGE_LATENCY.time(op="read", kind="pipeline")
 def get_pipeline(pipeline_id: str) -> Optional[Pipeline]:
     file_path = os.path.join(PIPELINES_DIR, f"{pipeline_id}.json")
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            data = json.load(f)
-            return Pipeline(**data)
+    with _pipelines_locked(exclusive=False):
+        if os.path.exists(file_path):
+            return _load_pipeline(file_path)[0]
     return None
 
+@STORAGE_LATENCY.time(op="delete", kind="pipeline")
 def delete_pipeline(pipeline_id: str) -> bool:
     file_path = os.path.join(PIPELINES_DIR, f"{pipeline_id}.json")
-    if os.path.exists(file_path):
+    with _pipelines_locked():
+        if not os.path.exists(file_path):
+            return False
         os.remove(file_path)
-        return True
-    return False
+        log_path = _pipeline_log_path(pipeline_id)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+    return True
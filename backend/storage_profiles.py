@@ -0,0 +1,93 @@
+"""
+Named object-store profiles used to configure task access to artifact storage.
+
+Profiles are read from STORAGE_PROFILES_FILE (JSON) if it exists:
+
+    {"default": "minio",
+     "node_pool_label": "node-pool",
+     "profiles": [{"name": "minio", "endpoint": "http://10.96.2.78:9000",
+                   "secret_name": "mlpipeline-minio-artifact",
+                   "proxy_endpoint": "http://s3-cache.kubeflow:8080",
+                   "node_pool_endpoints": {"gpu-east": "http://minio.east:9000"}}]}
+
+Without the file a single "minio" profile matches the cluster's MinIO, the
+previously hard-coded values.
+"""
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from models import StorageProfile
+
+STORAGE_PROFILES_FILE = os.getenv("STORAGE_PROFILES_FILE", "storage_profiles.json")
+
+# Node label matched against PipelineNode.node_pool
+NODE_POOL_LABEL = "node-pool"
+
+_BUILTIN = {
+    "default": "minio",
+    "profiles": [{"name": "minio", "endpoint": "http://10.96.2.78:9000", "secret_name": "mlpipeline-minio-artifact"}],
+}
+
+_lock = threading.Lock()
+_loaded = None  # (mtime, default name, node pool label, {name: StorageProfile})
+
+def _load() -> Tuple[str, str, Dict[str, StorageProfile]]:
+    global _loaded
+    mtime = os.path.getmtime(STORAGE_PROFILES_FILE) if os.path.isfile(STORAGE_PROFILES_FILE) else None
+    with _lock:
+        if _loaded is None or _loaded[0] != mtime:
+            config = _BUILTIN
+            if mtime is not None:
+                with open(STORAGE_PROFILES_FILE, "r") as f:
+                    config = json.load(f)
+            profiles = {p["name"]: StorageProfile(**p) for p in config.get("profiles") or []}
+            default = config.get("default") or next(iter(profiles), None)
+            if default not in profiles:
+                raise ValueError(f"Default storage profile '{default}' is not defined")
+            _loaded = (mtime, default, config.get("node_pool_label") or NODE_POOL_LABEL, profiles)
+            _env_spec.cache_clear()
+        return _loaded[1], _loaded[2], _loaded[3]
+
+def list_profiles() -> Dict[str, object]:
+    default, label, profiles = _load()
+    return {"default": default, "node_pool_label": label, "profiles": list(profiles.values())}
+
+def node_pool_label() -> str:
+    return _load()[1]
+
+def resolve(name: Optional[str] = None) -> StorageProfile:
+    default, _, profiles = _load()
+    profile = profiles.get(name or default)
+    if profile is None:
+        raise ValueError(f"Unknown storage profile '{name}'")
+    return profile
+
+def effective_endpoint(profile: StorageProfile, node_pool: Optional[str] = None) -> str:
+    # Nearest store for the pool first, then the caching proxy, then the store itself
+    return profile.node_pool_endpoints.get(node_pool or "") or profile.proxy_endpoint or profile.endpoint
+
+def env_spec(profile_name: Optional[str] = None, node_pool: Optional[str] = None) -> Tuple[Tuple[str, str], ...]:
+    """
+    The env vars a task needs to reach the profile's store, computed once per
+    (profile, node pool) and shared by every task using that pair.
+    """
+    _load()  # drops cached specs when the profiles file changed
+    return _env_spec(profile_name, node_pool)
+
+@lru_cache(maxsize=None)
+def _env_spec(profile_name: Optional[str], node_pool: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    profile = resolve(profile_name)
+    endpoint = effective_endpoint(profile, node_pool)
+    path_style = "true" if profile.path_style else "false"
+    return (
+        ("AWS_REGION", profile.region),
+        ("AWS_ENDPOINT_URL", endpoint),
+        ("AWS_ENDPOINT_URL_S3", endpoint),
+        ("S3_FORCE_PATH_STYLE", path_style),
+        ("AWS_S3_FORCE_PATH_STYLE", path_style),
+        ("AWS_USE_PATH_STYLE_REQUESTS", path_style),
+        ("AWS_S3_USE_PATH_STYLE", path_style),
+    )
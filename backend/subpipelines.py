@@ -0,0 +1,103 @@
+"""
+Saved pipelines used as a single node of another pipeline (PipelineNode
+kind="pipeline").
+
+A nested pipeline exposes ports: its declared Pipeline.inputs/outputs, or,
+when none are declared, every node input that is neither fed by an edge nor
+set in args and every node output no edge consumes, named
+<node_id>_<handle>. The compiler compiles each nested pipeline on its own
+and loads the spec back as a graph component; specs are memoized here under
+a hash of everything that went into them, so a sub-DAG used many times (or
+across compiles) is traced and compiled once.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+
+import storage
+from metrics import CACHE_REQUESTS
+from models import Pipeline, PipelineNode, PipelinePort
+
+SUB_PIPELINE_CACHE_SIZE = int(os.getenv("SUB_PIPELINE_CACHE_SIZE", "64"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _port_name(node_id: str, handle: str) -> str:
+    return f"{node_id}_{handle}"
+
+def load_nested(node: PipelineNode, stack: Tuple[str, ...] = ()) -> Pipeline:
+    """The saved pipeline a kind=pipeline node runs; stack holds the enclosing pipeline ids."""
+    if not node.pipeline_id:
+        raise ValueError(f"Nested pipeline node {node.id} has no pipeline_id")
+    if node.pipeline_id in stack:
+        raise ValueError(f"Pipeline {node.pipeline_id} is nested in itself (node {node.id})")
+    sub = storage.get_pipeline(node.pipeline_id)
+    if not sub:
+        raise ValueError(f"Pipeline {node.pipeline_id} not found for node {node.id}")
+    return sub
+
+def node_io(node: PipelineNode, stack: Tuple[str, ...] = ()) -> Tuple[List[str], List[str]]:
+    """Input and output handle names of a node: its component's, or its nested pipeline's ports."""
+    if node.kind == "pipeline":
+        sub = load_nested(node, stack)
+        inputs, outputs = ports(sub, stack)
+        return [p.name for p in inputs], [p.name for p in outputs]
+    comp = storage.get_component(node.component_id)
+    if not comp:
+        raise ValueError(f"Component {node.component_id} not found for node {node.id}")
+    return [i.name for i in comp.inputs], [o.name for o in comp.outputs]
+
+def ports(pipeline: Pipeline, stack: Tuple[str, ...] = ()) -> Tuple[List[PipelinePort], List[PipelinePort]]:
+    """The (inputs, outputs) ports of a pipeline used as a nested node."""
+    if pipeline.inputs or pipeline.outputs:
+        return list(pipeline.inputs), list(pipeline.outputs)
+    stack = stack + (pipeline.id,)
+    fed = {(e.target, e.targetHandle) for e in pipeline.edges if e.targetHandle}
+    consumed = {(e.source, e.sourceHandle) for e in pipeline.edges if e.sourceHandle}
+    inputs, outputs = [], []
+    for node in pipeline.nodes:
+        in_names, out_names = node_io(node, stack)
+        for name in in_names:
+            if (node.id, name) in fed or (node.args or {}).get(name) or name == node.loop_input:
+                continue
+            inputs.append(PipelinePort(name=_port_name(node.id, name), node_id=node.id, handle=name))
+        if node.kind == "parallel_for":
+            # Per-iteration outputs only exist inside the loop, behind a collect node
+            continue
+        for name in out_names:
+            if (node.id, name) not in consumed:
+                outputs.append(PipelinePort(name=_port_name(node.id, name), node_id=node.id, handle=name))
+    return inputs, outputs
+
+def validate_ports(pipeline: Pipeline, inputs: List[PipelinePort], outputs: List[PipelinePort],
+                   stack: Tuple[str, ...] = ()) -> None:
+    nodes = {n.id: n for n in pipeline.nodes}
+    for port, side in [(p, 0) for p in inputs] + [(p, 1) for p in outputs]:
+        node = nodes.get(port.node_id)
+        if not node:
+            raise ValueError(f"Port '{port.name}' of pipeline {pipeline.id} refers to missing node {port.node_id}")
+        if port.handle not in node_io(node, stack + (pipeline.id,))[side]:
+            raise ValueError(f"Port '{port.name}' of pipeline {pipeline.id}: node {node.id} has no "
+                             f"{'output' if side else 'input'} '{port.handle}'")
+    names = [p.name for p in inputs] + [p.name for p in outputs]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Port names of pipeline {pipeline.id} are not unique")
+
+def cached_spec(key: str, build: Callable[[], str]) -> str:
+    """Returns the compiled spec memoized under key, building it on a miss."""
+    with _cache_lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+    if text is not None:
+        CACHE_REQUESTS.inc(cache="sub_pipeline", result="hit")
+        return text
+    CACHE_REQUESTS.inc(cache="sub_pipeline", result="miss")
+    text = build()
+    with _cache_lock:
+        _cache[key] = text
+        while len(_cache) > SUB_PIPELINE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
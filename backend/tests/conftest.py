@@ -0,0 +1,14 @@
+"""
+Backend modules import each other by name and keep their data under ./data,
+so tests run from a scratch directory with the backend on sys.path:
+
+    cd backend && python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Before any backend module is imported: storage creates data/ at import time
+os.chdir(tempfile.mkdtemp(prefix="backend-tests-"))
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController
+
+def _wait_until(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+class Launcher:
+    """launch callables that record the thread they ran in and return run ids."""
+
+    def __init__(self):
+        self.threads = {}
+
+    def __call__(self, name: str, run_id=...):
+        def launch():
+            self.threads[name] = threading.current_thread()
+            return f"run-{name}" if run_id is ... else run_id
+        return launch
+
+@pytest.fixture
+def launcher():
+    return Launcher()
+
+def test_unlimited_is_disabled():
+    assert not AdmissionController().enabled
+    assert AdmissionController(max_per_pipeline=1).enabled
+
+def test_queued_runs_are_released_by_the_background_thread(launcher):
+    ctl = AdmissionController(max_active=1, poll_s=60)
+    first = ctl.submit("p", launcher("a"))
+    assert first.state == "submitted" and first.run_id == "run-a"
+    assert launcher.threads["a"] is threading.current_thread()
+
+    second = ctl.submit("p", launcher("b"))
+    assert second.state == "queued"
+    assert ctl.get(second.id)["position"] == 1
+    # A non-terminal status keeps the slot
+    ctl.observe("run-a", "RUNNING")
+    time.sleep(0.05)
+    assert second.state == "queued"
+
+    ctl.observe("run-a", "Succeeded")
+    assert _wait_until(lambda: second.state == "submitted")
+    assert launcher.threads["b"] is not threading.current_thread()
+    assert [s["run_id"] for s in ctl.snapshot()["active"]] == ["run-b"]
+
+def test_release_order_is_priority_then_fair_share_then_age(launcher):
+    ctl = AdmissionController(max_active=1, poll_s=60)
+    subs = {}
+    for name, team, priority in (("running", "t1", 0), ("old", "t1", 0), ("other-team", "t2", 0),
+                                 ("urgent", "t1", 5), ("newer", "t1", 0)):
+        subs[name] = ctl.submit("p", launcher(name), team=team, priority=priority)
+
+    snap = ctl.snapshot()
+    assert snap["depth"] == 4
+    assert snap["depth_by_team"] == {"t1": 3, "t2": 1}
+    # t2 has no active run, so it goes before older t1 submissions of the same priority
+    expected = ["urgent", "other-team", "old", "newer"]
+    assert [s["id"] for s in snap["queued"]] == [subs[name].id for name in expected]
+
+    ctl.observe("run-running", "SUCCEEDED")
+    assert _wait_until(lambda: subs["urgent"].state == "submitted")
+    assert subs["other-team"].state == subs["old"].state == "queued"
+
+def test_freed_slot_goes_to_the_team_with_fewer_active_runs(launcher):
+    ctl = AdmissionController(max_active=2, poll_s=60)
+    ctl.submit("p", launcher("a"), team="t1")
+    ctl.submit("p", launcher("b"), team="t1")
+    old = ctl.submit("p", launcher("old"), team="t1")
+    other = ctl.submit("p", launcher("other"), team="t2")
+    ctl.observe("run-b", "SUCCEEDED")
+    assert _wait_until(lambda: other.state == "submitted")
+    assert old.state == "queued"
+
+def test_team_and_pipeline_limits(launcher):
+    ctl = AdmissionController(max_per_team=1, max_per_pipeline=2, poll_s=60)
+    assert ctl.submit("p1", launcher("a"), team="t1").state == "submitted"
+    assert ctl.submit("p1", launcher("b"), team="t1").state == "queued"
+    assert ctl.submit("p1", launcher("c"), team="t2").state == "submitted"
+    # p1 has two active runs
+    assert ctl.submit("p1", launcher("d"), team="t3").state == "queued"
+    assert ctl.submit("p2", launcher("e"), team="t3").state == "submitted"
+
+def test_failed_or_run_less_launches_free_their_slot(launcher):
+    ctl = AdmissionController(max_active=1, poll_s=60)
+
+    def fail():
+        raise RuntimeError("KFP unavailable")
+
+    failed = ctl.submit("p", fail)
+    assert failed.state == "failed" and "KFP unavailable" in failed.error
+    no_run = ctl.submit("p", launcher("a", run_id=None))
+    assert no_run.state == "submitted"
+    assert ctl.submit("p", launcher("b")).state == "submitted"
+
+def test_cancel_removes_a_queued_submission(launcher):
+    ctl = AdmissionController(max_active=1, poll_s=60)
+    ctl.submit("p", launcher("a"))
+    queued = ctl.submit("p", launcher("b"))
+    assert ctl.cancel(queued.id).state == "canceled"
+    assert ctl.snapshot()["depth"] == 0
+    assert ctl.cancel("unknown") is None
+    ctl.observe("run-a", "FAILED")
+    time.sleep(0.05)
+    assert "b" not in launcher.threads
+
+def test_finished_runs_are_found_by_polling(launcher):
+    statuses = {"run-a": "RUNNING"}
+    ctl = AdmissionController(max_active=1, poll_s=0.05, get_status=lambda run_id: statuses.get(run_id, "RUNNING"))
+    ctl.submit("p", launcher("a"))
+    queued = ctl.submit("p", launcher("b"))
+    time.sleep(0.15)
+    assert queued.state == "queued"
+    # Nobody asks for the run's status; the controller's own polling frees the slot
+    statuses["run-a"] = "SUCCEEDED"
+    assert _wait_until(lambda: queued.state == "submitted")
+
+def test_run_endpoint_reports_queued_runs(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import admission
+    import kfp_client
+    import main
+    import storage
+    from models import Component, Pipeline, PipelineNode
+
+    comp = storage.save_component(Component(name="step", image="img", command=["run"]))
+    pipe = storage.save_pipeline(Pipeline(name="p", nodes=[
+        PipelineNode(id="a", label="a", component_id=comp.id, position={"x": 0, "y": 0})]))
+    run_ids = iter(["run-1", "run-2"])
+    monkeypatch.setattr(kfp_client, "submit_pipeline",
+                        lambda path, name, arguments: type("Result", (), {"run_id": next(run_ids)})())
+    monkeypatch.setattr(main.watcher, "start", lambda: None)
+    ctl = AdmissionController(max_active=1, poll_s=60)
+    monkeypatch.setattr(admission, "controller", ctl)
+    client = TestClient(main.app)
+
+    first = client.post(f"/pipelines/{pipe.id}/run", json={}).json()
+    assert first["status"] == "submitted" and first["run_id"] == "run-1"
+    second = client.post(f"/pipelines/{pipe.id}/run", json={}).json()
+    # No run id yet: the queue id and position tell the user where the run is
+    assert second["status"] == "queued" and second["position"] == 1 and "run_id" not in second
+    assert client.get(f"/queue/{second['queue_id']}").json()["state"] == "queued"
+
+    ctl.observe("run-1", "SUCCEEDED")
+    assert _wait_until(lambda: ctl.get(second["queue_id"])["state"] == "submitted")
+    assert storage.get_pipeline(pipe.id).last_run_id == "run-2"
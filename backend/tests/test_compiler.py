@@ -0,0 +1,184 @@
+import json
+import os
+
+import pytest
+import yaml
+
+import compiler
+import storage
+from models import Component, Pipeline, PipelineEdge, PipelineNode
+
+def _component(**fields) -> Component:
+    base = {"name": "step", "image": "img", "command": ["sh", "-c", "echo {{inputs.parameters.x}} > /tmp/outputs/out"],
+            "inputs": [{"name": "x", "type": "String"}], "outputs": [{"name": "out", "type": "String"}]}
+    return storage.save_component(Component(**{**base, **fields}))
+
+def _node(node_id: str, comp: Component, **fields) -> PipelineNode:
+    return PipelineNode(**{"id": node_id, "label": node_id, "component_id": comp.id, "position": {"x": 0, "y": 0},
+                           "args": {"x": "1"}, **fields})
+
+def _edge(source: str, target: str, data: bool = False) -> PipelineEdge:
+    handles = {"sourceHandle": "out", "targetHandle": "x"} if data else {}
+    return PipelineEdge(id=f"{source}-{target}", source=source, target=target, **handles)
+
+def _pipeline(nodes, edges=()) -> Pipeline:
+    return storage.save_pipeline(Pipeline(name="p", nodes=list(nodes), edges=list(edges)))
+
+def _compile(pipe: Pipeline, **kwargs) -> list:
+    path = compiler.compile_pipeline(pipe, **kwargs)
+    try:
+        with open(path) as f:
+            return list(yaml.safe_load_all(f))
+    finally:
+        os.remove(path)
+
+def _tasks(docs: list) -> dict:
+    return docs[0]["root"]["dag"]["tasks"]
+
+def test_downstream_closure():
+    comp = _component()
+    pipe = _pipeline([_node(n, comp) for n in "abcde"],
+                     [_edge("a", "b"), _edge("b", "c"), _edge("a", "d"), _edge("e", "c")])
+    assert compiler.downstream_closure(pipe, "b") == {"b", "c"}
+    assert compiler.downstream_closure(pipe, "a") == {"a", "b", "c", "d"}
+    assert compiler.downstream_closure(pipe, "c") == {"c"}
+    with pytest.raises(ValueError):
+        compiler.downstream_closure(pipe, "missing")
+
+def test_partial_compile_imports_upstream_outputs():
+    comp = _component()
+    pipe = _pipeline([_node("a", comp), _node("b", comp), _node("c", comp)],
+                     [_edge("a", "b", data=True), _edge("b", "c", data=True)])
+    docs = _compile(pipe, start_node_id="b", upstream_artifacts={"a": {"out": "s3://bucket/a/out"}})
+    tasks = _tasks(docs)
+    names = {t["taskInfo"]["name"] for t in tasks.values()}
+    assert {"b-step", "c-step"} <= names
+    assert "a-step" not in names
+    assert "s3://bucket/a/out" in json.dumps(docs)
+
+    with pytest.raises(ValueError, match="No artifact from a previous run"):
+        compiler.compile_pipeline(pipe, start_node_id="b", upstream_artifacts={})
+
+def _task(docs: list, node_id: str) -> dict:
+    # Fan-out tasks sit in the loop's own DAG
+    dags = [docs[0]["root"]["dag"]] + [c["dag"] for c in docs[0]["components"].values() if "dag" in c]
+    return next(t for dag in dags for t in dag["tasks"].values() if t["taskInfo"]["name"].startswith(f"{node_id}-"))
+
+def _cache_token(docs: list, node_id: str):
+    token = _task(docs, node_id)["inputs"]["parameters"].get(compiler.CACHE_TOKEN_INPUT)
+    return token["runtimeValue"]["constant"] if token else None
+
+def test_caching_is_off_unless_enabled():
+    comp = _component()
+    pipe = _pipeline([_node("a", comp), _node("b", comp, caching={"enabled": True})])
+    docs = _compile(pipe)
+    assert not _task(docs, "a").get("cachingOptions", {}).get("enableCache")
+    assert _task(docs, "b")["cachingOptions"]["enableCache"] is True
+    assert _cache_token(docs, "b") is None
+
+def test_cache_token_is_renewed_after_max_staleness(monkeypatch):
+    import lineage
+    now = [1000.0]
+    monkeypatch.setattr(lineage, "time", type("Clock", (), {"time": staticmethod(lambda: now[0])}))
+    comp = _component(caching={"enabled": True, "max_staleness": "1h"})
+    pipe = _pipeline([_node("a", comp), _node("b", comp, caching={"max_staleness": "2h"})])
+
+    first = _compile(pipe)
+    now[0] += 3599
+    within = _compile(pipe)
+    assert _cache_token(within, "a") == _cache_token(first, "a")
+    assert _cache_token(within, "b") == _cache_token(first, "b")
+
+    now[0] += 2
+    expired = _compile(pipe)
+    assert _cache_token(expired, "a") != _cache_token(first, "a")
+    assert _cache_token(expired, "b") == _cache_token(first, "b")
+    # Renewed tokens start a new window rather than following fixed buckets
+    now[0] += 3599
+    assert _cache_token(_compile(pipe), "a") == _cache_token(expired, "a")
+
+def test_invalid_max_staleness_is_rejected():
+    with pytest.raises(ValueError):
+        Component(name="c", image="i", caching={"max_staleness": "soon"})
+    comp = _component()
+    with pytest.raises(ValueError):
+        _node("a", comp, caching={"max_staleness": "-5m"})
+
+def _executor(docs: list, node_id: str) -> dict:
+    executor = docs[0]["components"][_task(docs, node_id)["componentRef"]["name"]]["executorLabel"]
+    return docs[0]["deploymentSpec"]["executors"][executor]["container"]
+
+def test_gpu_settings_are_validated():
+    with pytest.raises(ValueError, match="requires gpu_limit"):
+        Component(name="c", image="i", resources={"gpu_type": "nvidia.com/gpu"})
+    with pytest.raises(ValueError, match="gpu_limit must be one of"):
+        Component(name="c", image="i", resources={"gpu_type": "nvidia.com/gpu", "gpu_limit": "3"})
+    comp = _component()
+    with pytest.raises(ValueError, match="gpu_limit must be one of"):
+        _node("a", comp, resources={"gpu_limit": "many"})
+    # The node's type needs a limit from the node or the component
+    node = _node("a", comp, resources={"gpu_type": "nvidia.com/gpu"})
+    with pytest.raises(ValueError, match="requires gpu_limit"):
+        compiler.compile_pipeline(_pipeline([node]))
+
+def test_gpu_overrides_are_compiled():
+    comp = _component(resources={"gpu_type": "nvidia.com/gpu", "gpu_limit": "1"})
+    pipe = _pipeline([_node("a", comp), _node("b", comp, resources={"gpu_limit": "4"})])
+    docs = _compile(pipe)
+    for node_id, count in (("a", 1), ("b", 4)):
+        accelerator = _executor(docs, node_id)["resources"]["accelerator"]
+        assert accelerator["resourceType"] == "nvidia.com/gpu"
+        assert int(accelerator["resourceCount"]) == count
+
+def _annotations(docs: list, node_id: str) -> dict:
+    executor = docs[0]["components"][_task(docs, node_id)["componentRef"]["name"]]["executorLabel"]
+    return docs[1]["platforms"]["kubernetes"]["deploymentSpec"]["executors"][executor]["podMetadata"]["annotations"]
+
+def test_volcano_groups_are_per_run_and_node():
+    import volcano
+    comp = _component(volcano_enabled=True, volcano={"queue": "training", "priority_class": "high"})
+    pipe = _pipeline([_node("a", comp), _node("b", comp)], [_edge("a", "b")])
+    docs = _compile(pipe, run_key="run1")
+    a, b = _annotations(docs, "a"), _annotations(docs, "b")
+    assert a[volcano.GROUP_NAME_ANNOTATION] == f"pipeline-{pipe.id}-run1-a"
+    assert b[volcano.GROUP_NAME_ANNOTATION] == f"pipeline-{pipe.id}-run1-b"
+    assert a[volcano.MIN_MEMBER_ANNOTATION] == "1"
+    assert a[volcano.QUEUE_ANNOTATION] == "training"
+    assert a[volcano.PRIORITY_CLASS_ANNOTATION] == "high"
+    # KFP cannot set spec.schedulerName; the cluster routes the pods (deploy/volcano-scheduler.yaml)
+    assert "schedulerName" not in json.dumps(docs)
+    other = _annotations(_compile(pipe, run_key="run2"), "a")
+    assert other[volcano.GROUP_NAME_ANNOTATION] != a[volcano.GROUP_NAME_ANNOTATION]
+
+def test_volcano_sweep_groups_are_shared():
+    import volcano
+    comp = _component(volcano_enabled=True, volcano={"group_scope": "sweep"})
+    pipe = _pipeline([_node("a", comp)])
+    first = _annotations(_compile(pipe, run_key="run1", sweep_id="s1"), "a")
+    second = _annotations(_compile(pipe, run_key="run2", sweep_id="s1"), "a")
+    assert first[volcano.GROUP_NAME_ANNOTATION] == second[volcano.GROUP_NAME_ANNOTATION] == "sweep-s1-a"
+    with pytest.raises(ValueError, match="no sweep id"):
+        compiler.compile_pipeline(pipe)
+
+def test_fan_out_gang_size_is_checked_against_its_width():
+    import volcano
+    comp = _component(volcano_enabled=True)
+
+    def fan_out(items, **fields):
+        return _pipeline([_node("f", comp, kind="parallel_for", loop_input="x", args={"x": json.dumps(items)}, **fields)])
+
+    docs = _compile(fan_out([1, 2, 3], parallelism=2, volcano={"min_available": 2}))
+    assert _annotations(docs, "f")[volcano.MIN_MEMBER_ANNOTATION] == "2"
+    loop = next(t for t in _tasks(docs).values() if "parameterIterator" in t)
+    assert loop["iteratorPolicy"]["parallelismLimit"] == 2
+
+    # At most parallelism pods run at once, however many items there are
+    with pytest.raises(ValueError, match="exceeds the 2 pods"):
+        compiler.compile_pipeline(fan_out([1, 2, 3], parallelism=2, volcano={"min_available": 3}))
+    # The run's arguments replace the default items
+    pipe = fan_out([1], volcano={"min_available": 3})
+    with pytest.raises(ValueError, match="exceeds the 1 pods"):
+        compiler.compile_pipeline(pipe)
+    _compile(pipe, arguments={"f_items": [1, 2, 3]})
+    with pytest.raises(ValueError, match="exceeds the 2 pods"):
+        compiler.compile_pipeline(pipe, arguments={"f_items": "[1, 2]"})
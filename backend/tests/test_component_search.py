@@ -0,0 +1,84 @@
+import os
+import uuid
+
+import pytest
+
+import component_search
+import storage
+from models import Component
+
+@pytest.fixture
+def catalog():
+    """Adds components whose names carry a word unique to the test, to search for them alone."""
+    tag = "t" + uuid.uuid4().hex[:8]
+
+    def add(name: str, description: str = "", image: str = "img", io=(), **fields) -> Component:
+        inputs = [{"name": n, "type": t} for n, t in io]
+        return storage.save_component(Component(id=f"{tag}-{name}", name=f"{name} {tag}", description=description,
+                                                image=image, inputs=inputs, **fields))
+    add.tag = tag
+    return add
+
+def _ids(found: dict) -> list:
+    return [r["id"].split("-", 1)[1] for r in found["results"]]
+
+def test_name_matches_rank_first(catalog):
+    catalog("trainer")
+    catalog("prep", description="prepares data for the trainer")
+    catalog("export", image="registry/trainer-tools")
+    found = component_search.search(f"trainer {catalog.tag}")
+    assert _ids(found) == ["trainer", "export", "prep"]
+    assert found["total"] == 3
+    scores = [r["score"] for r in found["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+def test_words_match_as_prefixes_and_all_must_match(catalog):
+    catalog("resnet-train")
+    catalog("resnet-eval")
+    assert _ids(component_search.search(f"res tra {catalog.tag}")) == ["resnet-train"]
+    # FTS syntax in user input is taken literally
+    assert component_search.search(f'"resnet*" ({catalog.tag}:')["total"] == 2
+
+def test_type_filter_and_facets(catalog):
+    catalog("a", io=[("data", "Dataset"), ("model", "Model")])
+    catalog("b", io=[("data", "Dataset")])
+    catalog("c", io=[("n", "Integer")])
+    found = component_search.search(catalog.tag, type="Dataset")
+    assert sorted(_ids(found)) == ["a", "b"] and found["total"] == 2
+    # Counted over the text matches, before the type filter
+    assert found["facets"]["type"] == {"Dataset": 2, "Integer": 1, "Model": 1}
+    assert component_search.search(catalog.tag, type="Missing")["total"] == 0
+
+def test_paging(catalog):
+    for i in range(5):
+        catalog(f"step{i}")
+    first = component_search.search(catalog.tag, limit=2)
+    second = component_search.search(catalog.tag, limit=2, offset=2)
+    assert first["total"] == second["total"] == 5
+    assert len(first["results"]) == len(second["results"]) == 2
+    assert not set(_ids(first)) & set(_ids(second))
+    assert component_search.search(catalog.tag, limit=10 ** 6)["limit"] == component_search.MAX_PAGE_SIZE
+
+def test_index_follows_saves_and_deletes(catalog):
+    comp = catalog("old")
+    comp.name = f"renamed {catalog.tag}"
+    comp.inputs = []
+    storage.save_component(comp)
+    assert component_search.search(f"old {catalog.tag}")["total"] == 0
+    assert component_search.search(f"renamed {catalog.tag}")["total"] == 1
+    storage.delete_component(comp.id)
+    assert component_search.search(catalog.tag)["total"] == 0
+
+def test_endpoint_drops_components_removed_behind_the_index(catalog):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    for name in ("a", "b", "c"):
+        catalog(name, io=[("data", "Dataset")])
+    os.remove(os.path.join(storage.COMPONENTS_DIR, f"{catalog.tag}-b.json"))
+    found = TestClient(main.app).get("/components/search", params={"q": catalog.tag}).json()
+    assert found["total"] == len(found["results"]) == 2
+    assert found["facets"]["type"] == {"Dataset": 2}
+    assert sorted(r["component"]["id"] for r in found["results"]) == [f"{catalog.tag}-a", f"{catalog.tag}-c"]
+    assert component_search.search(catalog.tag)["total"] == 2
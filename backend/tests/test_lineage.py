@@ -0,0 +1,83 @@
+import os
+import uuid
+
+import compiler
+import lineage
+import run_watcher
+import storage
+from models import Component, Pipeline, PipelineEdge, PipelineNode
+
+def _pipeline() -> Pipeline:
+    comp = storage.save_component(Component(
+        name="step", image="img", command=["run"], args=["{{inputs.parameters.data}}", "/tmp/outputs/out"],
+        inputs=[{"name": "data", "type": "String"}], outputs=[{"name": "out", "type": "String"}]))
+    nodes = [PipelineNode(id=node_id, label=node_id, component_id=comp.id, position={"x": 0, "y": 0}, args=args)
+             for node_id, args in (("prep", {"data": "s3://raw/2024/data.csv"}), ("train", {}))]
+    edges = [PipelineEdge(id="e", source="prep", target="train", sourceHandle="out", targetHandle="data")]
+    return storage.save_pipeline(Pipeline(id=str(uuid.uuid4()), name="p", nodes=nodes, edges=edges))
+
+def _submit(pipe: Pipeline, **kwargs) -> str:
+    run_id = f"run-{uuid.uuid4().hex[:8]}"
+    path = compiler.compile_pipeline(pipe, **kwargs)
+    try:
+        lineage.record_submission(pipe, run_id, path)
+    finally:
+        os.remove(path)
+    return run_id
+
+def test_inputs_are_indexed_at_submission():
+    pipe = _pipeline()
+    run_id = _submit(pipe)
+    found = lineage.find_by_uri("s3://raw/2024/data.csv")
+    assert [(r["run_id"], r["node_id"], r["name"], r["role"]) for r in found] == [(run_id, "prep", "data", "input")]
+    assert lineage.find_by_uri("s3://raw/2024", prefix=True) == found
+    assert lineage.find_by_uri("s3://raw/2024") == []
+    assert not lineage.is_completed(run_id)
+    assert (run_id, pipe.id) in lineage.pending_runs()
+
+def test_partial_runs_index_reused_upstream_outputs():
+    pipe = _pipeline()
+    run_id = _submit(pipe, start_node_id="train", upstream_artifacts={"prep": {"out": "s3://runs/1/prep/out"}})
+    rows = lineage.find_by_uri("s3://runs/1/prep/out")
+    assert [(r["run_id"], r["node_id"], r["name"]) for r in rows] == [(run_id, "train", "data")]
+
+def test_outputs_are_indexed_once_the_run_ends():
+    pipe = _pipeline()
+    first = _submit(pipe)
+    lineage.record_completion(pipe, first, "SUCCEEDED", {"prep-step": {"out": "s3://runs/a/prep"},
+                                                         "train-step": {"out": "s3://runs/a/train"}})
+    assert lineage.is_completed(first)
+    assert (first, pipe.id) not in lineage.pending_runs()
+    # A later partial run only produced train's output
+    second = _submit(pipe)
+    lineage.record_completion(pipe, second, "SUCCEEDED", {"train-step": {"out": "s3://runs/b/train"}})
+    assert lineage.latest_outputs(pipe.id) == {"prep": {"out": "s3://runs/a/prep"}, "train": {"out": "s3://runs/b/train"}}
+
+    run = lineage.get_run(pipe.id, second)
+    assert run["state"] == "SUCCEEDED"
+    assert {(a["node_id"], a["role"]) for a in run["artifacts"]} == {("prep", "input"), ("train", "output")}
+    assert lineage.get_run(pipe.id, "unknown") is None
+
+def test_watcher_finishes_every_submitted_run():
+    pipe = _pipeline()
+    runs = [_submit(pipe) for _ in range(2)]
+    statuses = {runs[0]: "RUNNING", runs[1]: "SUCCEEDED"}
+    seen = []
+
+    def on_status(pipeline_id, run_id, status):
+        seen.append((run_id, status))
+        if status == "SUCCEEDED":
+            lineage.record_completion(pipe, run_id, status, {})
+
+    watcher = run_watcher.RunWatcher(on_status, get_status=lambda run_id: statuses.get(run_id, "SUCCEEDED"))
+    watcher.poll_once()
+    assert (runs[0], "RUNNING") in seen and (runs[1], "SUCCEEDED") in seen
+    assert lineage.is_completed(runs[1]) and not lineage.is_completed(runs[0])
+
+    seen.clear()
+    watcher.poll_once()
+    assert runs[1] not in [r for r, _ in seen]
+    # Runs submitted longer ago than max_age_s are no longer polled
+    seen.clear()
+    run_watcher.RunWatcher(on_status, max_age_s=-60, get_status=statuses.get).poll_once()
+    assert seen == []
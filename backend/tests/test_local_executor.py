@@ -0,0 +1,50 @@
+import json
+import sys
+import time
+import uuid
+
+import pytest
+
+import local_executor
+import storage
+from models import Component, Pipeline, PipelineEdge, PipelineNode
+
+# Sleeps, prints its item and fails for the item "bad"
+SCRIPT = "import sys, time; time.sleep(0.3); print('item', sys.argv[1]); sys.exit(sys.argv[1] == 'bad')"
+
+@pytest.fixture
+def comp():
+    return storage.save_component(Component(name="step", image="img", command=["python", "-c", SCRIPT],
+                                            args=["{{inputs.parameters.x}}"], inputs=[{"name": "x", "type": "String"}]))
+
+def _fan_out(comp, items, **fields) -> PipelineNode:
+    return PipelineNode(id="f", label="f", component_id=comp.id, position={"x": 0, "y": 0}, kind="parallel_for",
+                        loop_input="x", args={"x": json.dumps(items)}, **fields)
+
+def _run(pipe: Pipeline):
+    run_id = f"{local_executor.RUN_ID_PREFIX}{uuid.uuid4()}"
+    start = time.monotonic()
+    states = local_executor.execute(run_id, pipe)
+    return run_id, states, time.monotonic() - start
+
+def test_fan_out_iterations_run_up_to_parallelism_at_once(comp):
+    run_id, states, elapsed = _run(Pipeline(id="lp", name="p", nodes=[_fan_out(comp, list("abcd"), parallelism=2)]))
+    assert states == {"f": "SUCCEEDED"}
+    # Two waves of two rather than four one after another
+    assert 0.6 <= elapsed < 1.2
+    with open(local_executor.node_log_path(run_id, "f")) as f:
+        log = f.read()
+    # Each iteration's output is kept together
+    for item in "abcd":
+        assert f"{SCRIPT} {item}\nitem {item}\n" in log.replace(sys.executable + " -c ", "")
+
+def test_failed_iteration_stops_the_fan_out(comp):
+    pipe = Pipeline(id="lp", name="p", nodes=[
+        _fan_out(comp, ["a", "bad", "c", "d"], parallelism=1),
+        PipelineNode(id="after", label="after", component_id=comp.id, position={"x": 0, "y": 0}, args={"x": "z"}),
+    ], edges=[PipelineEdge(id="e", source="f", target="after")])
+    run_id, states, _ = _run(pipe)
+    assert states == {"f": "FAILED", "after": "SKIPPED"}
+    with open(local_executor.node_log_path(run_id, "f")) as f:
+        log = f.read()
+    assert "item bad" in log and "item c" not in log
@@ -0,0 +1,21 @@
+import metrics
+
+def _task_cache(result: str) -> float:
+    return metrics.CACHE_REQUESTS._values.get(("kfp_task", result), 0.0)
+
+def test_task_cache_is_counted_once_all_tasks_are_done():
+    hits, misses = _task_cache("hit"), _task_cache("miss")
+    metrics.record_task_cache("run-cache-1", {"a": "CACHED", "b": "RUNNING"})
+    assert (_task_cache("hit"), _task_cache("miss")) == (hits, misses)
+
+    # KFP v1 / Argo report capitalized states, and tasks may end in any terminal state
+    statuses = {"a": "CACHED", "b": "Succeeded", "c": "SUCCEEDED", "d": "Error", "e": "Omitted", "f": "CANCELLED"}
+    metrics.record_task_cache("run-cache-1", statuses)
+    metrics.record_task_cache("run-cache-1", statuses)
+    assert (_task_cache("hit"), _task_cache("miss")) == (hits + 1, misses + 2)
+
+def test_metrics_render_in_prometheus_text_format():
+    metrics.CACHE_REQUESTS.inc(cache="test", result="hit")
+    text = metrics.render()
+    assert "# TYPE backend_cache_requests_total counter" in text
+    assert 'backend_cache_requests_total{cache="test",result="hit"}' in text
@@ -0,0 +1,130 @@
+import json
+import multiprocessing
+import os
+import uuid
+
+import pytest
+
+import storage
+from models import Pipeline, PipelineNode, PipelinePatchOp
+
+def _node(node_id: str, x: float = 0) -> PipelineNode:
+    return PipelineNode(id=node_id, component_id="c", label=node_id, position={"x": x, "y": 0})
+
+def _pipeline(*node_ids: str) -> Pipeline:
+    return storage.save_pipeline(Pipeline(id=str(uuid.uuid4()), name="p", nodes=[_node(n) for n in node_ids]))
+
+def _move(node_id: str, x: float) -> PipelinePatchOp:
+    return PipelinePatchOp(op="move_node", node_id=node_id, position={"x": x, "y": 0})
+
+def _snapshot(pipeline_id: str) -> dict:
+    with open(os.path.join(storage.PIPELINES_DIR, f"{pipeline_id}.json")) as f:
+        return json.load(f)
+
+def test_patch_is_logged_and_replayed(monkeypatch):
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 100)
+    pipe = _pipeline("a")
+    storage.patch_pipeline(pipe.id, [PipelinePatchOp(op="add_node", node=_node("b"))])
+    storage.patch_pipeline(pipe.id, [_move("a", 5), PipelinePatchOp(op="set_arg", node_id="b", name="k", value="v")])
+
+    # The snapshot is untouched; the edits live in the op log
+    assert [n["id"] for n in _snapshot(pipe.id)["nodes"]] == ["a"]
+    assert os.path.exists(storage._pipeline_log_path(pipe.id))
+    loaded = storage.get_pipeline(pipe.id)
+    assert loaded.revision == 2
+    assert [n.id for n in loaded.nodes] == ["a", "b"]
+    assert loaded.nodes[0].position["x"] == 5
+    assert loaded.nodes[1].args == {"k": "v"}
+
+def test_invalid_patch_changes_nothing():
+    pipe = _pipeline("a")
+    with pytest.raises(ValueError):
+        storage.patch_pipeline(pipe.id, [_move("a", 1), _move("missing", 1)])
+    loaded = storage.get_pipeline(pipe.id)
+    assert loaded.revision == 0
+    assert loaded.nodes[0].position["x"] == 0
+    assert not os.path.exists(storage._pipeline_log_path(pipe.id))
+
+def test_log_is_compacted_into_snapshot(monkeypatch):
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 3)
+    pipe = _pipeline("a")
+    storage.patch_pipeline(pipe.id, [_move("a", 1)])
+    storage.patch_pipeline(pipe.id, [_move("a", 2)])
+    assert os.path.exists(storage._pipeline_log_path(pipe.id))
+    storage.patch_pipeline(pipe.id, [_move("a", 3)])
+
+    assert not os.path.exists(storage._pipeline_log_path(pipe.id))
+    snapshot = _snapshot(pipe.id)
+    assert snapshot["revision"] == 3
+    assert snapshot["nodes"][0]["position"]["x"] == 3
+    assert storage.get_pipeline(pipe.id).nodes[0].position["x"] == 3
+
+def test_torn_and_folded_log_entries_are_skipped(monkeypatch):
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 100)
+    pipe = _pipeline("a")
+    storage.patch_pipeline(pipe.id, [_move("a", 1)])
+    with open(storage._pipeline_log_path(pipe.id), "a") as f:
+        # An entry already folded into the snapshot, then an interrupted append
+        f.write(json.dumps({"revision": 0, "ops": [json.loads(_move("a", 9).json())]}) + "\n")
+        f.write('{"revision": 2, "ops": [')
+    storage.patch_pipeline(pipe.id, [_move("a", 2)])
+
+    loaded = storage.get_pipeline(pipe.id)
+    assert loaded.revision == 2
+    assert loaded.nodes[0].position["x"] == 2
+
+def test_full_save_supersedes_logged_edits(monkeypatch):
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 100)
+    pipe = _pipeline("a")
+    storage.patch_pipeline(pipe.id, [_move("a", 1)])
+    storage.save_pipeline(Pipeline(id=pipe.id, name="replaced", nodes=[_node("z")]))
+
+    assert not os.path.exists(storage._pipeline_log_path(pipe.id))
+    loaded = storage.get_pipeline(pipe.id)
+    assert loaded.name == "replaced"
+    assert [n.id for n in loaded.nodes] == ["z"]
+    # Past the logged revisions, so a leftover log would not be replayed onto it
+    assert loaded.revision == 1
+
+def test_last_run_keeps_edits_made_during_submit(monkeypatch):
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 100)
+    pipe = _pipeline("a")
+    stale = storage.get_pipeline(pipe.id)
+    # Edited while the run was being compiled and submitted from the stale copy
+    storage.patch_pipeline(pipe.id, [PipelinePatchOp(op="add_node", node=_node("b"))])
+    storage.set_pipeline_last_run(stale.id, "run-1")
+
+    loaded = storage.get_pipeline(pipe.id)
+    assert loaded.last_run_id == "run-1"
+    assert [n.id for n in loaded.nodes] == ["a", "b"]
+    assert not os.path.exists(storage._pipeline_log_path(pipe.id))
+    assert storage.set_pipeline_last_run("missing", "run-2") is None
+
+def _patch_many(pipeline_id: str, worker: int, count: int) -> None:
+    for i in range(count):
+        storage.patch_pipeline(pipeline_id, [PipelinePatchOp(op="set_arg", node_id="a", name=f"w{worker}-{i}", value="x")])
+
+@pytest.mark.skipif(storage.fcntl is None or "fork" not in multiprocessing.get_all_start_methods(),
+                    reason="needs flock and fork")
+def test_patches_from_several_processes_are_all_kept(monkeypatch):
+    # Compacting often makes lost updates between processes likely without the file lock
+    monkeypatch.setattr(storage, "PIPELINE_OPLOG_COMPACT_OPS", 7)
+    pipe = _pipeline("a")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_patch_many, args=(pipe.id, w, 25)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+
+    loaded = storage.get_pipeline(pipe.id)
+    assert len(loaded.nodes[0].args) == 100
+    assert loaded.revision == 100
+
+@pytest.mark.parametrize("entity_id, safe", [
+    ("abc-123", True), ("a.b", True), ("", False), (".", False), ("..", False),
+    ("../x", False), ("a/b", False), ("a\\b", False), ("a\0b", False),
+])
+def test_is_safe_id(entity_id, safe):
+    assert storage.is_safe_id(entity_id) is safe
@@ -0,0 +1,139 @@
+import os
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+import compiler
+import storage
+import volcano
+from models import Component, Pipeline, PipelineNode
+
+class FakeCustomObjectsApi:
+    """Records PodGroup calls; create fails with the status set for a group name."""
+
+    def __init__(self, create_errors=None):
+        self.calls = []
+        self.create_errors = create_errors or {}
+
+    def create_namespaced_custom_object(self, group, version, namespace, plural, body):
+        name = body["metadata"]["name"]
+        self.calls.append(("create", name, body["spec"]))
+        if name in self.create_errors:
+            raise ApiException(status=self.create_errors[name])
+
+    def patch_namespaced_custom_object(self, group, version, namespace, plural, name, body):
+        self.calls.append(("label", name, body["metadata"]["labels"]))
+
+    def delete_namespaced_custom_object(self, group, version, namespace, plural, name):
+        self.calls.append(("delete", name))
+
+    def delete_collection_namespaced_custom_object(self, group, version, namespace, plural, label_selector):
+        self.calls.append(("delete_run", label_selector))
+
+@pytest.fixture
+def api(monkeypatch):
+    fake = FakeCustomObjectsApi()
+    monkeypatch.setattr(volcano, "_custom_api", lambda: fake)
+    monkeypatch.setattr(volcano, "VOLCANO_POD_GROUPS", True)
+    return fake
+
+@pytest.fixture
+def spec_path():
+    run_comp = storage.save_component(Component(name="train", image="img", command=["train"], volcano_enabled=True,
+                                                volcano={"queue": "gpu", "min_available": 1}))
+    sweep_comp = storage.save_component(Component(name="eval", image="img", command=["eval"], volcano_enabled=True,
+                                                  volcano={"group_scope": "sweep"}))
+    plain = storage.save_component(Component(name="prep", image="img", command=["prep"]))
+    nodes = [PipelineNode(id=node_id, label=node_id, component_id=comp.id, position={"x": 0, "y": 0})
+             for node_id, comp in (("train", run_comp), ("eval", sweep_comp), ("prep", plain))]
+    pipe = storage.save_pipeline(Pipeline(id="vp", name="p", nodes=nodes))
+    path = compiler.compile_pipeline(pipe, run_key="rk", sweep_id="s1")
+    yield path
+    os.remove(path)
+
+def test_pod_groups_come_from_pod_annotations(spec_path):
+    groups = {g["metadata"]["name"]: g for g in volcano.pod_groups(spec_path)}
+    assert set(groups) == {"pipeline-vp-rk-train", "sweep-s1-eval"}
+    train = groups["pipeline-vp-rk-train"]
+    assert train["kind"] == "PodGroup"
+    assert train["spec"] == {"minMember": 1, "queue": "gpu"}
+    assert groups["sweep-s1-eval"]["spec"] == {"minMember": 1}
+
+def test_create_returns_per_run_groups_only(api, spec_path):
+    # The sweep's group exists from an earlier run of the sweep
+    api.create_errors = {"sweep-s1-eval": 409}
+    assert volcano.create_pod_groups(spec_path) == ["pipeline-vp-rk-train"]
+    assert sorted(c[1] for c in api.calls if c[0] == "create") == ["pipeline-vp-rk-train", "sweep-s1-eval"]
+
+def test_create_rolls_back_on_failure(api, spec_path, monkeypatch):
+    # Per-run groups come first, so the failing sweep group finds one to roll back
+    groups = sorted(volcano.pod_groups(spec_path), key=lambda g: g["metadata"]["name"])
+    monkeypatch.setattr(volcano, "pod_groups", lambda path: groups)
+    api.create_errors = {"sweep-s1-eval": 403}
+    with pytest.raises(ApiException):
+        volcano.create_pod_groups(spec_path)
+    assert [c for c in api.calls if c[0] == "delete"] == [("delete", "pipeline-vp-rk-train")]
+
+def test_disabled_creates_nothing(api, spec_path, monkeypatch):
+    monkeypatch.setattr(volcano, "VOLCANO_POD_GROUPS", False)
+    assert volcano.create_pod_groups(spec_path) == []
+    volcano.delete_run_pod_groups("run-1")
+    assert api.calls == []
+
+def test_run_groups_are_labelled_and_deleted_by_run(api):
+    volcano.label_run(["g1", "g2"], "run-1")
+    volcano.delete_run_pod_groups("run-1")
+    assert api.calls == [("label", "g1", {volcano.RUN_ID_LABEL: "run-1"}),
+                         ("label", "g2", {volcano.RUN_ID_LABEL: "run-1"}),
+                         ("delete_run", f"{volcano.RUN_ID_LABEL}=run-1")]
+
+def test_cleanup_without_cluster_is_a_no_op(monkeypatch):
+    def unavailable():
+        raise RuntimeError("no kubeconfig")
+
+    monkeypatch.setattr(volcano, "VOLCANO_POD_GROUPS", True)
+    monkeypatch.setattr(volcano, "_unavailable", None)
+    monkeypatch.setattr(volcano, "_custom_api", unavailable)
+    volcano.delete_run_pod_groups("run-1")
+    assert volcano._unavailable == "no kubeconfig"
+    volcano.delete_run_pod_groups("run-2")
+
+def test_submit_creates_groups_before_the_run(api, spec_path, monkeypatch):
+    import kfp_client
+    import main
+
+    def submit(path, name, arguments):
+        assert sorted(c[1] for c in api.calls) == ["pipeline-vp-rk-train", "sweep-s1-eval"]
+        return type("Result", (), {"run_id": "run-1"})()
+
+    monkeypatch.setattr(kfp_client, "submit_pipeline", submit)
+    monkeypatch.setattr(main.watcher, "start", lambda: None)
+    assert main._submit_run(storage.get_pipeline("vp"), spec_path, "run", None) == "run-1"
+    assert api.calls[-1] == ("label", "pipeline-vp-rk-train", {volcano.RUN_ID_LABEL: "run-1"})
+    assert storage.get_pipeline("vp").last_run_id == "run-1"
+
+def test_failed_submit_deletes_the_run_groups(api, spec_path, monkeypatch):
+    import kfp_client
+    import main
+
+    def submit(path, name, arguments):
+        raise RuntimeError("KFP unavailable")
+
+    monkeypatch.setattr(kfp_client, "submit_pipeline", submit)
+    with pytest.raises(RuntimeError):
+        main._submit_run(storage.get_pipeline("vp"), spec_path, "run", None)
+    assert [c for c in api.calls if c[0] == "delete"] == [("delete", "pipeline-vp-rk-train")]
+
+def test_groups_are_released_once_the_run_ends(api, monkeypatch):
+    import lineage
+    import main
+    completed = set()
+    monkeypatch.setattr(lineage, "is_completed", lambda run_id: run_id in completed)
+    main._release_pod_groups("run-1", "RUNNING")
+    assert api.calls == []
+    main._release_pod_groups("run-1", "Succeeded")
+    assert api.calls == [("delete_run", f"{volcano.RUN_ID_LABEL}=run-1")]
+    # Seen again after its outputs were indexed
+    completed.add("run-1")
+    main._release_pod_groups("run-1", "SUCCEEDED")
+    assert len(api.calls) == 1
@@ -0,0 +1,148 @@
+"""
+Volcano PodGroups for compiled pipelines.
+
+Pods of Volcano-enabled nodes name their PodGroup in the
+scheduling.k8s.io/group-name annotation (see compiler._volcano_annotations).
+Volcano only creates PodGroups itself for pods that name none, so the groups
+are created here from the compiled spec before the run is submitted, with
+minMember, queue and priorityClassName taken from the pods' other
+annotations. Per-run groups are labelled with the run id once it is known
+and deleted when the run finishes; per-sweep groups are shared by the runs
+of the sweep and left in place.
+
+KFP cannot set a pod's spec.schedulerName, so the cluster must route these
+pods to Volcano, e.g. with the Kyverno policy in deploy/volcano-scheduler.yaml.
+Set VOLCANO_POD_GROUPS=false to leave the groups to the cluster as well.
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+
+import yaml
+
+VOLCANO_POD_GROUPS = os.getenv("VOLCANO_POD_GROUPS", "true").lower() in ("1", "true", "yes")
+KFP_NAMESPACE = os.getenv("KFP_NAMESPACE", "kubeflow")
+
+GROUP_NAME_ANNOTATION = 'scheduling.k8s.io/group-name'
+MIN_MEMBER_ANNOTATION = 'scheduling.volcano.sh/group-min-member'
+QUEUE_ANNOTATION = 'scheduling.volcano.sh/queue-name'
+PRIORITY_CLASS_ANNOTATION = 'scheduling.volcano.sh/priority-class-name'
+RUN_ID_LABEL = 'kubeflow-ground/run-id'
+SWEEP_GROUP_PREFIX = 'sweep-'
+
+_GROUP = 'scheduling.volcano.sh'
+_VERSION = 'v1beta1'
+_PLURAL = 'podgroups'
+
+_kube_lock = threading.Lock()
+_kube_api = None
+
+def _custom_api():
+    global _kube_api
+    with _kube_lock:
+        if _kube_api is None:
+            from kubernetes import client, config  # deferred: optional dependency
+            try:
+                config.load_incluster_config()
+            except config.ConfigException:
+                config.load_kube_config()
+            _kube_api = client.CustomObjectsApi()
+        return _kube_api
+
+def _pod_annotations(doc) -> List[Dict[str, str]]:
+    # Every podMetadata.annotations of the platform spec, nested pipelines included
+    found = []
+    stack = [doc]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            annotations = (item.get('podMetadata') or {}).get('annotations')
+            if isinstance(annotations, dict):
+                found.append(annotations)
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return found
+
+def pod_groups(spec_path: str) -> List[dict]:
+    """PodGroup objects the pods of a compiled pipeline name, one per group."""
+    with open(spec_path, "r") as f:
+        docs = list(yaml.safe_load_all(f))
+    groups = {}
+    for annotations in _pod_annotations(docs):
+        name = annotations.get(GROUP_NAME_ANNOTATION)
+        if not name or name in groups:
+            continue
+        spec = {"minMember": int(annotations.get(MIN_MEMBER_ANNOTATION) or 1)}
+        if annotations.get(QUEUE_ANNOTATION):
+            spec["queue"] = annotations[QUEUE_ANNOTATION]
+        if annotations.get(PRIORITY_CLASS_ANNOTATION):
+            spec["priorityClassName"] = annotations[PRIORITY_CLASS_ANNOTATION]
+        groups[name] = {"apiVersion": f"{_GROUP}/{_VERSION}", "kind": "PodGroup",
+                        "metadata": {"name": name}, "spec": spec}
+    return list(groups.values())
+
+def create_pod_groups(spec_path: str) -> List[str]:
+    """
+    Creates the PodGroups a compiled pipeline's pods name, before it is
+    submitted; returns the names of the per-run ones. Groups that already
+    exist (a sweep's, shared with its earlier runs) are kept as they are.
+    """
+    if not VOLCANO_POD_GROUPS:
+        return []
+    groups = pod_groups(spec_path)
+    if not groups:
+        return []
+    from kubernetes.client.rest import ApiException
+    api = _custom_api()
+    created = []
+    for body in groups:
+        try:
+            api.create_namespaced_custom_object(_GROUP, _VERSION, KFP_NAMESPACE, _PLURAL, body)
+        except ApiException as e:
+            if e.status != 409:
+                delete_pod_groups(created)
+                raise
+        name = body["metadata"]["name"]
+        if not name.startswith(SWEEP_GROUP_PREFIX):
+            created.append(name)
+    return created
+
+def label_run(names: List[str], run_id: str) -> None:
+    """Marks per-run groups with the run they belong to, for delete_run_pod_groups."""
+    if not names:
+        return
+    api = _custom_api()
+    for name in names:
+        api.patch_namespaced_custom_object(_GROUP, _VERSION, KFP_NAMESPACE, _PLURAL, name,
+                                           {"metadata": {"labels": {RUN_ID_LABEL: run_id}}})
+
+def delete_pod_groups(names: List[str]) -> None:
+    """Deletes groups by name, e.g. those created for a run that failed to submit."""
+    if not names:
+        return
+    from kubernetes.client.rest import ApiException
+    api = _custom_api()
+    for name in names:
+        try:
+            api.delete_namespaced_custom_object(_GROUP, _VERSION, KFP_NAMESPACE, _PLURAL, name)
+        except ApiException as e:
+            if e.status != 404:
+                print(f"Failed to delete PodGroup {name}: {e}")
+
+_unavailable: Optional[str] = None
+
+def delete_run_pod_groups(run_id: str) -> None:
+    """Deletes a finished run's groups; a no-op without Kubernetes access."""
+    global _unavailable
+    if not VOLCANO_POD_GROUPS or _unavailable:
+        return
+    try:
+        api = _custom_api()
+    except Exception as e:
+        # No cluster (e.g. a local setup): say so once rather than on every run
+        _unavailable = str(e)
+        print(f"PodGroup cleanup disabled, no Kubernetes access: {e}")
+        return
+    api.delete_collection_namespaced_custom_object(_GROUP, _VERSION, KFP_NAMESPACE, _PLURAL,
+                                                   label_selector=f"{RUN_ID_LABEL}={run_id}")
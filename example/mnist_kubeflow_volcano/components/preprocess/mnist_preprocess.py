@@ -1,18 +1,225 @@
 import pandas as pd
 import argparse
+import io
 import os
 import json # 用于模拟保存元数据
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 
 parser = argparse.ArgumentParser(description="MNIST Data Preprocessor")
 # 可选的原始数据输入目录（Artifact 输入）
 parser.add_argument("--input-dir", type=str, required=False, help="Directory path containing raw data.")
 # KFP 会提供这个目录路径
-parser.add_argument("--output-data-dir", type=str, required=True, help="Directory path to save the processed data.") 
-args = parser.parse_args()
+parser.add_argument("--output-data-dir", type=str, required=True, help="Directory path to save the processed data.")
+# 流式模式：分块读取输入目录下的全部 CSV，内存占用与数据总量无关
+parser.add_argument("--streaming", action="store_true", help="Read all CSVs in fixed-size chunks instead of loading one file into memory.")
+parser.add_argument("--chunk-size", type=int, default=100000, help="Rows per chunk in streaming mode.")
+parser.add_argument("--workers", type=int, default=1, help="Processes to spread input files across in streaming mode.")
+# parquet/arrow 为列式格式，训练端免去 CSV 文本解析；arrow 为未压缩的 Arrow IPC 文件，可被训练端内存映射读取
+parser.add_argument("--output-format", choices=["parquet", "arrow", "csv"], default="csv",
+                    help="parquet (one row group per chunk), arrow (Arrow IPC file, memory-mappable) or csv.")
 
-print("Starting MNIST data preprocessing and saving to Artifact Store...")
+OUTPUT_FILES = {"csv": "processed_data.csv", "parquet": "processed_data.parquet", "arrow": "processed_data.arrow"}
 
-try:
+def _new_stats():
+    return {"count": 0, "nulls": 0, "min": None, "max": None, "sum": 0.0, "numeric": True}
+
+def _update_stats(stats, chunk):
+    # 按块累积每列统计，避免持有整张表
+    for col in chunk.columns:
+        s = stats.setdefault(col, _new_stats())
+        series = chunk[col]
+        non_null = series.dropna()
+        s["count"] += int(non_null.size)
+        s["nulls"] += int(series.size - non_null.size)
+        if s["numeric"] and pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            if non_null.size:
+                lo, hi = float(non_null.min()), float(non_null.max())
+                s["min"] = lo if s["min"] is None else min(s["min"], lo)
+                s["max"] = hi if s["max"] is None else max(s["max"], hi)
+                s["sum"] += float(non_null.sum())
+        elif non_null.size:
+            s["numeric"] = False
+
+def _merge_stats(total, part):
+    for col, p in part.items():
+        s = total.setdefault(col, _new_stats())
+        s["count"] += p["count"]
+        s["nulls"] += p["nulls"]
+        s["numeric"] = s["numeric"] and p["numeric"]
+        for key, pick in (("min", min), ("max", max)):
+            if p[key] is not None:
+                s[key] = p[key] if s[key] is None else pick(s[key], p[key])
+        s["sum"] += p["sum"]
+
+def _finish_stats(stats):
+    out = {}
+    for col, s in stats.items():
+        entry = {"count": s["count"], "nulls": s["nulls"]}
+        if s["numeric"] and s["min"] is not None:
+            entry.update({"min": s["min"], "max": s["max"], "mean": s["sum"] / s["count"] if s["count"] else None})
+        out[col] = entry
+    return out
+
+def _output_schema(schema):
+    # 输出表结构在写第一块时确定：整数列一律存为 float64，后续块（或文件）出现小数或空值时仍可写入
+    import pyarrow as pa
+    return pa.schema([pa.field(f.name, pa.float64()) if pa.types.is_integer(f.type) else f for f in schema])
+
+class _ChunkWriter:
+    """Appends chunks to one CSV file, one Parquet file as row groups, or one Arrow IPC file as record batches."""
+
+    def __init__(self, path, output_format):
+        self.path = path
+        self.output_format = output_format
+        self.columns = None
+        self._schema = None
+        self._writer = None
+        self._file = None
+
+    def _check_columns(self, columns):
+        if self.columns is None:
+            self.columns = list(columns)
+        elif list(columns) != self.columns:
+            missing = set(self.columns) - set(columns)
+            if missing:
+                raise ValueError(f"Input is missing columns {sorted(missing)}")
+            return False
+        return True
+
+    def write(self, chunk):
+        if not self._check_columns(chunk.columns):
+            chunk = chunk[self.columns]
+        if self.output_format in ("parquet", "arrow"):
+            import pyarrow as pa
+            self._write_table(pa.Table.from_pandas(chunk, preserve_index=False))
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="")
+                chunk.to_csv(self._file, index=False)
+            else:
+                chunk.to_csv(self._file, index=False, header=False)
+
+    def _write_table(self, table):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if table.column_names != self.columns:
+            table = table.select(self.columns)
+        if self._writer is None:
+            self._schema = _output_schema(table.schema)
+            if self.output_format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        try:
+            table = table.cast(self._schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Input does not fit the output schema ({self._schema.to_string(show_schema_metadata=False)}): {e}")
+        self._writer.write_table(table)
+
+    def append_part(self, part_path):
+        # 合并子进程写出的分片：CSV 跳过表头直接拷贝，Parquet/Arrow 逐行组（批次）以 Arrow 表转写，不经 pandas
+        if self.output_format == "parquet":
+            import pyarrow.parquet as pq
+            part = pq.ParquetFile(part_path)
+            self._check_columns(part.schema_arrow.names)
+            for i in range(part.num_row_groups):
+                self._write_table(part.read_row_group(i))
+            return
+        if self.output_format == "arrow":
+            import pyarrow as pa
+            with pa.memory_map(part_path) as source:
+                reader = pa.ipc.open_file(source)
+                self._check_columns(reader.schema.names)
+                for i in range(reader.num_record_batches):
+                    self._write_table(pa.Table.from_batches([reader.get_batch(i)]))
+            return
+        with open(part_path, "r", newline="") as src:
+            header = src.readline()
+            part_columns = pd.read_csv(io.StringIO(header), nrows=0).columns.tolist()
+            if self.columns is None:
+                self.columns = part_columns
+                self._file = open(self.path, "w", newline="")
+                self._file.write(header)
+            elif part_columns != self.columns:
+                # 列顺序不同时按块重排
+                src.seek(0)
+                for chunk in pd.read_csv(src, chunksize=100000):
+                    self.write(chunk)
+                return
+            shutil.copyfileobj(src, self._file, 1 << 20)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+def process_file(src, dst, chunk_size, output_format):
+    """分块读取单个 CSV，写出到 dst，并返回行数与列统计。"""
+    writer = _ChunkWriter(dst, output_format)
+    stats, rows = {}, 0
+    try:
+        for chunk in pd.read_csv(src, chunksize=chunk_size):
+            writer.write(chunk)
+            _update_stats(stats, chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return {"file": os.path.basename(src), "rows": rows, "columns": writer.columns or [], "stats": stats}
+
+def run_streaming(args):
+    sources = []
+    if args.input_dir and os.path.isdir(args.input_dir):
+        sources = sorted(os.path.join(args.input_dir, f) for f in os.listdir(args.input_dir) if f.lower().endswith('.csv'))
+    if not sources:
+        raise ValueError(f"No CSV files found in {args.input_dir}")
+    os.makedirs(args.output_data_dir, exist_ok=True)
+    output_path = os.path.join(args.output_data_dir, OUTPUT_FILES[args.output_format])
+    writer = _ChunkWriter(output_path, args.output_format)
+    stats, rows, files = {}, 0, []
+    try:
+        if args.workers > 1 and len(sources) > 1:
+            # 各进程处理独立的文件并写出分片，再按文件顺序合并
+            parts_dir = os.path.join(args.output_data_dir, ".parts")
+            os.makedirs(parts_dir, exist_ok=True)
+            parts = [os.path.join(parts_dir, f"part-{i:05d}.{args.output_format}") for i in range(len(sources))]
+            try:
+                with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                    results = list(pool.map(process_file, sources, parts,
+                                            [args.chunk_size] * len(sources), [args.output_format] * len(sources)))
+                for part, result in zip(parts, results):
+                    if result["rows"]:
+                        writer.append_part(part)
+                    _merge_stats(stats, result["stats"])
+                    rows += result["rows"]
+                    files.append({"file": result["file"], "rows": result["rows"]})
+            finally:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+        else:
+            for src in sources:
+                file_rows = 0
+                for chunk in pd.read_csv(src, chunksize=args.chunk_size):
+                    writer.write(chunk)
+                    _update_stats(stats, chunk)
+                    file_rows += len(chunk)
+                rows += file_rows
+                files.append({"file": os.path.basename(src), "rows": file_rows})
+                print(f"Processed {src}: {file_rows} rows")
+    finally:
+        writer.close()
+    columns = writer.columns or []
+    with open(os.path.join(args.output_data_dir, 'metadata.json'), 'w') as f:
+        json.dump({
+            "rows": rows,
+            "columns": len(columns),
+            "format": args.output_format,
+            "files": files,
+            "column_stats": _finish_stats({c: stats[c] for c in columns if c in stats}),
+        }, f)
+    print(f"Data processing complete. Saved {rows} rows from {len(sources)} files to: {output_path}")
+
+def run_in_memory(args):
     # 若提供了输入目录，尝试从其中读取原始CSV
     df = None
     if args.input_dir and os.path.isdir(args.input_dir):
@@ -27,20 +234,33 @@ try:
             'label': [1, 7, 3],
             'is_normalized': [True, True, True]
         })
-    
+
     # 4. KFP 产出机制：将结果保存到指定的输出目录
     os.makedirs(args.output_data_dir, exist_ok=True)
-    
-    # 保存处理后的数据集 (CSV 文件作为 Artifact)
-    output_path = os.path.join(args.output_data_dir, 'processed_data.csv')
-    df.to_csv(output_path, index=False)
-    
+
+    # 保存处理后的数据集 (Parquet/Arrow/CSV 文件作为 Artifact)
+    output_path = os.path.join(args.output_data_dir, OUTPUT_FILES[args.output_format])
+    if args.output_format == "parquet":
+        df.to_parquet(output_path, index=False)
+    elif args.output_format == "arrow":
+        df.reset_index(drop=True).to_feather(output_path, compression="uncompressed")
+    else:
+        df.to_csv(output_path, index=False)
+
     # 模拟保存一些元数据文件，KFP 也会将其视为 Artifact
     with open(os.path.join(args.output_data_dir, 'metadata.json'), 'w') as f:
-        json.dump({"rows": len(df), "columns": len(df.columns)}, f)
+        json.dump({"rows": len(df), "columns": len(df.columns), "format": args.output_format}, f)
 
     print(f"Data processing complete. Saved {len(df)} rows to: {output_path}")
 
-except Exception as e:
-    print(f"Error during preprocessing: {e}")
-    exit(1)
+if __name__ == "__main__":
+    args = parser.parse_args()
+    print("Starting MNIST data preprocessing and saving to Artifact Store...")
+    try:
+        if args.streaming:
+            run_streaming(args)
+        else:
+            run_in_memory(args)
+    except Exception as e:
+        print(f"Error during preprocessing: {e}")
+        exit(1)
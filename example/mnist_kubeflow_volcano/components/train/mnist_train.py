@@ -12,18 +12,50 @@ parser.add_argument("--input-dir", type=str, required=True, help="Directory path
 parser.add_argument("--output-model-dir", type=str, required=True, help="Directory path to save the trained model artifact.")
 parser.add_argument("--epochs", type=int, default=3, help="Number of training epochs.")
 parser.add_argument("--lr", type=float, default=0.01, help="Learning rate.")
+# 默认按 parquet -> arrow -> csv 顺序查找预处理产物，兼容旧版只输出 CSV 的预处理镜像
+parser.add_argument("--input-format", choices=["auto", "parquet", "arrow", "csv"], default="auto", help="Format of the processed data.")
+parser.add_argument("--mmap", action="store_true", help="Memory-map the processed data instead of reading it into memory (arrow/parquet).")
+# npy-shards：未压缩的 .npy 分片加清单，下游可按需 np.load(mmap_mode='r') 读取部分权重
+parser.add_argument("--weights-format", choices=["npz", "npy-shards"], default="npz", help="Format of the saved model weights.")
+parser.add_argument("--shard-size-mb", type=float, default=256, help="Maximum size of one weight shard with npy-shards.")
 args = parser.parse_args()
 # --------------------------------------------------
 
+INPUT_FILES = {"parquet": "processed_data.parquet", "arrow": "processed_data.arrow", "csv": "processed_data.csv"}
+
+def find_processed_file(input_dir, input_format):
+    formats = ["parquet", "arrow", "csv"] if input_format == "auto" else [input_format]
+    for fmt in formats:
+        path = os.path.join(input_dir, INPUT_FILES[fmt])
+        if os.path.exists(path):
+            return fmt, path
+    raise FileNotFoundError(f"No processed data ({', '.join(INPUT_FILES[f] for f in formats)}) in {input_dir}")
+
+def load_processed_data(fmt, path, mmap):
+    """
+    Returns a DataFrame, or with mmap an Arrow table whose columns stay
+    backed by the mapped file (arrow is zero-copy; parquet is decoded from
+    the mapping without buffering the file).
+    """
+    if fmt == "csv":
+        return pd.read_csv(path)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if fmt == "arrow":
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all() if mmap else pa.ipc.open_file(path).read_all()
+    else:
+        table = pq.read_table(path, memory_map=mmap)
+    return table if mmap else table.to_pandas()
+
 print(f"Starting model training (Volcano Scheduled Task)...")
-processed_file = os.path.join(args.input_dir, 'processed_data.csv')
-print(f"Reading data from Preprocess task's output: {processed_file}")
 print(f"Training parameters: Epochs={args.epochs}, LR={args.lr}")
 
 try:
     # 1. 🌟 读取上一步的输出 (Input Artifacts)
-    # 实际中: df = pd.read_csv(processed_file)
-    df = pd.read_csv(processed_file) 
+    data_format, processed_file = find_processed_file(args.input_dir, args.input_format)
+    print(f"Reading {data_format} data from Preprocess task's output: {processed_file}{' (memory-mapped)' if args.mmap and data_format != 'csv' else ''}")
+    df = load_processed_data(data_format, processed_file, args.mmap)
+    print(f"Loaded {len(df)} rows")
     
     # 模拟分布式训练的资源确认
     print(f"Simulating distributed training on 1 GPU...")
@@ -38,8 +70,16 @@ try:
     
     # A. 保存模型状态 (模拟保存一个大型 NumPy 数组作为权重文件)
     os.makedirs(args.output_model_dir, exist_ok=True)
-    model_path = os.path.join(args.output_model_dir, 'model_weights.npz')
-    np.savez(model_path, weights=np.random.rand(100, 10))
+    if args.weights_format == "npy-shards":
+        from weights_io import ShardedWeightsWriter, MANIFEST_FILE
+        # 逐分片生成并写出，权重无需整体驻留内存
+        writer = ShardedWeightsWriter(args.output_model_dir, args.shard_size_mb)
+        writer.add_streamed("weights", (100, 10), np.float64, lambda start, stop: np.random.rand(stop - start, 10))
+        writer.close()
+        model_path = os.path.join(args.output_model_dir, MANIFEST_FILE)
+    else:
+        model_path = os.path.join(args.output_model_dir, 'model_weights.npz')
+        np.savez(model_path, weights=np.random.rand(100, 10))
     print(f"Model weights saved to: {model_path}")
 
     # B. 保存指标 (用于 KFP UI 显示，KFP 可以识别metrics.json)
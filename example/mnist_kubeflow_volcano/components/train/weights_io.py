@@ -0,0 +1,94 @@
+"""
+Sharded weight artifacts: each tensor is split along its first axis into
+uncompressed .npy shards of at most --shard-size-mb, described by
+model_weights.manifest.json. Shards are written one at a time, and readers
+can np.load(..., mmap_mode='r') just the tensors (or shards) they need.
+
+Manifest layout:
+    {"format": "npy-shards", "version": 1,
+     "tensors": {"weights": {"dtype": "float64", "shape": [100, 10],
+                             "shards": [{"file": "weights-00000.npy", "start": 0, "stop": 100}]}}}
+"""
+import json
+import os
+
+import numpy as np
+
+MANIFEST_FILE = "model_weights.manifest.json"
+FORMAT = "npy-shards"
+
+def _rows_per_shard(shape, dtype, shard_bytes):
+    row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * np.dtype(dtype).itemsize
+    return max(1, shard_bytes // max(row_bytes, 1))
+
+class ShardedWeightsWriter:
+    """Writes tensors shard by shard; call close() to publish the manifest."""
+
+    def __init__(self, output_dir, shard_size_mb=256):
+        self.output_dir = output_dir
+        self.shard_bytes = int(shard_size_mb * 1024 * 1024)
+        self.tensors = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add(self, name, array):
+        array = np.asarray(array)
+        if array.ndim == 0:
+            # Scalars are stored as a one-element shard; the manifest keeps the real shape
+            self.add_streamed(name, (1,), array.dtype, lambda start, stop: array.reshape(1))
+            self.tensors[name]["shape"] = []
+            return
+        self.add_streamed(name, array.shape, array.dtype, lambda start, stop: array[start:stop])
+
+    def add_streamed(self, name, shape, dtype, produce):
+        """
+        produce(start, stop) returns rows [start, stop) of the tensor, so a
+        tensor never has to exist in memory as a whole.
+        """
+        shape = tuple(int(d) for d in shape)
+        rows = _rows_per_shard(shape, dtype, self.shard_bytes)
+        shards = []
+        for i, start in enumerate(range(0, shape[0], rows)):
+            stop = min(start + rows, shape[0])
+            file_name = f"{name}-{i:05d}.npy"
+            block = np.asarray(produce(start, stop), dtype=dtype).reshape((stop - start,) + shape[1:])
+            np.save(os.path.join(self.output_dir, file_name), block, allow_pickle=False)
+            shards.append({"file": file_name, "start": start, "stop": stop})
+        self.tensors[name] = {"dtype": np.dtype(dtype).str, "shape": list(shape), "shards": shards}
+
+    def close(self):
+        # Written last, so a reader never sees a manifest pointing at missing shards
+        tmp_path = os.path.join(self.output_dir, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"format": FORMAT, "version": 1, "tensors": self.tensors}, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.output_dir, MANIFEST_FILE))
+
+def read_manifest(model_dir):
+    with open(os.path.join(model_dir, MANIFEST_FILE), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"Unsupported weights format {manifest.get('format')}")
+    return manifest
+
+def load_shards(model_dir, name, mmap=True):
+    """Returns the tensor's shards as arrays, memory-mapped by default."""
+    entry = read_manifest(model_dir)["tensors"][name]
+    return [np.load(os.path.join(model_dir, s["file"]), mmap_mode="r" if mmap else None, allow_pickle=False)
+            for s in entry["shards"]]
+
+def load_tensor(model_dir, name, mmap=True):
+    """
+    Returns a whole tensor. A single-shard tensor stays memory-mapped; a
+    multi-shard one is concatenated into memory.
+    """
+    entry = read_manifest(model_dir)["tensors"][name]
+    shards = load_shards(model_dir, name, mmap)
+    if not shards:
+        # Zero rows: nothing was written
+        return np.empty(entry["shape"], dtype=entry["dtype"])
+    tensor = shards[0] if len(shards) == 1 else np.concatenate(shards)
+    return tensor.reshape(entry["shape"])
+
+def load_weights(model_dir, names=None, mmap=True):
+    """Returns {name: array} for the requested tensors (all by default)."""
+    tensors = read_manifest(model_dir)["tensors"]
+    return {n: load_tensor(model_dir, n, mmap) for n in (names or tensors)}
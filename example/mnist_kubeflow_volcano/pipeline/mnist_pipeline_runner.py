@@ -24,6 +24,28 @@ except FileNotFoundError:
     exit(1)
 
 
+# --- 对象存储配置：可通过环境变量覆盖 ---
+# Endpoint 指向集群内 MinIO IP, 绕过 DNS/PathStyle 问题
+STORAGE_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "http://10.96.2.78:9000")
+STORAGE_REGION = os.environ.get("MINIO_REGION", "us-east-1")
+STORAGE_SECRET = os.environ.get("MINIO_SECRET_NAME", "mlpipeline-minio-artifact")
+
+def apply_storage_env(task):
+    kubernetes.use_secret_as_env(
+        task=task,
+        secret_name=STORAGE_SECRET,
+        secret_key_to_env={
+            'accesskey': 'AWS_ACCESS_KEY_ID',
+            'secretkey': 'AWS_SECRET_ACCESS_KEY'
+        }
+    )
+    task.set_env_variable('AWS_REGION', STORAGE_REGION)
+    task.set_env_variable('AWS_ENDPOINT_URL', STORAGE_ENDPOINT)
+    # 强制 Path Style (解决 DNS 解析问题)
+    for name in ('S3_FORCE_PATH_STYLE', 'AWS_S3_FORCE_PATH_STYLE', 'AWS_USE_PATH_STYLE_REQUESTS', 'AWS_S3_USE_PATH_STYLE'):
+        task.set_env_variable(name, 'true')
+
+
 # --- Pipeline 定义：DAG 结构和 Volcano 注入 ---
 @dsl.pipeline(
     name='mnist-volcano-training',
@@ -60,48 +82,9 @@ def mnist_pipeline(
     # --- 🌟 关键：Volcano 调度注入点 ---
     # 这将确保这个训练任务的 Pod 由 Volcano 调度器处理
     if _HAS_KFP_K8S:
-        # 注入 MinIO 凭证
-        kubernetes.use_secret_as_env(
-            task=prep_task,
-            secret_name='mlpipeline-minio-artifact',
-            secret_key_to_env={
-                'accesskey': 'AWS_ACCESS_KEY_ID',
-                'secretkey': 'AWS_SECRET_ACCESS_KEY'
-            }
-        )
-        # 注入 Region (S3 Client 需要)
-        prep_task.set_env_variable('AWS_REGION', 'us-east-1')
-        # 注入 Endpoint (指向集群内 MinIO IP, 绕过 DNS/PathStyle 问题)
-        prep_task.set_env_variable('AWS_ENDPOINT_URL', 'http://10.96.2.78:9000')
-        # prep_task.set_env_variable('AWS_ENDPOINT_URL', 'minio-service.kubeflow:9000')
-        # prep_task.set_env_variable('AWS_ENDPOINT_URL', 'http://minio-service.kubeflow:9000')
-        # prep_task.set_env_variable('AWS_ENDPOINT_URL', 'http://minio-service:9000')
-        # 强制 Path Style (解决 DNS 解析问题)
-        prep_task.set_env_variable('S3_FORCE_PATH_STYLE', 'true')
-        prep_task.set_env_variable('AWS_S3_FORCE_PATH_STYLE', 'true')
-        prep_task.set_env_variable('AWS_USE_PATH_STYLE_REQUESTS', 'true')
-        prep_task.set_env_variable('AWS_S3_USE_PATH_STYLE', 'true')
-
-        kubernetes.use_secret_as_env(
-            task=train_task,
-            secret_name='mlpipeline-minio-artifact',
-            secret_key_to_env={
-                'accesskey': 'AWS_ACCESS_KEY_ID',
-                'secretkey': 'AWS_SECRET_ACCESS_KEY'
-            }
-        )
-        # 注入 Region (S3 Client 需要)
-        train_task.set_env_variable('AWS_REGION', 'us-east-1')
-        # 注入 Endpoint (指向集群内 MinIO IP, 绕过 DNS/PathStyle 问题)
-        train_task.set_env_variable('AWS_ENDPOINT_URL', 'http://10.96.2.78:9000')
-        # train_task.set_env_variable('AWS_ENDPOINT_URL', 'minio-service.kubeflow:9000')
-        # train_task.set_env_variable('AWS_ENDPOINT_URL', 'http://minio-service.kubeflow:9000')
-        # train_task.set_env_variable('AWS_ENDPOINT_URL', 'http://minio-service:9000')
-        # 强制 Path Style (解决 DNS 解析问题)
-        train_task.set_env_variable('S3_FORCE_PATH_STYLE', 'true')
-        train_task.set_env_variable('AWS_S3_FORCE_PATH_STYLE', 'true')
-        train_task.set_env_variable('AWS_USE_PATH_STYLE_REQUESTS', 'true')
-        train_task.set_env_variable('AWS_S3_USE_PATH_STYLE', 'true')
+        # 注入 MinIO 凭证、Region、Endpoint 与 Path Style（与后端默认存储配置一致）
+        for task in (prep_task, train_task):
+            apply_storage_env(task)
 
         kubernetes.add_pod_annotation(
             task=train_task,
@@ -0,0 +1,117 @@
+"""
+Compares the preprocess -> train handoff formats (csv, parquet, arrow,
+arrow + mmap) on a synthetic MNIST-shaped dataset: wall time and peak RSS
+of each step, measured per child process with os.wait4.
+
+    python utils/bench_handoff_formats.py --rows 60000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREPROCESS = os.path.join(ROOT, "components", "preprocess", "mnist_preprocess.py")
+TRAIN = os.path.join(ROOT, "components", "train", "mnist_train.py")
+
+# (name, preprocess --output-format, extra trainer args)
+VARIANTS = [
+    ("csv", "csv", []),
+    ("parquet", "parquet", []),
+    ("parquet+mmap", "parquet", ["--mmap"]),
+    ("arrow", "arrow", []),
+    ("arrow+mmap", "arrow", ["--mmap"]),
+]
+
+def generate_raw(path: str, rows: int, pixels: int, chunk: int = 10000):
+    # 写成多块，避免生成数据本身占满内存
+    rng = np.random.default_rng(0)
+    header = True
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        df = pd.DataFrame(rng.integers(0, 256, size=(n, pixels), dtype=np.uint8),
+                          columns=[f"pixel{i}" for i in range(pixels)])
+        df.insert(0, "label", rng.integers(0, 10, size=n))
+        df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+        header = False
+
+def run_step(cmd):
+    """Runs cmd and returns (seconds, peak RSS in MiB) of that child only."""
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        # 子进程无论 exec 是否成功都不能回到父进程的基准循环
+        try:
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, 1)
+            os.execv(cmd[0], cmd)
+        except BaseException as e:
+            os.write(2, f"exec {cmd[0]} failed: {e}\n".encode())
+        finally:
+            os._exit(127)
+    _, status, usage = os.wait4(pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"Step failed: {' '.join(cmd)}")
+    # ru_maxrss is in KiB on Linux
+    return elapsed, usage.ru_maxrss / 1024.0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocess -> train artifact formats")
+    parser.add_argument("--rows", type=int, default=60000)
+    parser.add_argument("--pixels", type=int, default=784)
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Preprocess --chunk-size")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Optional JSONL file to append results to")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    cli_args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="handoff-bench-")
+    raw_dir = os.path.join(workdir, "raw")
+    os.makedirs(raw_dir)
+    print(f"Generating {cli_args.rows} x {cli_args.pixels + 1} raw CSV in {raw_dir} ...")
+    generate_raw(os.path.join(raw_dir, "train_data.csv"), cli_args.rows, cli_args.pixels)
+
+    results = []
+    try:
+        for name, fmt, train_args in VARIANTS:
+            for r in range(cli_args.repeats):
+                out_dir = os.path.join(workdir, f"processed-{fmt}")
+                model_dir = os.path.join(workdir, f"model-{name}")
+                if not os.path.exists(out_dir):
+                    prep_s, prep_mb = run_step([sys.executable, PREPROCESS, "--input-dir", raw_dir,
+                                                "--output-data-dir", out_dir, "--streaming",
+                                                "--chunk-size", str(cli_args.chunk_size), "--output-format", fmt])
+                    prep_size = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)) / 2**20
+                    prep = (prep_s, prep_mb, prep_size)
+                train_s, train_mb = run_step([sys.executable, TRAIN, "--input-dir", out_dir,
+                                              "--output-model-dir", model_dir, "--input-format", fmt, *train_args])
+                results.append({
+                    "variant": name, "repeat": r,
+                    "preprocess_s": round(prep[0], 3), "preprocess_peak_mb": round(prep[1], 1),
+                    "artifact_mb": round(prep[2], 1),
+                    "train_s": round(train_s, 3), "train_peak_mb": round(train_mb, 1),
+                    "total_s": round(prep[0] + train_s, 3),
+                })
+    finally:
+        if not cli_args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'variant':<14}{'artifact MB':>12}{'prep s':>9}{'prep MB':>9}{'train s':>9}{'train MB':>10}{'total s':>9}")
+    for res in results:
+        print(f"{res['variant']:<14}{res['artifact_mb']:>12.1f}{res['preprocess_s']:>9.2f}{res['preprocess_peak_mb']:>9.0f}"
+              f"{res['train_s']:>9.2f}{res['train_peak_mb']:>10.0f}{res['total_s']:>9.2f}")
+    if cli_args.output:
+        with open(cli_args.output, "a") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "rows": cli_args.rows, "pixels": cli_args.pixels, "chunk_size": cli_args.chunk_size,
+                "results": results,
+            }) + "\n")
@@ -0,0 +1,72 @@
+"""
+Checks that mnist_preprocess.py --streaming writes input whose column types
+drift between chunks and files (an integer column that later holds a
+fraction or an empty value, a float column that later holds only integers)
+for every output format, serially and with --workers 2, and that the output
+holds the same values as the input. Exits with code 1 on any failure:
+
+    python utils/check_preprocess_schema.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PREPROCESS = os.path.join(ROOT, "components", "preprocess", "mnist_preprocess.py")
+OUTPUT_FILES = {"csv": "processed_data.csv", "parquet": "processed_data.parquet", "arrow": "processed_data.arrow"}
+
+# 每个文件按 2 行一块读取：a 在第一块为整数、之后出现小数与空值；b 在第二个文件中只剩整数
+INPUTS = {
+    "part-0.csv": "a,b,label\n1,0.5,x\n2,1.5,y\n0.5,2.5,z\n,3.5,w\n",
+    "part-1.csv": "a,b,label\n3,4,v\n4,5,u\n5,6,t\n",
+}
+
+def read_output(fmt, path):
+    if fmt == "csv":
+        return pd.read_csv(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    import pyarrow as pa
+    return pa.ipc.open_file(path).read_all().to_pandas()
+
+def main() -> int:
+    work = tempfile.mkdtemp(prefix="prep-schema-")
+    input_dir = os.path.join(work, "in")
+    os.makedirs(input_dir)
+    for name, text in INPUTS.items():
+        with open(os.path.join(input_dir, name), "w") as f:
+            f.write(text)
+    expected = pd.concat([pd.read_csv(os.path.join(input_dir, name)) for name in sorted(INPUTS)], ignore_index=True)
+
+    failures = []
+    for fmt in ("csv", "parquet", "arrow"):
+        for workers in (1, 2):
+            name = f"{fmt} workers={workers}"
+            output_dir = os.path.join(work, f"out-{fmt}-{workers}")
+            proc = subprocess.run([sys.executable, PREPROCESS, "--streaming", "--chunk-size", "2",
+                                   "--workers", str(workers), "--output-format", fmt,
+                                   "--input-dir", input_dir, "--output-data-dir", output_dir],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"FAIL {name}")
+                failures.append(f"{name}: exit {proc.returncode}\n{proc.stdout}{proc.stderr}")
+                continue
+            got = read_output(fmt, os.path.join(output_dir, OUTPUT_FILES[fmt]))
+            ok = (list(got.columns) == list(expected.columns)
+                  and all(np.allclose(got[c].astype(float), expected[c].astype(float), equal_nan=True) for c in ("a", "b"))
+                  and got["label"].tolist() == expected["label"].tolist())
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            if not ok:
+                failures.append(f"{name}: expected\n{expected}\ngot\n{got}")
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
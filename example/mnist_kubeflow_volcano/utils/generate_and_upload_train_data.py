@@ -1,18 +1,55 @@
 import argparse
+import io
 import os
 import sys
 import tempfile
 import subprocess
 import csv
+from concurrent.futures import ThreadPoolExecutor
+
+HEADER = ["pixel_sum", "label", "is_normalized"]
+MIN_PART_SIZE_MB = 5  # S3 multipart 的最小分片大小
 
 def generate_csv(path: str, rows: int):
     with open(path, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(["pixel_sum", "label", "is_normalized"]) 
+        writer.writerow(HEADER)
         for i in range(rows):
             writer.writerow([int(2000 + i % 600), i % 10, True])
 
-def upload_minio(local_path: str, endpoint: str, bucket: str, object_key: str, access_key: str, secret_key: str):
+class CsvRowStream(io.RawIOBase):
+    """
+    按需生成 [start, stop) 行的 CSV 字节流（含表头），不落盘也不整体驻留内存。
+    行内容与 generate_csv 一致。
+    """
+
+    def __init__(self, start: int, stop: int, batch_rows: int = 10000):
+        self._next = start
+        self._stop = stop
+        self._batch_rows = batch_rows
+        self._buf = (",".join(HEADER) + "\r\n").encode()
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def _fill(self):
+        end = min(self._next + self._batch_rows, self._stop)
+        self._buf = "".join(f"{2000 + i % 600},{i % 10},True\r\n" for i in range(self._next, end)).encode()
+        self._pos = 0
+        self._next = end
+
+    def readinto(self, b):
+        if self._pos >= len(self._buf):
+            if self._next >= self._stop:
+                return 0
+            self._fill()
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+def _minio_client(endpoint: str, access_key: str, secret_key: str):
     try:
         from minio import Minio
     except Exception:
@@ -20,13 +57,26 @@ def upload_minio(local_path: str, endpoint: str, bucket: str, object_key: str, a
         sys.exit(3)
     secure = endpoint.startswith("https://")
     host = endpoint.replace("http://", "").replace("https://", "")
-    client = Minio(host, access_key=access_key, secret_key=secret_key, secure=secure)
+    return Minio(host, access_key=access_key, secret_key=secret_key, secure=secure)
+
+def _ensure_bucket(client, bucket: str):
     if not client.bucket_exists(bucket):
         client.make_bucket(bucket)
+
+def upload_minio(local_path: str, endpoint: str, bucket: str, object_key: str, access_key: str, secret_key: str):
+    client = _minio_client(endpoint, access_key, secret_key)
+    _ensure_bucket(client, bucket)
     with open(local_path, "rb") as f:
         stat = os.stat(local_path)
         client.put_object(bucket, object_key, f, stat.st_size, content_type="text/csv")
 
+def upload_minio_stream(client, bucket: str, object_key: str, start: int, stop: int, part_size_mb: int, parallel_uploads: int):
+    # 长度未知时 SDK 按 part_size 切分为 multipart，并以 parallel_uploads 个线程并发上传；
+    # 生成端会被线程池阻塞，内存占用约为 (parallel_uploads + 1) * part_size
+    client.put_object(bucket, object_key, CsvRowStream(start, stop), length=-1,
+                      part_size=part_size_mb * 1024 * 1024, num_parallel_uploads=parallel_uploads,
+                      content_type="text/csv")
+
 def ensure_dir_in_pod(namespace: str, pod: str, dest_path: str):
     dir_path = os.path.dirname(dest_path).replace("\\", "/")
     subprocess.run(["kubectl", "-n", namespace, "exec", pod, "--", "sh", "-lc", f"mkdir -p '{dir_path}'"], check=True)
@@ -35,6 +85,21 @@ def upload_kubectl(local_path: str, namespace: str, pod: str, dest_path: str):
     ensure_dir_in_pod(namespace, pod, dest_path)
     subprocess.run(["kubectl", "-n", namespace, "cp", local_path, f"{pod}:{dest_path}"], check=True)
 
+def upload_kubectl_stream(namespace: str, pod: str, dest_path: str, start: int, stop: int):
+    # 直接把生成的行写入 Pod 内 cat 的标准输入
+    ensure_dir_in_pod(namespace, pod, dest_path)
+    proc = subprocess.Popen(["kubectl", "-n", namespace, "exec", "-i", pod, "--", "sh", "-c", f"cat > '{dest_path}'"],
+                            stdin=subprocess.PIPE)
+    stream = CsvRowStream(start, stop)
+    while True:
+        chunk = stream.read(1 << 20)
+        if not chunk:
+            break
+        proc.stdin.write(chunk)
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError(f"kubectl exec failed for {dest_path}")
+
 def discover_minio_pod(namespace: str) -> str:
     try:
         name = subprocess.check_output(["kubectl", "-n", namespace, "get", "pods", "-l", "app=minio", "-o", "jsonpath={.items[0].metadata.name}"]).decode().strip()
@@ -44,6 +109,18 @@ def discover_minio_pod(namespace: str) -> str:
         pass
     raise RuntimeError("failed to discover minio pod")
 
+def shard_plan(object_key: str, rows: int, shards: int):
+    """
+    返回 [(object_key, start, stop)]。多分片时写到 <object 去掉扩展名>/part-XXXXX.csv，
+    该前缀可整体作为目录 Artifact 交给预处理的 --streaming 模式读取。
+    """
+    if shards <= 1:
+        return [(object_key, 0, rows)]
+    prefix, ext = os.path.splitext(object_key)
+    per_shard = -(-rows // shards)
+    return [(f"{prefix}/part-{i:05d}{ext or '.csv'}", i * per_shard, min(rows, (i + 1) * per_shard))
+            for i in range(shards) if i * per_shard < rows]
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--rows", type=int, default=100)
@@ -55,24 +132,60 @@ def main():
     parser.add_argument("--secret-key", type=str, default=os.environ.get("MINIO_SECRET_KEY") or os.environ.get("MINIO_ROOT_PASSWORD") or "minio123")
     parser.add_argument("--namespace", type=str, default="kubeflow")
     parser.add_argument("--pod", type=str, default="")
+    # 流式模式：边生成边上传，不写本地临时文件
+    parser.add_argument("--stream", action="store_true", help="Generate rows straight into the upload instead of a temp file.")
+    parser.add_argument("--part-size-mb", type=int, default=16, help=f"Multipart part size with --stream (min {MIN_PART_SIZE_MB}).")
+    parser.add_argument("--parallel-uploads", type=int, default=4, help="Parts uploaded concurrently per object with --stream.")
+    parser.add_argument("--shards", type=int, default=1, help="Split the rows into this many objects under the --object prefix.")
+    parser.add_argument("--shard-concurrency", type=int, default=4, help="Shards generated and uploaded at the same time.")
     args = parser.parse_args()
 
-    tmpdir = tempfile.mkdtemp()
-    local_path = os.path.join(tmpdir, "train_data.csv")
-    generate_csv(local_path, args.rows)
+    if args.part_size_mb < MIN_PART_SIZE_MB:
+        print(f"--part-size-mb must be at least {MIN_PART_SIZE_MB}")
+        sys.exit(2)
+    plan = shard_plan(args.object, args.rows, args.shards)
 
     if args.method == "minio":
         if not args.access_key or not args.secret_key:
             print("missing minio credentials")
             sys.exit(2)
-        upload_minio(local_path, args.endpoint, args.bucket, args.object, args.access_key, args.secret_key)
-        print(f"uploaded: {args.endpoint}/{args.bucket}/{args.object}")
+        if not args.stream and len(plan) == 1:
+            tmpdir = tempfile.mkdtemp()
+            local_path = os.path.join(tmpdir, "train_data.csv")
+            generate_csv(local_path, args.rows)
+            upload_minio(local_path, args.endpoint, args.bucket, args.object, args.access_key, args.secret_key)
+            print(f"uploaded: {args.endpoint}/{args.bucket}/{args.object}")
+            return
+        client = _minio_client(args.endpoint, args.access_key, args.secret_key)
+        _ensure_bucket(client, args.bucket)
+
+        def upload(item):
+            key, start, stop = item
+            upload_minio_stream(client, args.bucket, key, start, stop, args.part_size_mb, args.parallel_uploads)
+            print(f"uploaded: {args.endpoint}/{args.bucket}/{key} ({stop - start} rows)")
+
+        with ThreadPoolExecutor(max_workers=max(1, args.shard_concurrency)) as pool:
+            list(pool.map(upload, plan))
         return
 
     pod = args.pod or discover_minio_pod(args.namespace)
-    dest_path = f"/data/{args.bucket}/{args.object}".replace("\\", "/")
-    upload_kubectl(local_path, args.namespace, pod, dest_path)
-    print(f"copied: {local_path} -> {pod}:{dest_path}")
+    if not args.stream and len(plan) == 1:
+        tmpdir = tempfile.mkdtemp()
+        local_path = os.path.join(tmpdir, "train_data.csv")
+        generate_csv(local_path, args.rows)
+        dest_path = f"/data/{args.bucket}/{args.object}".replace("\\", "/")
+        upload_kubectl(local_path, args.namespace, pod, dest_path)
+        print(f"copied: {local_path} -> {pod}:{dest_path}")
+        return
+
+    def copy(item):
+        key, start, stop = item
+        dest_path = f"/data/{args.bucket}/{key}".replace("\\", "/")
+        upload_kubectl_stream(args.namespace, pod, dest_path, start, stop)
+        print(f"streamed: {stop - start} rows -> {pod}:{dest_path}")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.shard_concurrency)) as pool:
+        list(pool.map(copy, plan))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,225 @@
+"""
+Minimal S3-compatible stand-in for testing uploads and artifact previews
+without MinIO.
+
+Objects are stored as plain files under <root>/<bucket>/<key> (the layout
+the backend's local executor reads s3:// arguments from). Supports what the
+minio SDK needs for buckets, listing, single PUTs, multipart uploads and
+ranged reads: HEAD/PUT bucket, GET ?location, ListObjectsV2, PUT/GET/HEAD
+object (GET honours Range), POST ?uploads, PUT ?partNumber, POST ?uploadId
+and DELETE ?uploadId. Requests are not authenticated.
+
+    python utils/s3_standin.py --root /tmp/s3 --port 30099
+    python utils/generate_and_upload_train_data.py --endpoint http://localhost:30099 --stream --rows 1000000
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from xml.sax.saxutils import escape
+
+XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+def make_handler(root: str):
+    uploads_dir = os.path.join(root, ".multipart")
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, code, body=b"", headers=None, content_type="application/xml"):
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, code, s3_code, message):
+            self._send(code, f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{s3_code}</Code>"
+                             f"<Message>{message}</Message><Resource>{self.path}</Resource>"
+                             f"<RequestId>{uuid.uuid4().hex}</RequestId></Error>")
+
+        def _read_body(self):
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                data = b""
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return data
+                    data += self.rfile.read(size)
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _parse(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query, keep_blank_values=True)
+            parts = unquote(url.path).lstrip("/").split("/", 1)
+            bucket = parts[0]
+            key = parts[1] if len(parts) > 1 else ""
+            return bucket, key, query
+
+        def _object_path(self, bucket, key):
+            path = os.path.abspath(os.path.join(root, bucket, key))
+            if not path.startswith(os.path.abspath(root) + os.sep) or ".." in key.split("/"):
+                raise ValueError("invalid key")
+            return path
+
+        def do_HEAD(self):
+            bucket, key, _ = self._parse()
+            if not key:
+                return self._send(200 if os.path.isdir(os.path.join(root, bucket)) else 404)
+            path = self._object_path(bucket, key)
+            if not os.path.isfile(path):
+                return self._send(404)
+            self._send(200, headers={"Content-Length": str(os.path.getsize(path)), "ETag": '"0"'},
+                       content_type="application/octet-stream")
+
+        def do_GET(self):
+            bucket, key, query = self._parse()
+            if not key and "location" in query:
+                return self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><LocationConstraint xmlns="{XMLNS}"></LocationConstraint>')
+            if not key:
+                return self._list(bucket, query)
+            path = self._object_path(bucket, key)
+            if not os.path.isfile(path):
+                return self._error(404, "NoSuchKey", "The specified key does not exist.")
+            size = os.path.getsize(path)
+            match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+            if not match:
+                with open(path, "rb") as f:
+                    return self._send(200, f.read(), content_type="application/octet-stream")
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+            else:
+                start, end = max(0, size - int(match.group(2))), size - 1
+            if start >= size or start > end:
+                return self._error(416, "InvalidRange", "The requested range is not satisfiable")
+            with open(path, "rb") as f:
+                f.seek(start)
+                body = f.read(end - start + 1)
+            self._send(206, body, headers={"Content-Range": f"bytes {start}-{end}/{size}"},
+                       content_type="application/octet-stream")
+
+        def _list(self, bucket, query):
+            # ListObjectsV2 without delimiters or pagination beyond max-keys
+            bucket_dir = os.path.join(root, bucket)
+            if not os.path.isdir(bucket_dir):
+                return self._error(404, "NoSuchBucket", "The specified bucket does not exist.")
+            prefix = query.get("prefix", [""])[0]
+            max_keys = int(query.get("max-keys", ["1000"])[0])
+            keys = []
+            for dirpath, dirnames, filenames in os.walk(bucket_dir):
+                dirnames.sort()
+                for name in filenames:
+                    key = os.path.relpath(os.path.join(dirpath, name), bucket_dir).replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        keys.append(key)
+            keys.sort()
+            truncated = len(keys) > max_keys
+            contents = "".join(
+                f"<Contents><Key>{escape(k)}</Key><Size>{os.path.getsize(os.path.join(bucket_dir, k))}</Size>"
+                f'<ETag>"0"</ETag><LastModified>2000-01-01T00:00:00.000Z</LastModified><StorageClass>STANDARD</StorageClass></Contents>'
+                for k in keys[:max_keys])
+            self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{XMLNS}">'
+                            f"<Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{min(len(keys), max_keys)}</KeyCount>"
+                            f"<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{'true' if truncated else 'false'}</IsTruncated>"
+                            f"{contents}</ListBucketResult>")
+
+        def do_PUT(self):
+            bucket, key, query = self._parse()
+            body = self._read_body()
+            if not key:
+                os.makedirs(os.path.join(root, bucket), exist_ok=True)
+                return self._send(200)
+            if not os.path.isdir(os.path.join(root, bucket)):
+                return self._error(404, "NoSuchBucket", "The specified bucket does not exist.")
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if "uploadId" in query:
+                upload_dir = os.path.join(uploads_dir, query["uploadId"][0])
+                if not os.path.isdir(upload_dir):
+                    return self._error(404, "NoSuchUpload", "The specified upload does not exist.")
+                with open(os.path.join(upload_dir, f"{int(query['partNumber'][0]):05d}"), "wb") as f:
+                    f.write(body)
+                return self._send(200, headers={"ETag": etag})
+            path = self._object_path(bucket, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(body)
+            self._send(200, headers={"ETag": etag})
+
+        def do_POST(self):
+            bucket, key, query = self._parse()
+            body = self._read_body()
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                os.makedirs(os.path.join(uploads_dir, upload_id))
+                return self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult xmlns="{XMLNS}">'
+                                       f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                                       "</InitiateMultipartUploadResult>")
+            if "uploadId" in query:
+                upload_dir = os.path.join(uploads_dir, query["uploadId"][0])
+                if not os.path.isdir(upload_dir):
+                    return self._error(404, "NoSuchUpload", "The specified upload does not exist.")
+                numbers = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+                path = self._object_path(bucket, key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with lock, open(path + ".tmp", "wb") as out:
+                    for n in numbers:
+                        with open(os.path.join(upload_dir, f"{n:05d}"), "rb") as part:
+                            shutil.copyfileobj(part, out, 1 << 20)
+                os.replace(path + ".tmp", path)
+                shutil.rmtree(upload_dir, ignore_errors=True)
+                return self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult xmlns="{XMLNS}">'
+                                       f"<Location>/{bucket}/{key}</Location><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                                       f'<ETag>"{uuid.uuid4().hex}-{len(numbers)}"</ETag></CompleteMultipartUploadResult>')
+            self._error(501, "NotImplemented", "Unsupported POST")
+
+        def do_DELETE(self):
+            bucket, key, query = self._parse()
+            if "uploadId" in query:
+                shutil.rmtree(os.path.join(uploads_dir, query["uploadId"][0]), ignore_errors=True)
+                return self._send(204)
+            path = self._object_path(bucket, key)
+            if os.path.isfile(path):
+                os.remove(path)
+            self._send(204)
+
+    return Handler
+
+def start_server(root: str, host: str = "127.0.0.1", port: int = 0):
+    """Serves from a daemon thread; returns (server, endpoint)."""
+    os.makedirs(root, exist_ok=True)
+    server = ThreadingHTTPServer((host, port), make_handler(root))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local S3 stand-in")
+    parser.add_argument("--root", default=os.path.join(tempfile.gettempdir(), "s3-standin"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=30099)
+    cli_args = parser.parse_args()
+    os.makedirs(cli_args.root, exist_ok=True)
+    srv = ThreadingHTTPServer((cli_args.host, cli_args.port), make_handler(cli_args.root))
+    print(f"S3 stand-in serving {cli_args.root} on http://{cli_args.host}:{cli_args.port}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
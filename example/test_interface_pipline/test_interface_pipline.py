@@ -60,29 +60,27 @@ def create_dynamic_pipeline(interface: PipelineInterface):
         components_by_name = {cfg["name"]: cfg for cfg in interface.components}
 
         def apply_minio_config(task):
-            # 注入 Region
-            task.set_env_variable('AWS_REGION', 'us-east-1')
-            # 注入 Endpoint (使用 IP 绕过 DNS 问题)
-            task.set_env_variable('AWS_ENDPOINT_URL', 'http://10.96.2.78:9000')
-            task.set_env_variable('AWS_ENDPOINT_URL_S3', 'http://10.96.2.78:9000')
+            # Endpoint/Region/Secret 取自 minio_config（使用 IP 绕过 DNS 问题）
+            minio_config = interface.minio_config or {}
+            endpoint = minio_config.get('endpoint', 'http://10.96.2.78:9000')
+            task.set_env_variable('AWS_REGION', minio_config.get('region', 'us-east-1'))
+            task.set_env_variable('AWS_ENDPOINT_URL', endpoint)
+            task.set_env_variable('AWS_ENDPOINT_URL_S3', endpoint)
             # 强制 Path Style
-            task.set_env_variable('S3_FORCE_PATH_STYLE', 'true')
-            task.set_env_variable('AWS_S3_FORCE_PATH_STYLE', 'true')
-            task.set_env_variable('AWS_USE_PATH_STYLE_REQUESTS', 'true')
-            task.set_env_variable('AWS_S3_USE_PATH_STYLE', 'true')
-            
+            for name in ('S3_FORCE_PATH_STYLE', 'AWS_S3_FORCE_PATH_STYLE', 'AWS_USE_PATH_STYLE_REQUESTS', 'AWS_S3_USE_PATH_STYLE'):
+                task.set_env_variable(name, 'true')
+
             # 注入凭证
             if interface.minio_config:
-                 secret_name = interface.minio_config.get('secret_name', 'mlpipeline-minio-artifact')
-                 kubernetes.use_secret_as_env(
+                kubernetes.use_secret_as_env(
                     task=task,
-                    secret_name=secret_name,
+                    secret_name=minio_config.get('secret_name', 'mlpipeline-minio-artifact'),
                     secret_key_to_env={
                         'accesskey': 'AWS_ACCESS_KEY_ID',
                         'secretkey': 'AWS_SECRET_ACCESS_KEY'
                     }
                 )
-            
+
             # 禁用缓存
             task.set_caching_options(False)
 